@@ -1,9 +1,17 @@
 import os
 import sys
+from typing import List, Optional
 
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from controller_audio import iniciarGravacao, receber_e_processar_audio, processar_audio_enviado
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, WebSocket
+from controller_audio import (iniciarGravacao, receber_e_processar_audio, processar_audio_enviado,
+                              classificar_audio_enviado, classificar_lote_enviado, obter_espectrograma,
+                              processar_stream)
+from service_artefatos import obter_armazem
+from service_cache_resultados import obter_cache_resultados
+from service_execucao import estado_fila
+from service_metricas import exportar_metricas, registrar_medidor
+from service_microfone import estado_gravacoes
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..","..")))
 
@@ -11,23 +19,58 @@ router = APIRouter(
     prefix="/v1"
 )
 
+# Rotas fora do prefixo versionado (coleta do Prometheus)
+router_metricas = APIRouter()
+
+registrar_medidor("audio_fila_tarefas", "Tarefas no pool de workers, por estado.",
+                  lambda: {f'estado="{estado}"': estado_fila()[estado] for estado in ("em_execucao", "na_fila")})
+registrar_medidor("audio_fila_capacidade", "Tarefas aceitas além das em execução antes de responder 503.",
+                  lambda: estado_fila()["capacidade_fila"])
+registrar_medidor("audio_gravacoes_ativas", "Sessões de gravação do microfone em andamento.",
+                  lambda: len(estado_gravacoes()))
+registrar_medidor("audio_artefatos_fila", "Escritas de artefatos aguardando a thread de gravação.",
+                  lambda: obter_armazem().estado()["fila"])
+registrar_medidor("audio_artefatos_descartados", "Artefatos não arquivados porque a fila estava cheia.",
+                  lambda: obter_armazem().estado()["descartados"])
+registrar_medidor("audio_cache_resultados_taxa_acerto", "Fração das consultas ao cache de resultados com acerto.",
+                  lambda: obter_cache_resultados().estatisticas()["taxa_acerto"])
+registrar_medidor("audio_cache_resultados_bytes", "Bytes ocupados pelo cache de resultados em memória.",
+                  lambda: obter_cache_resultados().estatisticas()["bytes"])
+
 @router.post("/enviar-audio-wav")
-async def enviar_audio_wav(file: UploadFile = File(...)):
+async def enviar_audio_wav(file: UploadFile = File(...), saida: Optional[str] = None):
     try:
-        return await processar_audio_enviado(file)
+        # saida: resultados desejados separados por vírgula (ex.: ?saida=comando,features)
+        return await processar_audio_enviado(file, saida)
     except HTTPException as e:
         raise e  # Re-raise HTTPExceptions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao fazer upload e processar áudio: {e}")
 
+@router.post("/classificar")
+async def classificar(file: UploadFile = File(...)):
+    try:
+        return await classificar_audio_enviado(file)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao classificar áudio: {e}")
+
+@router.post("/classificar-lote")
+async def classificar_lote(files: List[UploadFile] = File(...)):
+    try:
+        return await classificar_lote_enviado(files)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao classificar lote de áudios: {e}")
+
 @router.post("/iniciar-gravacao")
 async def receber_audio():
     try:
-        # A função iniciarGravacao() já deve lidar com a lógica de iniciar a gravação
-        # e talvez retornar um status ou ID de gravação se necessário.
-        # Por simplicidade aqui, apenas chamamos e confirmamos o início.
-        await iniciarGravacao()  # Assumimos que iniciarGravacao() é assíncrona ou não bloqueia
-        return JSONResponse({"status": 200, "message": "Gravação iniciada com sucesso."})
+        # Cada gravação é uma sessão; o id permite várias gravações simultâneas
+        sessao_id = await iniciarGravacao()
+        return JSONResponse({"status": 200, "message": "Gravação iniciada com sucesso.", "sessao_id": sessao_id})
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -35,10 +78,36 @@ async def receber_audio():
 
 
 @router.post("/parar-gravacao")
-async def parar_gravacao():
+async def parar_gravacao(sessao_id: Optional[str] = None, saida: Optional[str] = None):
     try:
-        return await receber_e_processar_audio()
+        return await receber_e_processar_audio(sessao_id, saida)
     except HTTPException as e:
         raise e  # Re-raise HTTPExceptions
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao parar e processar gravação: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao parar e processar gravação: {e}")
+
+@router.websocket("/stream")
+async def stream(websocket: WebSocket):
+    await processar_stream(websocket)
+
+@router.get("/gravacoes")
+async def gravacoes():
+    return JSONResponse({"status": 200, "message": "success", "body": estado_gravacoes()})
+
+@router.get("/espectrograma/{espectrograma_id}")
+async def espectrograma(espectrograma_id: str):
+    try:
+        return await obter_espectrograma(espectrograma_id)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar espectrograma: {e}")
+
+@router.get("/fila")
+async def fila():
+    return JSONResponse({"status": 200, "message": "success", "body": estado_fila()})
+
+
+@router_metricas.get("/metrics")
+async def metricas():
+    return PlainTextResponse(exportar_metricas(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from service_box_cox import boxcox_fit_transform
+from service_fft import analisar_som_fourier, filtro_passa_baixa, renderizar_espectrograma
+from service_mlp import initialize_mlp_parameters, mlp_predict_proba, mlp_train
+from service_pca import pca_fit_transform
+from service_preparacao_dados import SCHEMA_FEATURES
+
+'''
+Benchmark do pipeline.
+
+Gera sinais sintéticos (comandos curtos e gravações longas, em várias taxas),
+mede as etapas numéricas isoladamente, o tempo de inicialização (imports do
+servidor e de um worker novo) e, opcionalmente, dispara requisições
+concorrentes contra /v1/enviar-audio-wav em um uvicorn local. O resultado vai
+para um JSON, para comparar execuções.
+
+Uso (dentro de source/):
+    python benchmark.py
+    python benchmark.py --rapido --sem-http --saida resultado.json
+'''
+
+TAXAS = [8000, 16000, 44100]
+DURACOES = {"comando": 1.0, "longo": 30.0}
+CONCORRENCIAS = [1, 4, 16]
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "relatorios", "benchmarks")
+
+
+def gerar_sinal(rate, duracao, semente=0):
+    """
+    Sinal parecido com um comando de voz: silêncio com ruído, um trecho
+    harmônico com envelope e silêncio de novo, em PCM int16.
+    """
+    rng = np.random.default_rng(semente)
+    n = int(rate * duracao)
+    t = np.arange(n) / rate
+    sinal = rng.standard_normal(n) * 0.002
+
+    inicio, fim = int(n * 0.2), int(n * 0.8)
+    envelope = np.hanning(fim - inicio)
+    fundamental = 120 + 80 * np.sin(2 * np.pi * 0.5 * t[inicio:fim])  # Entonação variando
+    fase = 2 * np.pi * np.cumsum(fundamental) / rate
+    voz = sum(np.sin(k * fase) / k for k in range(1, 8)) * envelope
+    sinal[inicio:fim] += 0.3 * voz + rng.standard_normal(fim - inicio) * 0.01
+
+    return np.clip(sinal * 32767, -32768, 32767).astype(np.int16)
+
+
+def gerar_wav(rate, duracao, semente=0):
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, gerar_sinal(rate, duracao, semente))
+    return buffer.getvalue()
+
+
+def medir(func, *args, repeticoes=5, **kwargs):
+    """
+    Executa func uma vez para aquecer e depois `repeticoes` vezes.
+
+    Returns:
+        dict: Tempos em milissegundos (média, mínimo, mediana, máximo).
+    """
+    func(*args, **kwargs)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func(*args, **kwargs)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos = np.array(tempos)
+    return {
+        "repeticoes": repeticoes,
+        "media_ms": float(tempos.mean()),
+        "min_ms": float(tempos.min()),
+        "p50_ms": float(np.median(tempos)),
+        "max_ms": float(tempos.max()),
+    }
+
+
+def benchmark_sinais(taxas, duracoes, repeticoes):
+    """
+    Mede as etapas que recebem um sinal: análise de Fourier, filtro passa-baixa e espectrograma.
+    """
+    resultados = []
+    for tipo, duracao in duracoes.items():
+        for rate in taxas:
+            sinal = gerar_sinal(rate, duracao)
+            caso = {"tipo": tipo, "sample_rate": rate, "duracao_segundos": duracao}
+            print(f"Sinais: {tipo} {rate} Hz ({duracao}s)")
+            resultados.append({**caso, "etapa": "analisar_som_fourier",
+                               **medir(analisar_som_fourier, sinal, rate, repeticoes=repeticoes)})
+            resultados.append({**caso, "etapa": "filtro_passa_baixa",
+                               **medir(filtro_passa_baixa, sinal, rate, repeticoes=repeticoes)})
+            resultados.append({**caso, "etapa": "renderizar_espectrograma",
+                               **medir(renderizar_espectrograma, sinal, rate,
+                                       repeticoes=max(1, repeticoes // 2))})
+    return resultados
+
+
+def benchmark_modelo(n_amostras, repeticoes):
+    """
+    Mede o ajuste das transformações e do MLP sobre uma matriz de features sintética
+    com o mesmo número de colunas do schema atual.
+    """
+    rng = np.random.default_rng(0)
+    n_features = len(SCHEMA_FEATURES["features"])
+    X = rng.lognormal(size=(n_amostras, n_features))
+    y = rng.integers(0, 8, size=n_amostras)
+    resultados = []
+
+    print(f"Modelo: {n_amostras} amostras x {n_features} features")
+    resultados.append({"etapa": "boxcox_fit_transform", "n_amostras": n_amostras,
+                       **medir(boxcox_fit_transform, X, repeticoes=repeticoes)})
+    X_bc, _ = boxcox_fit_transform(X)
+
+    n_componentes = min(10, n_features)  # Inteiro: o método randomizado não aceita fração de variância
+    for metodo in ("eigh", "svd", "randomizado"):
+        resultados.append({"etapa": "pca_fit_transform", "metodo": metodo, "n_amostras": n_amostras,
+                           "n_componentes": n_componentes,
+                           **medir(pca_fit_transform, X_bc, n_componentes, metodo=metodo, random_state=0,
+                                   repeticoes=repeticoes)})
+    X_pca, _ = pca_fit_transform(X_bc, 0.95)
+
+    params = initialize_mlp_parameters(X_pca.shape[1], 28, 8)
+    resultados.append({"etapa": "mlp_train", "n_amostras": n_amostras, "epocas": 20,
+                       **medir(mlp_train, X_pca, y, params, learning_rate=0.001, epochs=20, otimizador="adam",
+                               batch_size=32, random_state=0, repeticoes=max(1, repeticoes // 2))})
+    params = mlp_train(X_pca, y, params, learning_rate=0.001, epochs=20, otimizador="adam",
+                       batch_size=32, random_state=0)
+
+    for tamanho_lote in (1, 32, n_amostras):
+        resultados.append({"etapa": "mlp_predict_proba", "tamanho_lote": tamanho_lote,
+                           **medir(mlp_predict_proba, X_pca[:tamanho_lote], params, repeticoes=repeticoes * 10)})
+    return resultados
+
+
+def benchmark_inicializacao(repeticoes):
+    """
+    Mede, em interpretadores novos, o import do servidor (worker do uvicorn) e do
+    módulo executado pelo pool de processos (worker numérico), e o tempo até o
+    servidor responder. Regressões de cold start aparecem aqui.
+    """
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    resultados = []
+    for modulo in ("server", "service_processamento"):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            subprocess.run([sys.executable, "-c", f"import {modulo}"], cwd=pasta, check=True)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        print(f"Inicialização: import {modulo} {np.median(tempos):.0f} ms")
+        resultados.append({"etapa": f"import_{modulo}", "repeticoes": repeticoes,
+                           "p50_ms": float(np.median(tempos)), "min_ms": float(np.min(tempos))})
+
+    inicio = time.perf_counter()
+    processo = iniciar_servidor(_porta_livre())
+    resultados.append({"etapa": "servidor_ate_responder", "ms": (time.perf_counter() - inicio) * 1000})
+    processo.terminate()
+    processo.wait()
+    return resultados
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(porta, timeout=60):
+    """
+    Sobe `uvicorn server:app` em um subprocesso e espera ele responder.
+    """
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+    import httpx
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("O servidor encerrou durante a inicialização.")
+        try:
+            httpx.get(f"http://127.0.0.1:{porta}/v1/fila", timeout=1)
+            return processo
+        except httpx.TransportError:
+            time.sleep(0.02)
+
+    processo.terminate()
+    raise RuntimeError("O servidor não respondeu a tempo.")
+
+
+async def _disparar(url, wav, concorrencia, n_requisicoes):
+    import httpx
+
+    latencias, status = [], {}
+    restantes = n_requisicoes
+
+    async def trabalhador(cliente):
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            resposta = await cliente.post(url, files={"file": ("benchmark.wav", wav, "audio/wav")})
+            if resposta.status_code == 200:
+                # Só respostas completas: rejeições rápidas (503) distorceriam os percentis
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+
+    async with httpx.AsyncClient(timeout=120) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador(cliente) for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    return np.array(latencias), status, duracao
+
+
+def benchmark_http(taxas, concorrencias, n_requisicoes):
+    """
+    Mede latência (p50/p95/p99 das respostas 200) e vazão de /v1/enviar-audio-wav
+    em um uvicorn local. Respostas 503 (fila cheia) aparecem só na contagem de status.
+    """
+    porta = _porta_livre()
+    processo = iniciar_servidor(porta)
+    url = f"http://127.0.0.1:{porta}/v1/enviar-audio-wav"
+    resultados = []
+    try:
+        for rate in taxas:
+            wav = gerar_wav(rate, DURACOES["comando"])
+            asyncio.run(_disparar(url, wav, 1, 2))  # Aquecimento (pool de workers, imports)
+            for concorrencia in concorrencias:
+                print(f"HTTP: {rate} Hz, concorrência {concorrencia}")
+                latencias, status, duracao = asyncio.run(_disparar(url, wav, concorrencia, n_requisicoes))
+                resultados.append({
+                    "rota": "/v1/enviar-audio-wav",
+                    "sample_rate": rate,
+                    "concorrencia": concorrencia,
+                    "requisicoes": n_requisicoes,
+                    "status": {str(codigo): total for codigo, total in status.items()},
+                    "p50_ms": float(np.percentile(latencias, 50)) if len(latencias) else None,
+                    "p95_ms": float(np.percentile(latencias, 95)) if len(latencias) else None,
+                    "p99_ms": float(np.percentile(latencias, 99)) if len(latencias) else None,
+                    "vazao_rps": len(latencias) / duracao,
+                })
+    finally:
+        processo.terminate()
+        processo.wait()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de áudio.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: relatorios/benchmarks/benchmark_<data>.json)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--requisicoes", type=int, default=64, help="Requisições por nível de concorrência")
+    parser.add_argument("--rapido", action="store_true", help="Menos casos, para uma verificação rápida")
+    parser.add_argument("--sem-http", action="store_true", help="Não sobe o servidor")
+    args = parser.parse_args()
+
+    taxas = [16000, 44100] if args.rapido else TAXAS
+    duracoes = {"comando": DURACOES["comando"]} if args.rapido else DURACOES
+    n_amostras = 500 if args.rapido else 5000
+
+    inicio = datetime.datetime.now()
+    resultado = {
+        "data": inicio.isoformat(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "sinais": benchmark_sinais(taxas, duracoes, args.repeticoes),
+        "modelo": benchmark_modelo(n_amostras, args.repeticoes),
+        "inicializacao": benchmark_inicializacao(max(1, args.repeticoes // 2)),
+    }
+    if not args.sem_http:
+        resultado["http"] = benchmark_http(taxas, [1, 4] if args.rapido else CONCORRENCIAS,
+                                           16 if args.rapido else args.requisicoes)
+
+    caminho = args.saida
+    if caminho is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        caminho = os.path.join(DIRETORIO_RESULTADOS, f"benchmark_{inicio.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
-import datetime
+import json
 import os
+import re
 import sys
+import tempfile
+from typing import List
+
 import numpy as np
 
 '''
@@ -13,174 +17,426 @@ recebe audio -> extrai as features via LPC -> transforma os dados via box cox e
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse
-from scipy.io import wavfile
-from dotenv import load_dotenv
-
-from service_fft import analisar_som_fourier, filtro_passa_baixa, detectar_padroes, salvar_espectrograma
-from service_microfone import gravar_audio_microfone, reconhecer_fala, stop_recording_continuous
-
-load_dotenv()
-
-app = FastAPI(
-    title="Sistema de Análise de Áudio",
-    description="API para gravar, processar e analisar áudio, detectando padrões e transcrevendo fala.",
-    version="1.0.0"
-)
+from fastapi import HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+
+from service_artefatos import nome_unico, obter_armazem
+from service_audio import (TAMANHO_CABECALHO_WAV, TAMANHO_MAX_UPLOAD, TAMANHO_PARTE_UPLOAD, cabecalho_wav_valido,
+                           decodificar_wav, ler_wav)
+from service_cache_resultados import chave_resultado, obter_cache_resultados
+from service_espectrograma import (identificar_audio, obter_audio_registrado, ler_espectrograma_em_cache,
+                                   registrar_audio, salvar_espectrograma_em_cache)
+from service_execucao import RETRY_AFTER_SEGUNDOS, FilaCheiaError, executar_no_pool
+from service_metricas import etapa
+from service_fft import renderizar_espectrograma
+from service_microlote import obter_microlote
+from service_microfone import LimiteSessoesError, MicrofoneIndisponivelError, iniciar_sessao, parar_sessao
+from service_modelo import classificar_vetores, obter_modelo, resultado_classificacao
+from service_preparacao_dados import extrair_vetores
+from service_janelas import DURACAO_MAX_INTEIRA_SEGUNDOS
+from service_processamento import (SAIDAS_ARQUIVO, SAIDAS_PADRAO, SAIDAS_PADRAO_LONGO, SAIDAS_SO_UPLOAD,
+                                   VERSAO_PIPELINE, executar_etapas_worker, pipeline)
+from service_streaming import TAXA_MAX, TAXA_MIN, ReconhecedorStreaming
 
 async def iniciarGravacao():
     """
     Inicia a gravação de áudio do microfone.
-    Retorna o caminho do arquivo de áudio temporário onde a gravação será salva.
+    Retorna o id da sessão de gravação, usado para pará-la depois.
+    """
+    try:
+        return iniciar_sessao()
+    except (MicrofoneIndisponivelError, LimiteSessoesError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao abrir o dispositivo de áudio: {e}")
+
+
+async def _executar_etapas(func, *args):
     """
-    gravacao = gravar_audio_microfone()
-    if gravacao is None:
-        raise HTTPException(status_code=404, detail="Arquivo de áudio é nulo ou a gravação falhou.")
-    return gravacao  # Retorna o caminho do arquivo de gravação
+    Executa uma etapa numérica no pool de workers, convertendo fila cheia em 503.
+    """
+    try:
+        return await executar_no_pool(func, *args)
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(RETRY_AFTER_SEGUNDOS)})
 
 
-async def receber_e_processar_audio():
+def _planejar_saidas(saida, padrao=SAIDAS_PADRAO, permitidas=None):
     """
-    Para uma gravação contínua em andamento, processa o arquivo de áudio.
-    Realiza análise de Fourier, filtragem, detecção de padrões, salvamento de espectrograma
-    e reconhecimento de fala.
+    Converte o parâmetro ?saida=comando,features no plano de etapas do pipeline.
+    Sem o parâmetro, usa as saídas `padrao`; `permitidas` restringe as saídas aceitas.
     """
-    # stop_recording_continuous() deve retornar o caminho do arquivo gravado ou uma mensagem de erro
-    caminho_temp = stop_recording_continuous()
+    saidas = padrao if saida is None else [nome.strip() for nome in saida.split(",") if nome.strip()]
+    if not saidas:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma saída.")
+    if permitidas is not None:
+        recusadas = [nome for nome in saidas if nome in pipeline.saidas and nome not in permitidas]
+        if recusadas:
+            raise HTTPException(status_code=413,
+                                detail=f"Áudio longo demais para as saídas {', '.join(recusadas)}. "
+                                       f"Disponíveis para gravações longas: {', '.join(permitidas)}.")
+    try:
+        return pipeline.planejar(list(dict.fromkeys(saidas)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if "Nenhuma gravação" in caminho_temp or "Erro" in caminho_temp:
-        raise HTTPException(status_code=400, detail=caminho_temp)
+
+async def _executar_pipeline(plano, signal, rate, caminho_audio, id_audio=None):
+    """
+    Executa só as etapas necessárias para as saídas do plano: as numéricas em uma
+    única tarefa do pool de workers e as demais (inferência, espectrograma, fala) no event loop.
+    """
+    contexto = {"signal": signal, "rate": rate, "caminho_audio": caminho_audio, "id_audio": id_audio}
+    if "comando" in plano.etapas_loop:
+        modelo = obter_modelo()
+        if modelo is None:
+            raise HTTPException(status_code=503, detail="Nenhum modelo treinado carregado. Execute train.py.")
+        contexto.update(modelo=modelo, feature_schema=modelo["feature_schema"])
+
+    detalhes_evento = {"caminho_audio": caminho_audio}
+    if plano.etapas_worker:
+        # O sinal só vai para o worker se alguma etapa precisar dele (a análise em janelas lê o arquivo)
+        chaves = ["caminho_audio", "feature_schema"] + (["signal", "rate"] if "audio" in plano.etapas_worker else [])
+        entrada = {chave: contexto[chave] for chave in chaves if chave in contexto}
+        campos, valores = await _executar_etapas(executar_etapas_worker, entrada, plano)
+        detalhes_evento.update(campos)
+        contexto.update(valores)
+
+    await pipeline.executar_async(contexto, plano.etapas_loop)
+    detalhes_evento.update(pipeline.formatar(contexto, plano.saidas_loop))
+    return detalhes_evento
+
+
+async def receber_e_processar_audio(sessao_id=None, saida=None):
+    """
+    Para uma gravação em andamento e processa o áudio capturado.
+    Por padrão realiza análise de Fourier, filtragem, detecção de padrões, registro do
+    espectrograma e reconhecimento de fala; `saida` escolhe quais resultados calcular.
+    """
+    plano = _planejar_saidas(saida)
+    so_upload = [nome for nome in plano.saidas if nome in SAIDAS_SO_UPLOAD]
+    if so_upload:
+        raise HTTPException(status_code=400,
+                            detail=f"Saídas disponíveis só para uploads: {', '.join(so_upload)}.")
+    try:
+        # O áudio vem direto do buffer da sessão; o WAV salvo em disco não é relido
+        signal, rate, caminho_temp = parar_sessao(sessao_id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Nenhuma gravação em andamento.")
 
     try:
-        # Verifica se o arquivo existe e não está vazio
-        if not os.path.exists(caminho_temp) or os.path.getsize(caminho_temp) == 0:
-            raise HTTPException(status_code=500, detail="Arquivo de áudio gerado está vazio ou não existe.")
-
-        # Lê o arquivo WAV
-        rate, signal = wavfile.read(caminho_temp)
-
-        # Converte para mono se for estéreo
-        if len(signal.shape) > 1:
-            signal = signal[:, 0]
-
-        # Analisa o som usando Fourier (do seu 'service_analise_som')
-        resultado_analise = analisar_som_fourier(caminho_temp)
-
-        detalhes_evento = {
-            "caminho_audio": caminho_temp,
-            "duracao_segundos": str(len(signal) / rate),
-            "sample_rate": str(rate)
-        }
-
-        # Adiciona resultados da análise de Fourier ao dicionário
-        if "pico_frequencia" in resultado_analise and "pico_amplitude" in resultado_analise:
-            detalhes_evento["pico_frequencia"] = str(resultado_analise["pico_frequencia"])
-            detalhes_evento["pico_amplitude"] = str(resultado_analise["pico_amplitude"])
-            detalhes_evento["energia_total"] = str(resultado_analise.get("energia_total"))  # Add new features
-            detalhes_evento["media_abs"] = str(resultado_analise.get("media_abs"))
-            detalhes_evento["centroide_espectral"] = str(resultado_analise.get("centroide_espectral"))
-            detalhes_evento["largura_banda_espectral"] = str(resultado_analise.get("largura_banda_espectral"))
-            detalhes_evento["zcr"] = str(resultado_analise.get("zcr"))
-            detalhes_evento["status_analise_som"] = resultado_analise.get("status", "desconhecido")
-        elif "erro" in resultado_analise:
-            detalhes_evento["erro_analise_som"] = resultado_analise["erro"]
-
-        # Aplica filtro passa-baixa e detecta padrões
-        signal_filtrado = filtro_passa_baixa(signal, rate)
-        padrao = detectar_padroes(signal_filtrado, rate)
-
-        # Salva espectrograma
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        espectrograma_path = salvar_espectrograma(signal, rate, timestamp)
-
-        detalhes_evento["padrao_detectado"] = padrao
-        detalhes_evento["espectrograma_path"] = espectrograma_path
-
-        # Realiza reconhecimento de fala
-        texto_falado = reconhecer_fala(caminho_temp)
-        print(f"Texto reconhecido: {texto_falado}")
-        detalhes_evento["texto_falado"] = texto_falado
+        if len(signal) == 0:
+            raise HTTPException(status_code=500, detail="Nenhum áudio foi capturado na gravação.")
 
+        detalhes_evento = await _executar_pipeline(plano, signal, rate, caminho_temp)
         return JSONResponse({"status": 200, "message": "success", "body": detalhes_evento})
 
-    except FileNotFoundError:
-        raise HTTPException(status_code=404,
-                            detail="Arquivo de áudio não encontrado após gravação. Verifique se o processo de gravação salvou o arquivo corretamente.")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erro inesperado em receber_e_processar_audio: {e}")
         raise HTTPException(status_code=500, detail=f"Erro durante o processamento do áudio: {e}")
 
 
-async def processar_audio_enviado(file: UploadFile = File(...)):
+async def _ler_partes_upload(file):
+    """
+    Lê o upload em partes, validando o cabeçalho RIFF/WAVE logo nos primeiros
+    bytes e recusando (413) arquivos acima de TAMANHO_MAX_UPLOAD.
+    """
+    if file.size is not None and file.size > TAMANHO_MAX_UPLOAD:
+        raise HTTPException(status_code=413, detail=f"Arquivo maior que o limite de {TAMANHO_MAX_UPLOAD} bytes.")
+
+    parte = await file.read(TAMANHO_CABECALHO_WAV)
+    if not cabecalho_wav_valido(parte):
+        raise HTTPException(status_code=400, detail="Arquivo WAV inválido: cabeçalho RIFF/WAVE ausente.")
+    recebidos = 0
+    while parte:
+        recebidos += len(parte)
+        if recebidos > TAMANHO_MAX_UPLOAD:
+            raise HTTPException(status_code=413, detail=f"Arquivo maior que o limite de {TAMANHO_MAX_UPLOAD} bytes.")
+        yield parte
+        parte = await file.read(TAMANHO_PARTE_UPLOAD)
+
+
+async def _receber_upload(file, caminho):
+    """
+    Grava o upload no disco em partes; as escritas rodam fora do event loop.
+    """
+    with open(caminho, "wb") as f:
+        async for parte in _ler_partes_upload(file):
+            await run_in_threadpool(f.write, parte)
+
+
+async def _ler_upload(file):
+    """
+    Lê o upload para a memória, com as mesmas validações e limite de _receber_upload.
+    """
+    return b"".join([parte async for parte in _ler_partes_upload(file)])
+
+
+async def processar_audio_enviado(file: UploadFile = File(...), saida=None):
     """
     Recebe um arquivo de áudio WAV enviado via upload, processa-o
-    e retorna uma análise detalhada.
+    e retorna uma análise detalhada (ou só as saídas pedidas em `saida`).
     """
     try:
+        plano = _planejar_saidas(saida)
+
         # Validação do formato do arquivo
         if not file.filename.endswith(".wav"):
             raise HTTPException(status_code=400, detail="O arquivo deve estar no formato WAV.")
 
-        # Cria um diretório temporário para uploads se não existir
-        pasta_temp = os.path.join(os.path.dirname(__file__), "..",
-                                  "audios_uploads")  # Use uma pasta diferente para uploads
-        os.makedirs(pasta_temp, exist_ok=True)
-
-        # Gera um nome de arquivo único com timestamp
-        caminho_temp = os.path.join(pasta_temp,
-                                    f"upload_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-
-        # Salva o arquivo enviado
-        contents = await file.read()
-        with open(caminho_temp, "wb") as f:
-            f.write(contents)
-
-        # Lê o arquivo WAV salvo
-        rate, signal = wavfile.read(caminho_temp)
-        if len(signal.shape) > 1:
-            signal = signal[:, 0]
-
-        # Analisa o som usando Fourier
-        resultado_analise = analisar_som_fourier(caminho_temp)
-
-        detalhes_evento = {
-            "caminho_audio": caminho_temp,
-            "duracao_segundos": str(len(signal) / rate),
-            "sample_rate": str(rate)
-        }
-
-        # Adiciona resultados da análise de Fourier ao dicionário
-        if "pico_frequencia" in resultado_analise and "pico_amplitude" in resultado_analise:
-            detalhes_evento["pico_frequencia"] = str(resultado_analise["pico_frequencia"])
-            detalhes_evento["pico_amplitude"] = str(resultado_analise["pico_amplitude"])
-            detalhes_evento["energia_total"] = str(resultado_analise.get("energia_total"))  # Add new features
-            detalhes_evento["media_abs"] = str(resultado_analise.get("media_abs"))
-            detalhes_evento["centroide_espectral"] = str(resultado_analise.get("centroide_espectral"))
-            detalhes_evento["largura_banda_espectral"] = str(resultado_analise.get("largura_banda_espectral"))
-            detalhes_evento["zcr"] = str(resultado_analise.get("zcr"))
-            detalhes_evento["status_analise_som"] = resultado_analise.get("status", "desconhecido")
-        elif "erro" in resultado_analise:
-            detalhes_evento["erro_analise_som"] = resultado_analise["erro"]
-
-        # Aplica filtro passa-baixa e detecta padrões
-        signal_filtrado = filtro_passa_baixa(signal, rate)
-        padrao = detectar_padroes(signal_filtrado, rate)
-
-        # Salva espectrograma
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        espectrograma_path = salvar_espectrograma(signal, rate, timestamp)
-
-        detalhes_evento["padrao_detectado"] = padrao
-        detalhes_evento["espectrograma_path"] = espectrograma_path
-
-        # Realiza reconhecimento de fala
-        texto_falado = reconhecer_fala(caminho_temp)
-        print(f"Texto reconhecido: {texto_falado}")
-        detalhes_evento["texto_falado"] = texto_falado
-
+        # O upload vai para um arquivo temporário em partes; ele é lido por memory-map, sem cópia inteira em memória
+        descritor, caminho_temp = tempfile.mkstemp(prefix="upload_", suffix=".wav")
+        os.close(descritor)
+        entregue = False
+        try:
+            with etapa("escrita_disco"):
+                await _receber_upload(file, caminho_temp)
+            try:
+                with etapa("decodificacao"):
+                    signal, rate = ler_wav(caminho_temp, mmap=True)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Arquivo WAV inválido: {e}")
+
+            if len(signal) / rate > DURACAO_MAX_INTEIRA_SEGUNDOS:
+                # Gravação longa: só as saídas que leem o arquivo em janelas
+                plano = _planejar_saidas(saida, SAIDAS_PADRAO_LONGO, SAIDAS_ARQUIVO)
+            else:
+                signal = np.array(signal)  # Curto: sai do memory-map (vai para o pool e para o registro)
+
+            # O mesmo PCM (retentativa, reenvio do frontend) é respondido do cache, sem nova cópia em disco
+            with etapa("hash"):
+                id_audio = await run_in_threadpool(identificar_audio, signal, rate)
+            modelo = obter_modelo() if "comando" in plano.etapas_loop else None
+            chave = chave_resultado(id_audio, VERSAO_PIPELINE, plano.saidas,
+                                    modelo["versao"] if modelo is not None else None)
+            cache = obter_cache_resultados()
+            detalhes_evento = cache.obter(chave)
+            if detalhes_evento is not None:
+                if "espectrograma" in plano.saidas:
+                    # Mantém a URL válida mesmo que o áudio já tenha saído do registro
+                    registrar_audio(signal, rate, id_audio)
+                return JSONResponse({"status": 200, "message": "success", "body": detalhes_evento})
+
+            detalhes_evento = await _executar_pipeline(plano, signal, rate, caminho_temp, id_audio)
+
+            # O arquivo vai para audios_uploads/ em segundo plano; o caminho final já vai na resposta
+            nome_original = os.path.splitext(os.path.basename(file.filename))[0]
+            detalhes_evento["caminho_audio"] = obter_armazem().guardar_arquivo(
+                "uploads", nome_unico("upload", ".wav", nome_original), caminho_temp)
+            entregue = True
+        finally:
+            # Recusado, inválido, respondido do cache ou com erro: o temporário não fica no disco
+            if not entregue and os.path.exists(caminho_temp):
+                os.remove(caminho_temp)
+
+        cache.guardar(chave, detalhes_evento)
         return JSONResponse({"status": 200, "message": "success", "body": detalhes_evento})
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erro inesperado em processar_audio_enviado: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro ao processar o áudio enviado: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao processar o áudio enviado: {e}")
+
+
+async def classificar_audio_enviado(file: UploadFile = File(...)):
+    """
+    Recebe um arquivo de áudio WAV enviado via upload e retorna o comando
+    previsto pelo modelo carregado no startup, com as probabilidades de cada classe.
+    """
+    modelo = obter_modelo()
+    if modelo is None:
+        raise HTTPException(status_code=503, detail="Nenhum modelo treinado carregado. Execute train.py.")
+
+    if not file.filename.endswith(".wav"):
+        raise HTTPException(status_code=400, detail="O arquivo deve estar no formato WAV.")
+
+    contents = await _ler_upload(file)
+    try:
+        with etapa("decodificacao"):
+            signal, rate = decodificar_wav(contents)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Arquivo WAV inválido: {e}")
+
+    (vetor, erro, segmento), = await _executar_etapas(extrair_vetores, [signal], [rate], modelo["feature_schema"])
+    if erro is not None:
+        raise HTTPException(status_code=400, detail=f"Erro ao analisar o áudio: {erro}")
+
+    try:
+        # Agrupado com as requisições concorrentes em uma única inferência
+        with etapa("inferencia"):
+            probabilidades = await obter_microlote().classificar(vetor, modelo)
+    except Exception as e:
+        print(f"Erro inesperado em classificar_audio_enviado: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao classificar o áudio: {e}")
+
+    resultado = resultado_classificacao(probabilidades, modelo)
+    resultado["segmento_fala"] = segmento
+    return JSONResponse({"status": 200, "message": "success", "body": resultado})
+
+
+async def classificar_lote_enviado(files: List[UploadFile]):
+    """
+    Recebe vários arquivos WAV em uma única requisição e classifica todos
+    com uma extração de características em lote e uma única inferência.
+    Arquivos inválidos recebem um erro individual, sem derrubar o lote.
+    """
+    modelo = obter_modelo()
+    if modelo is None:
+        raise HTTPException(status_code=503, detail="Nenhum modelo treinado carregado. Execute train.py.")
+
+    resultados = [{"arquivo": file.filename} for file in files]
+    sinais, taxas, posicoes = [], [], []
+
+    for posicao, file in enumerate(files):
+        if not file.filename.endswith(".wav"):
+            resultados[posicao]["erro"] = "O arquivo deve estar no formato WAV."
+            continue
+        try:
+            # Um arquivo acima do limite recusa o lote inteiro (413); os demais erros são individuais
+            contents = await _ler_upload(file)
+        except HTTPException as e:
+            if e.status_code == 413:
+                raise
+            resultados[posicao]["erro"] = e.detail
+            continue
+        try:
+            with etapa("decodificacao"):
+                signal, rate = decodificar_wav(contents)
+        except Exception as e:
+            resultados[posicao]["erro"] = f"Arquivo WAV inválido: {e}"
+            continue
+        sinais.append(signal)
+        taxas.append(rate)
+        posicoes.append(posicao)
+
+    if sinais:
+        vetores = await _executar_etapas(extrair_vetores, sinais, taxas, modelo["feature_schema"])
+
+        validos = []
+        for posicao, (vetor, erro, segmento) in zip(posicoes, vetores):
+            resultados[posicao]["segmento_fala"] = segmento
+            if erro is not None:
+                resultados[posicao]["erro"] = f"Erro ao analisar o áudio: {erro}"
+            else:
+                validos.append((posicao, vetor))
+
+        if validos:
+            with etapa("inferencia"):
+                probabilidades = classificar_vetores(np.array([vetor for _, vetor in validos]), modelo)
+            for (posicao, _), linha in zip(validos, probabilidades):
+                resultados[posicao].update(resultado_classificacao(linha, modelo))
+
+    return JSONResponse({"status": 200, "message": "success", "body": resultados})
+
+
+async def obter_espectrograma(espectrograma_id: str):
+    """
+    Retorna o PNG do espectrograma de um áudio já processado, renderizando-o
+    na primeira chamada e servindo do cache (memória ou disco) nas seguintes.
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", espectrograma_id):
+        raise HTTPException(status_code=404, detail="Espectrograma não encontrado.")
+
+    png = ler_espectrograma_em_cache(espectrograma_id)
+    if png is None:
+        audio = obter_audio_registrado(espectrograma_id)
+        if audio is None:
+            raise HTTPException(status_code=404, detail="Espectrograma não encontrado ou expirado.")
+
+        signal, rate = audio
+        png = await _executar_etapas(renderizar_espectrograma, signal, rate)
+        with etapa("escrita_disco"):
+            salvar_espectrograma_em_cache(espectrograma_id, png)
+
+    return Response(content=png, media_type="image/png")
+
+
+async def processar_stream(websocket: WebSocket):
+    """
+    Reconhecimento em streaming. O cliente envia blocos PCM int16 mono (mensagens binárias)
+    e, opcionalmente, mensagens de texto JSON: {"sample_rate": 16000} para configurar a taxa
+    e {"evento": "fim"} para encerrar a fala em andamento. A cada fim de fala detectado
+    o servidor responde com o comando classificado.
+
+    Erros são enviados como {"evento": "erro", "detail": ...}. Um bloco PCM com número
+    ímpar de bytes fecha a conexão com o código 1003 e uma falha inesperada, com 1011.
+    """
+    await websocket.accept()
+
+    modelo = obter_modelo()
+    if modelo is None:
+        await websocket.send_json({"evento": "erro", "detail": "Nenhum modelo treinado carregado. Execute train.py."})
+        await websocket.close(code=1011)
+        return
+
+    reconhecedor = ReconhecedorStreaming(16000)
+
+    try:
+        while True:
+            mensagem = await websocket.receive()
+            if mensagem["type"] == "websocket.disconnect":
+                break
+
+            enunciados = []
+            if mensagem.get("bytes") is not None:
+                if len(mensagem["bytes"]) % 2:
+                    # Sem o alinhamento das amostras int16, o restante do stream não pode ser lido
+                    await _encerrar_stream(websocket, 1003, "Bloco PCM inválido: o número de bytes deve ser par (int16).")
+                    return
+                pcm = np.frombuffer(mensagem["bytes"], dtype="<i2")
+                enunciados = reconhecedor.processar(pcm)
+            elif mensagem.get("text") is not None:
+                try:
+                    controle = json.loads(mensagem["text"])
+                except ValueError:
+                    controle = None
+                if not isinstance(controle, dict):
+                    await websocket.send_json({"evento": "erro", "detail": "Mensagem de controle inválida."})
+                    continue
+                if "sample_rate" in controle:
+                    taxa = controle["sample_rate"]
+                    if isinstance(taxa, bool) or not isinstance(taxa, int) or not TAXA_MIN <= taxa <= TAXA_MAX:
+                        await websocket.send_json({"evento": "erro",
+                                                   "detail": f"sample_rate deve ser um inteiro entre {TAXA_MIN} "
+                                                             f"e {TAXA_MAX}."})
+                        continue
+                    reconhecedor = ReconhecedorStreaming(taxa)
+                if controle.get("evento") == "fim":
+                    enunciado = reconhecedor.finalizar()
+                    enunciados = [enunciado] if enunciado is not None else []
+
+            for signal, inicio_s, fim_s in enunciados:
+                resultado = await _classificar_enunciado(signal, reconhecedor.rate, modelo)
+                resultado.update({"evento": "comando", "inicio_segundos": inicio_s, "fim_segundos": fim_s})
+                await websocket.send_json(resultado)
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Erro inesperado em processar_stream: {e}")
+        await _encerrar_stream(websocket, 1011, f"Erro ao processar o stream: {e}")
+
+
+async def _encerrar_stream(websocket, codigo, detalhe):
+    try:
+        await websocket.send_json({"evento": "erro", "detail": detalhe})
+        await websocket.close(code=codigo)
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # O cliente já desconectou
+
+
+async def _classificar_enunciado(signal, rate, modelo):
+    # Extração no pool de workers: o event loop continua atendendo as outras conexões
+    try:
+        (vetor, erro, _), = await _executar_etapas(extrair_vetores, [signal], [rate], modelo["feature_schema"])
+    except HTTPException as e:
+        return {"erro": e.detail}
+    if erro is not None:
+        return {"erro": erro}
+    probabilidades = await obter_microlote().classificar(vetor, modelo)
+    return resultado_classificacao(probabilidades, modelo)
@@ -1,9 +1,80 @@
-from fastapi import FastAPI
+import time
+
+_inicio_imports = time.perf_counter()
+
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+# Carrega o .env antes dos serviços, que leem a configuração ao serem importados
+load_dotenv()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 import api
+from service_artefatos import obter_armazem
+from service_execucao import encerrar_pool, iniciar_pool
+from service_metricas import (encerrar_coleta, iniciar_coleta, registrar_medidor, registrar_requisicao,
+                              server_timing)
+from service_modelo import inicializar_modelo
+
+'''
+Inicialização rápida.
+
+Módulos pesados são importados no primeiro uso: matplotlib só quando um
+espectrograma é renderizado, sounddevice só quando o microfone real é aberto
+e scipy.signal / scipy.io só na primeira etapa que precisa deles. Assim um
+worker novo do uvicorn sobe sem pagar esses imports. Com PRECARREGAR_MODULOS=1
+(padrão), esses módulos (menos o sounddevice) são carregados em segundo plano
+(em uma thread e em cada worker do pool) depois que o servidor já está pronto,
+e a primeira requisição não paga o custo.
+
+Os tempos de cada fase aparecem no log e em /metrics (audio_inicializacao_segundos).
+'''
+
+PRECARREGAR_MODULOS = os.getenv("PRECARREGAR_MODULOS", "1") != "0"
+
+_tempos_inicializacao = {"imports": time.perf_counter() - _inicio_imports}
+
+registrar_medidor("audio_inicializacao_segundos", "Duração de cada fase da inicialização do processo.",
+                  lambda: {f'fase="{fase}"': duracao for fase, duracao in _tempos_inicializacao.items()})
 
-app = FastAPI(title="P2")
+
+def _precarregar_modulos():
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+    import scipy.io.wavfile  # noqa: F401
+    import scipy.signal  # noqa: F401
+
+
+def _precarregar_em_segundo_plano():
+    inicio = time.perf_counter()
+    _precarregar_modulos()
+    _tempos_inicializacao["precarga"] = time.perf_counter() - inicio
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inicio = time.perf_counter()
+    # Carrega o modelo treinado uma única vez por worker
+    inicializar_modelo()
+    # Os workers sobem aqui e cada um pré-carrega os módulos por conta própria
+    iniciar_pool(_precarregar_modulos if PRECARREGAR_MODULOS else None)
+    _tempos_inicializacao["lifespan"] = time.perf_counter() - inicio
+    print(f"Servidor pronto: imports {_tempos_inicializacao['imports'] * 1000:.0f} ms, "
+          f"inicialização {_tempos_inicializacao['lifespan'] * 1000:.0f} ms")
+    if PRECARREGAR_MODULOS:
+        threading.Thread(target=_precarregar_em_segundo_plano, name="precarga", daemon=True).start()
+    yield
+    encerrar_pool()
+    # Termina as escritas de artefatos ainda na fila
+    obter_armazem().encerrar()
+
+
+app = FastAPI(title="P2", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,4 +84,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api.router)
\ No newline at end of file
+
+@app.middleware("http")
+async def medir_requisicao(request: Request, call_next):
+    # Tempos das etapas da requisição: histogramas em /metrics e cabeçalho Server-Timing
+    coletor, token = iniciar_coleta()
+    inicio = time.perf_counter()
+    status, falhou = 500, True
+    try:
+        response = await call_next(request)
+        status, falhou = response.status_code, False
+        response.headers["Server-Timing"] = server_timing(coletor, time.perf_counter() - inicio)
+        return response
+    finally:
+        encerrar_coleta(token)
+        rota = request.scope.get("route")
+        registrar_requisicao(rota.path if rota is not None else "desconhecida", request.method, status,
+                             time.perf_counter() - inicio, coletor, falhou)
+
+
+app.include_router(api.router)
+app.include_router(api.router_metricas)
@@ -0,0 +1,245 @@
+import datetime
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+'''
+Armazém de artefatos (uploads, gravações do microfone e PNGs de espectrograma).
+
+As requisições só enfileiram a escrita e recebem na hora o caminho final,
+com um nome único (data + uuid, sem colisão entre requisições no mesmo
+segundo). Uma thread escreve os arquivos em segundo plano e aplica a
+retenção: apaga o que passou de ARTEFATOS_IDADE_MAX_HORAS e, acima de
+ARTEFATOS_TAMANHO_MAX_MB no total, os mais antigos.
+
+Com ARTEFATOS_ARQUIVAR=0 nada é gravado (implantações sensíveis à latência):
+os métodos retornam None e arquivos temporários entregues ao armazém são apagados.
+'''
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+PASTAS = {
+    "uploads": os.getenv("ARTEFATOS_UPLOADS_DIR", os.path.join(RAIZ, "audios_uploads")),
+    "gravacoes": os.getenv("ARTEFATOS_GRAVACOES_DIR", os.path.join(RAIZ, "audios")),
+    "espectrogramas": os.getenv("ESPECTROGRAMA_DIR", os.path.join(RAIZ, "relatorios", "espectogramas")),
+}
+ARQUIVAR = os.getenv("ARTEFATOS_ARQUIVAR", "1") != "0"
+IDADE_MAX_HORAS = float(os.getenv("ARTEFATOS_IDADE_MAX_HORAS", 24 * 7))
+TAMANHO_MAX_MB = float(os.getenv("ARTEFATOS_TAMANHO_MAX_MB", 1024))
+TAMANHO_MAX_FILA = int(os.getenv("ARTEFATOS_FILA_MAX", 256))
+INTERVALO_RETENCAO_SEGUNDOS = float(os.getenv("ARTEFATOS_INTERVALO_RETENCAO", 60))
+EXTENSOES = (".wav", ".png")  # Só artefatos completos entram na retenção (não os .tmp)
+
+
+def nome_unico(prefixo, extensao, sufixo=""):
+    """
+    Nome de arquivo único: prefixo, data/hora, 12 dígitos de um uuid4 e um sufixo opcional.
+    """
+    data = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    sufixo = f"_{sufixo}" if sufixo else ""
+    return f"{prefixo}_{data}_{uuid.uuid4().hex[:12]}{sufixo}{extensao}"
+
+
+class ArmazemArtefatos:
+
+    def __init__(self, pastas=PASTAS, arquivar=ARQUIVAR, idade_max_horas=IDADE_MAX_HORAS,
+                 tamanho_max_mb=TAMANHO_MAX_MB, tamanho_max_fila=TAMANHO_MAX_FILA,
+                 intervalo_retencao=INTERVALO_RETENCAO_SEGUNDOS):
+        self.pastas = dict(pastas)
+        self.arquivar = arquivar
+        self.idade_max = idade_max_horas * 3600
+        self.tamanho_max = tamanho_max_mb * 1024 * 1024
+        self.intervalo_retencao = intervalo_retencao
+        self._fila = queue.Queue(maxsize=tamanho_max_fila)
+        self._pendentes = {}  # caminho -> threading.Event, sinalizado quando a escrita termina
+        self._lock = threading.Lock()
+        self._thread = None
+        self.descartados = 0
+
+    def caminho(self, categoria, nome):
+        return os.path.join(self.pastas[categoria], nome)
+
+    def guardar_bytes(self, categoria, nome, dados):
+        """
+        Enfileira a escrita de bytes (ex.: um PNG).
+
+        Returns:
+            str or None: Caminho final do arquivo, ou None se o arquivamento estiver desligado.
+        """
+        return self._enfileirar(categoria, nome, _escrever_bytes, dados)
+
+    def guardar_wav(self, categoria, nome, signal, rate):
+        """
+        Enfileira a escrita de um sinal como WAV.
+
+        Returns:
+            str or None: Caminho final do arquivo, ou None se o arquivamento estiver desligado.
+        """
+        return self._enfileirar(categoria, nome, _escrever_wav, signal, rate)
+
+    def guardar_arquivo(self, categoria, nome, caminho_origem):
+        """
+        Enfileira a movimentação de um arquivo temporário para o armazém.
+        O armazém passa a ser dono do arquivo: se ele não for arquivado, é apagado.
+
+        Returns:
+            str or None: Caminho final do arquivo, ou None se o arquivamento estiver desligado.
+        """
+        caminho = self._enfileirar(categoria, nome, _mover_arquivo, caminho_origem)
+        if caminho is None:
+            _remover(caminho_origem)
+        return caminho
+
+    def aguardar(self, caminho, timeout=None):
+        """
+        Espera a escrita pendente de `caminho`, se houver (ex.: antes de reler o arquivo).
+        """
+        with self._lock:
+            evento = self._pendentes.get(caminho)
+        if evento is not None:
+            evento.wait(timeout)
+
+    def esvaziar(self):
+        """
+        Espera todas as escritas enfileiradas terminarem.
+        """
+        self._fila.join()
+
+    def encerrar(self):
+        if self._thread is not None:
+            self._fila.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def estado(self):
+        return {"arquivar": self.arquivar, "fila": self._fila.qsize(), "descartados": self.descartados}
+
+    def _enfileirar(self, categoria, nome, escrever, *args):
+        if not self.arquivar:
+            return None
+        caminho = self.caminho(categoria, nome)
+        evento = threading.Event()
+        with self._lock:
+            self._pendentes[caminho] = evento
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="armazem-artefatos", daemon=True)
+                self._thread.start()
+        try:
+            self._fila.put_nowait((caminho, escrever, args, evento))
+        except queue.Full:
+            # Fila cheia: o artefato é descartado em vez de atrasar a requisição
+            with self._lock:
+                self._pendentes.pop(caminho, None)
+                self.descartados += 1
+            evento.set()
+            print(f"Fila de artefatos cheia; {nome} não foi arquivado.")
+            if escrever is _mover_arquivo:
+                _remover(args[0])
+            return None
+        return caminho
+
+    def _executar(self):
+        ultima_retencao = 0.0
+        while True:
+            try:
+                tarefa = self._fila.get(timeout=self.intervalo_retencao)
+            except queue.Empty:
+                tarefa = ()
+
+            if tarefa is None:
+                self._fila.task_done()
+                return
+            if tarefa:
+                caminho, escrever, args, evento = tarefa
+                try:
+                    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                    escrever(caminho, *args)
+                except Exception as e:
+                    print(f"Erro ao arquivar {caminho}: {e}")
+                finally:
+                    with self._lock:
+                        self._pendentes.pop(caminho, None)
+                    evento.set()
+                    self._fila.task_done()
+
+            if time.monotonic() - ultima_retencao >= self.intervalo_retencao:
+                ultima_retencao = time.monotonic()
+                try:
+                    self.aplicar_retencao()
+                except Exception as e:
+                    print(f"Erro ao aplicar a retenção de artefatos: {e}")
+
+    def aplicar_retencao(self):
+        """
+        Apaga os artefatos mais velhos que a idade máxima e, se o total ainda passar
+        do tamanho máximo, os mais antigos até caber.
+
+        Returns:
+            int: Número de arquivos apagados.
+        """
+        arquivos = []
+        for pasta in set(self.pastas.values()):
+            if not os.path.isdir(pasta):
+                continue
+            for entrada in os.scandir(pasta):
+                if entrada.is_file() and entrada.name.endswith(EXTENSOES):
+                    try:
+                        info = entrada.stat()
+                    except FileNotFoundError:
+                        continue
+                    arquivos.append((info.st_mtime, info.st_size, entrada.path))
+
+        arquivos.sort()
+        limite = time.time() - self.idade_max
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        apagados = 0
+        for modificado_em, tamanho, caminho in arquivos:
+            if modificado_em >= limite and total <= self.tamanho_max:
+                break
+            _remover(caminho)
+            total -= tamanho
+            apagados += 1
+        return apagados
+
+
+def _escrever_atomico(caminho, escrever):
+    # Leitores (outra requisição, outro worker) nunca veem um arquivo pela metade
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    escrever(caminho_tmp)
+    os.replace(caminho_tmp, caminho)
+
+
+def _escrever_bytes(caminho, dados):
+    def escrever(destino):
+        with open(destino, "wb") as f:
+            f.write(dados)
+    _escrever_atomico(caminho, escrever)
+
+
+def _escrever_wav(caminho, signal, rate):
+    from scipy.io.wavfile import write
+    _escrever_atomico(caminho, lambda destino: write(destino, rate, signal))
+
+
+def _mover_arquivo(caminho, origem):
+    # No mesmo sistema de arquivos é só um rename; entre sistemas, cópia + rename
+    _escrever_atomico(caminho, lambda destino: shutil.move(origem, destino))
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+_armazem = None
+
+
+def obter_armazem():
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemArtefatos()
+    return _armazem
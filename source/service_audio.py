@@ -0,0 +1,108 @@
+import io
+import os
+
+import numpy as np
+
+
+def decodificar_wav(conteudo):
+    """
+    Decodifica um WAV que já está em memória (ex.: corpo de um upload).
+
+    Args:
+        conteudo (bytes): Bytes do arquivo WAV.
+
+    Returns:
+        tuple: (signal, rate) com o sinal mono no dtype original do arquivo.
+    """
+    from scipy.io import wavfile  # Carregado no primeiro uso: scipy.io importa também sparse/matlab
+
+    rate, signal = wavfile.read(io.BytesIO(conteudo))
+    return converter_para_mono(signal), rate
+
+
+TAMANHO_CABECALHO_WAV = 12  # "RIFF" + tamanho + "WAVE"
+TAMANHO_MAX_UPLOAD = int(os.getenv("UPLOAD_MAX_BYTES", 100 * 1024 * 1024))
+TAMANHO_PARTE_UPLOAD = 1024 * 1024  # Bytes lidos do upload e gravados no disco por vez
+
+
+def cabecalho_wav_valido(inicio):
+    """
+    Confere o início de um arquivo (primeiros 12 bytes) antes de recebê-lo inteiro.
+
+    Args:
+        inicio (bytes): Primeiros bytes do arquivo.
+
+    Returns:
+        bool: True se for um contêiner RIFF/WAVE (little ou big-endian).
+    """
+    return len(inicio) >= TAMANHO_CABECALHO_WAV and inicio[:4] in (b"RIFF", b"RIFX") and inicio[8:12] == b"WAVE"
+
+
+def ler_wav(caminho, mmap=False):
+    """
+    Lê um WAV do disco. Com mmap=True o sinal é um memory-map do arquivo,
+    sem cópia para a memória do processo (formatos que o scipy não consegue
+    mapear, como PCM de 24 bits, são carregados normalmente).
+
+    Args:
+        caminho (str): Caminho do arquivo WAV.
+        mmap (bool): Mapeia o arquivo em vez de carregá-lo.
+
+    Returns:
+        tuple: (signal, rate) com o sinal mono no dtype original do arquivo.
+    """
+    from scipy.io import wavfile
+
+    try:
+        rate, signal = wavfile.read(caminho, mmap=mmap)
+    except ValueError:
+        if not mmap:
+            raise
+        rate, signal = wavfile.read(caminho)
+    return converter_para_mono(signal), rate
+
+
+def converter_para_mono(signal):
+    '''Keeps only the first channel, as a view (no copy)'''
+    if signal.ndim > 1:
+        return signal[:, 0]
+    return signal
+
+
+def converter_para_float(signal):
+    """
+    Converte o sinal para float64 em [-1, 1), com a mesma escala usada pelo
+    soundfile, para que as características fiquem iguais às de sf.read.
+
+    Args:
+        signal (np.ndarray): Sinal PCM inteiro ou já em ponto flutuante.
+
+    Returns:
+        np.ndarray: Sinal em ponto flutuante.
+    """
+    if signal.dtype == np.uint8:
+        return (signal.astype(np.float64) - 128) / 128
+    if np.issubdtype(signal.dtype, np.integer):
+        return signal.astype(np.float64) / (np.iinfo(signal.dtype).max + 1)
+    return np.asarray(signal, dtype=np.float64)
+
+
+def converter_para_int16(signal):
+    """
+    Converte o sinal para PCM int16, respeitando a escala de cada formato de WAV:
+    uint8 (centrado em 128), inteiros maiores (só os 16 bits mais significativos)
+    e ponto flutuante em [-1, 1].
+
+    Args:
+        signal (np.ndarray): Sinal PCM inteiro ou em ponto flutuante.
+
+    Returns:
+        np.ndarray: Sinal int16 (o próprio array, se já for int16).
+    """
+    if signal.dtype == np.int16:
+        return signal
+    if signal.dtype == np.uint8:
+        return (signal.astype(np.int16) - 128) << 8
+    if np.issubdtype(signal.dtype, np.integer):
+        return (signal >> (8 * signal.dtype.itemsize - 16)).astype(np.int16)
+    return np.clip(np.rint(np.asarray(signal, dtype=np.float64) * 32767), -32768, 32767).astype(np.int16)
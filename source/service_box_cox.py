@@ -1,44 +1,178 @@
-_boxcox_lambda_val = 0  # Valor padrão para lambda (logaritmo)
+import numpy as np
+
+_boxcox_lambda_val = None  # None: estima um lambda por característica
 _boxcox_offset = 1e-7  # Pequeno valor para garantir que os dados sejam positivos
+_boxcox_lambdas_candidatos = np.linspace(-2, 2, 41)  # Grade de busca do lambda
+_boxcox_tamanho_bloco = 4096  # Linhas processadas por vez na estimação
+
 
-def boxcox_fit_transform(X, lambda_val=_boxcox_lambda_val, offset=_boxcox_offset):
+def _aplicar_boxcox(X_positive, lambda_val):
     """
-    Ajusta e transforma os dados usando a transformação Box-Cox simplificada,
-    e padroniza os dados resultantes (média 0, desvio padrão 1).
+    Aplica a transformação Box-Cox elemento a elemento. lambda_val pode ser
+    um escalar ou um array que faz broadcast com X_positive (ex.: um por coluna).
+    """
+    lambda_val = np.asarray(lambda_val, dtype=np.float64)
+    log_X = np.log(X_positive)
+    if lambda_val.ndim == 0:
+        if lambda_val == 0:
+            return log_X
+        return np.expm1(lambda_val * log_X) / lambda_val
+
+    lambda_seguro = np.where(lambda_val == 0, 1.0, lambda_val)
+    return np.where(lambda_val == 0, log_X, np.expm1(lambda_val * log_X) / lambda_seguro)
+
+
+def _transformar_colunas(X_positive, lambda_val, colunas):
+    """
+    Aplica o Box-Cox só nas colunas marcadas; as demais recebem x - 1
+    (lambda = 1), que a padronização deixa igual a padronizar x.
+    """
+    if colunas is None:
+        return _aplicar_boxcox(X_positive, lambda_val)
+    transformed = np.broadcast_to(X_positive - 1.0, np.broadcast(X_positive, lambda_val).shape).copy()
+    transformed[..., colunas] = _aplicar_boxcox(X_positive[..., colunas], np.asarray(lambda_val)[..., colunas])
+    return transformed
+
+
+def boxcox_partial_fit(boxcox_state, X_chunk, lambdas=_boxcox_lambdas_candidatos, offset=_boxcox_offset, colunas=None):
+    """
+    Acumula, para um bloco de dados, as estatísticas necessárias para escolher
+    o lambda de cada característica e para a padronização.
+
+    Para todos os lambdas candidatos e todas as colunas de uma vez, mantém
+    a média e a soma dos quadrados dos desvios (Welford/Chan) dos dados
+    transformados, além da soma de log(x). Assim o ajuste é feito em uma
+    única passada sobre blocos lidos do disco.
 
     Args:
-        X (np.ndarray): Matriz de características (n_amostras, n_caracteristicas).
-        lambda_val (float): O parâmetro lambda para a transformação Box-Cox.
+        boxcox_state (dict or None): Estado da chamada anterior (None no primeiro bloco).
+        X_chunk (np.ndarray): Bloco de amostras (n_amostras_bloco, n_caracteristicas).
+        lambdas (np.ndarray): Lambdas candidatos.
         offset (float): Um pequeno valor para garantir que os dados sejam positivos.
+        colunas (np.ndarray, optional): Máscara booleana das colunas transformadas
+                                        (as demais, que podem ser negativas, só são padronizadas).
+                                        None transforma todas.
 
     Returns:
-        tuple: (transformed_X, fitted_params) onde:
-            transformed_X (np.ndarray): Dados transformados e padronizados.
-            fitted_params (dict): Dicionário contendo 'mean' e 'std' para padronização.
+        dict: Estado atualizado.
     """
-    X_positive = X + offset
-
-    if lambda_val == 0:
-        transformed_X = np.log(X_positive)
+    X_positive = np.asarray(X_chunk, dtype=np.float64) + offset
+    chunk_samples = X_positive.shape[0]
+    if chunk_samples == 0:
+        return boxcox_state
+
+    if boxcox_state is not None:
+        colunas = boxcox_state['colunas']
+    elif colunas is not None:
+        colunas = np.asarray(colunas, dtype=bool)
+
+    lambdas = np.asarray(lambdas, dtype=np.float64)
+    # (n_lambdas, n_amostras, n_caracteristicas)
+    lambdas_colunas = np.broadcast_to(lambdas[:, None, None], (len(lambdas), 1, X_positive.shape[1]))
+    transformed = _transformar_colunas(X_positive[None, :, :], lambdas_colunas, colunas)
+    chunk_mean = transformed.mean(axis=1)
+    chunk_m2 = ((transformed - chunk_mean[:, None, :]) ** 2).sum(axis=1)
+    if colunas is None:
+        chunk_sum_log = np.log(X_positive).sum(axis=0)
     else:
-        transformed_X = (X_positive ** lambda_val - 1) / lambda_val
+        chunk_sum_log = np.zeros(X_positive.shape[1])
+        chunk_sum_log[colunas] = np.log(X_positive[:, colunas]).sum(axis=0)
+
+    if boxcox_state is None:
+        return {
+            'lambdas': lambdas,
+            'offset': offset,
+            'colunas': colunas,
+            'n_samples': chunk_samples,
+            'mean': chunk_mean,
+            'm2': chunk_m2,
+            'sum_log': chunk_sum_log,
+        }
+
+    previous_samples = boxcox_state['n_samples']
+    total_samples = previous_samples + chunk_samples
+    delta = chunk_mean - boxcox_state['mean']
+
+    boxcox_state['mean'] = boxcox_state['mean'] + delta * (chunk_samples / total_samples)
+    boxcox_state['m2'] = boxcox_state['m2'] + chunk_m2 + delta ** 2 * (previous_samples * chunk_samples / total_samples)
+    boxcox_state['sum_log'] = boxcox_state['sum_log'] + chunk_sum_log
+    boxcox_state['n_samples'] = total_samples
+    return boxcox_state
+
+
+def boxcox_finalize(boxcox_state):
+    """
+    Escolhe, para cada característica, o lambda de máxima verossimilhança e
+    retorna os parâmetros de padronização correspondentes.
 
-    # Padronização
-    feature_means = np.mean(transformed_X, axis=0)
-    feature_stds = np.std(transformed_X, axis=0)
-    # Evitar divisão por zero para características com desvio padrão zero
-    feature_stds[feature_stds == 0] = 1.0
+    Args:
+        boxcox_state (dict): Estado retornado por boxcox_partial_fit.
 
-    transformed_X = (transformed_X - feature_means) / feature_stds
+    Returns:
+        dict: Parâmetros no mesmo formato de boxcox_fit_transform (usáveis em boxcox_transform).
+    """
+    n = boxcox_state['n_samples']
+    lambdas = boxcox_state['lambdas']
+    variances = boxcox_state['m2'] / n
+
+    # Log-verossimilhança do Box-Cox: (lambda - 1) * soma(log x) - n/2 * log(variância)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_likelihood = (lambdas[:, None] - 1) * boxcox_state['sum_log'][None, :] - n / 2 * np.log(variances)
+    log_likelihood[~np.isfinite(log_likelihood)] = -np.inf
+
+    best = np.argmax(log_likelihood, axis=0)
+    columns = np.arange(len(best))
+
+    feature_means = boxcox_state['mean'][best, columns]
+    feature_stds = np.sqrt(variances[best, columns])
+    # Evitar divisão por zero para características com desvio padrão zero
+    feature_stds[~(feature_stds > 0)] = 1.0
 
     fitted_params = {
-        'lambda_val': lambda_val,
-        'offset': offset,
+        'lambda_val': lambdas[best],
+        'offset': boxcox_state['offset'],
         'mean': feature_means,
         'std': feature_stds
     }
+    colunas = boxcox_state['colunas']
+    if colunas is not None:
+        # Colunas fora do Box-Cox: a transformação x - 1 não depende do lambda candidato
+        fitted_params['lambda_val'] = np.where(colunas, fitted_params['lambda_val'], 1.0)
+        fitted_params['colunas'] = colunas
+    return fitted_params
+
+
+def boxcox_fit_transform(X, lambda_val=_boxcox_lambda_val, offset=_boxcox_offset, colunas=None):
+    """
+    Ajusta e transforma os dados usando a transformação Box-Cox,
+    e padroniza os dados resultantes (média 0, desvio padrão 1).
+
+    Args:
+        X (np.ndarray): Matriz de características (n_amostras, n_caracteristicas).
+        lambda_val (float or None): O parâmetro lambda para a transformação Box-Cox.
+                                    None estima o melhor lambda de cada característica.
+        offset (float): Um pequeno valor para garantir que os dados sejam positivos.
+        colunas (np.ndarray, optional): Máscara das colunas transformadas (ver boxcox_partial_fit).
 
-    return transformed_X, fitted_params
+    Returns:
+        tuple: (transformed_X, fitted_params) onde:
+            transformed_X (np.ndarray): Dados transformados e padronizados.
+            fitted_params (dict): Dicionário contendo 'lambda_val', 'offset', 'mean' e 'std'
+                                  (e 'colunas', se informado).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    lambdas = _boxcox_lambdas_candidatos if lambda_val is None else np.array([lambda_val], dtype=np.float64)
+
+    boxcox_state = None
+    for inicio in range(0, X.shape[0], _boxcox_tamanho_bloco):
+        boxcox_state = boxcox_partial_fit(boxcox_state, X[inicio:inicio + _boxcox_tamanho_bloco], lambdas, offset,
+                                          colunas)
+
+    fitted_params = boxcox_finalize(boxcox_state)
+    if lambda_val is not None:
+        fitted_params['lambda_val'] = lambda_val if colunas is None else np.where(colunas, lambda_val, 1.0)
+
+    return boxcox_transform(X, fitted_params), fitted_params
 
 
 def boxcox_transform(X, fitted_params):
@@ -57,12 +191,7 @@ def boxcox_transform(X, fitted_params):
     feature_means = fitted_params['mean']
     feature_stds = fitted_params['std']
 
-    X_positive = X + offset
-
-    if lambda_val == 0:
-        transformed_X = np.log(X_positive)
-    else:
-        transformed_X = (X_positive ** lambda_val - 1) / lambda_val
+    transformed_X = _transformar_colunas(X + offset, lambda_val, fitted_params.get('colunas'))
 
     transformed_X = (transformed_X - feature_means) / feature_stds
 
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from service_metricas import registrar_consulta_cache
+
+'''
+Cache de resultados por conteúdo.
+
+Uploads repetidos (retentativas do cliente, o frontend reenviando o mesmo
+trecho) têm o mesmo PCM decodificado. A chave é o hash desse PCM junto com
+a versão do pipeline, a versão do modelo e as saídas pedidas, então um
+novo deploy ou um novo modelo invalidam as entradas antigas sozinhos.
+
+Camadas:
+  - memória: LRU limitada por número de entradas e bytes, com TTL;
+  - disco (opcional, CACHE_RESULTADOS_DIR): um JSON por chave, compartilhado
+    pelos workers do uvicorn na mesma máquina, com TTL pela data de modificação.
+'''
+
+MAX_ITENS = int(os.getenv("CACHE_RESULTADOS_MAX", 256))
+MAX_BYTES = int(os.getenv("CACHE_RESULTADOS_MAX_BYTES", 16 * 1024 * 1024))
+TTL_SEGUNDOS = float(os.getenv("CACHE_RESULTADOS_TTL", 3600))
+DIRETORIO = os.getenv("CACHE_RESULTADOS_DIR", "")  # Vazio = só memória
+MAX_ITENS_DISCO = int(os.getenv("CACHE_RESULTADOS_DISCO_MAX", 10000))
+LIMPEZA_DISCO_A_CADA = 100  # Gravações entre duas limpezas do diretório
+
+
+def chave_resultado(id_audio, versao_pipeline, saidas, versao_modelo=None):
+    """
+    Chave do cache: conteúdo do áudio + versões + saídas pedidas (em qualquer ordem).
+
+    Returns:
+        str: Hash hexadecimal (também usado como nome de arquivo no disco).
+    """
+    partes = [id_audio, versao_pipeline, versao_modelo or "-", ",".join(sorted(saidas))]
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+class CacheResultados:
+
+    def __init__(self, max_itens=MAX_ITENS, max_bytes=MAX_BYTES, ttl=TTL_SEGUNDOS, diretorio=DIRETORIO,
+                 max_itens_disco=MAX_ITENS_DISCO):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.diretorio = diretorio
+        self.max_itens_disco = max_itens_disco
+        self._itens = OrderedDict()  # chave -> (expira_em, json), em ordem de uso (LRU)
+        self._bytes = 0
+        self._gravacoes_disco = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """
+        Returns:
+            dict or None: O resultado guardado para a chave, se existir e não tiver expirado.
+        """
+        item = self._itens.get(chave)
+        if item is not None:
+            expira_em, conteudo = item
+            if expira_em > time.monotonic():
+                self._itens.move_to_end(chave)
+                return self._acerto("memoria", conteudo)
+            self._remover(chave)
+
+        if self.diretorio:
+            conteudo = self._ler_disco(chave)
+            if conteudo is not None:
+                self._guardar_memoria(chave, conteudo)
+                return self._acerto("disco", conteudo)
+
+        self.falhas += 1
+        registrar_consulta_cache("falha")
+        return None
+
+    def guardar(self, chave, resultado):
+        conteudo = json.dumps(resultado, ensure_ascii=False)
+        self._guardar_memoria(chave, conteudo)
+        if self.diretorio:
+            self._gravar_disco(chave, conteudo)
+
+    def estatisticas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            "itens": len(self._itens),
+            "bytes": self._bytes,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+        }
+
+    def _acerto(self, camada, conteudo):
+        self.acertos += 1
+        registrar_consulta_cache(f"acerto_{camada}")
+        return json.loads(conteudo)
+
+    def _guardar_memoria(self, chave, conteudo):
+        tamanho = len(conteudo)
+        if tamanho > self.max_bytes:
+            return
+        if chave in self._itens:
+            self._remover(chave)
+        self._itens[chave] = (time.monotonic() + self.ttl, conteudo)
+        self._bytes += tamanho
+        while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+            self._remover(next(iter(self._itens)))
+
+    def _remover(self, chave):
+        _, conteudo = self._itens.pop(chave)
+        self._bytes -= len(conteudo)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            if time.time() - os.path.getmtime(caminho) > self.ttl:
+                os.remove(caminho)
+                return None
+            with open(caminho, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _gravar_disco(self, chave, conteudo):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(chave)
+        # Escrita atômica: outro worker pode estar lendo a mesma chave
+        caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+        with open(caminho_tmp, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.replace(caminho_tmp, caminho)
+
+        self._gravacoes_disco += 1
+        if self._gravacoes_disco % LIMPEZA_DISCO_A_CADA == 0:
+            self._limpar_disco()
+
+    def _limpar_disco(self):
+        """
+        Remove do disco as entradas expiradas e, acima do limite, as mais antigas.
+        """
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(".json"):
+                try:
+                    arquivos.append((entrada.stat().st_mtime, entrada.path))
+                except FileNotFoundError:
+                    continue  # Removido por outro worker
+
+        arquivos.sort()
+        limite = time.time() - self.ttl
+        excedentes = len(arquivos) - self.max_itens_disco
+        for posicao, (modificado_em, caminho) in enumerate(arquivos):
+            if modificado_em < limite or posicao < excedentes:
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+
+
+_cache = None
+
+
+def obter_cache_resultados():
+    global _cache
+    if _cache is None:
+        _cache = CacheResultados()
+    return _cache
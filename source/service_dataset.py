@@ -0,0 +1,95 @@
+import os
+import posixpath
+import zipfile
+
+from service_audio import decodificar_wav, ler_wav
+
+'''
+Leitura do dataset direto da origem, que pode ser o ZIP original ou um diretório.
+
+Os membros do ZIP são decodificados em memória, sem extrair o arquivo para o disco.
+A classe de cada áudio é o nome da pasta que o contém (ex.: .../Brincar/audio1.wav).
+'''
+
+
+def listar_amostras(origem, labels_map):
+    """
+    Lista os áudios rotulados de um ZIP ou diretório.
+
+    Args:
+        origem (str): Caminho do arquivo ZIP ou do diretório do dataset.
+        labels_map (dict): Mapeamento de nomes de classe para índices numéricos.
+
+    Returns:
+        list: Tuplas (membro, label_name), com as classes na ordem de labels_map
+              e os arquivos de cada classe em ordem alfabética.
+    """
+    if zipfile.is_zipfile(origem):
+        with zipfile.ZipFile(origem) as zf:
+            membros = [nome for nome in zf.namelist() if not nome.endswith("/")]
+        pasta_de = lambda membro: posixpath.basename(posixpath.dirname(membro))
+    else:
+        membros = []
+        for raiz, _, arquivos in os.walk(origem):
+            membros.extend(os.path.relpath(os.path.join(raiz, nome), origem) for nome in arquivos)
+        pasta_de = lambda membro: os.path.basename(os.path.dirname(membro))
+
+    por_classe = {label_name: [] for label_name in labels_map}
+    for membro in membros:
+        label_name = pasta_de(membro)
+        if membro.lower().endswith(".wav") and label_name in por_classe:
+            por_classe[label_name].append(membro)
+
+    amostras = []
+    for label_name, membros_classe in por_classe.items():
+        if not membros_classe:
+            print(f"Aviso: nenhum áudio da classe '{label_name}' encontrado em {origem}")
+        amostras.extend((membro, label_name) for membro in sorted(membros_classe))
+
+    return amostras
+
+
+def iterar_sinais(origem, membros):
+    """
+    Decodifica os membros indicados, abrindo o ZIP uma única vez.
+
+    Args:
+        origem (str): Caminho do arquivo ZIP ou do diretório do dataset.
+        membros (list): Membros retornados por listar_amostras.
+
+    Yields:
+        tuple: (membro, signal, rate, erro); em caso de erro, signal e rate são None.
+    """
+    zf = zipfile.ZipFile(origem) if zipfile.is_zipfile(origem) else None
+    try:
+        for membro in membros:
+            try:
+                if zf is not None:
+                    signal, rate = decodificar_wav(zf.read(membro))
+                else:
+                    signal, rate = ler_wav(os.path.join(origem, membro))
+            except Exception as e:
+                yield membro, None, None, str(e)
+                continue
+            yield membro, signal, rate, None
+    finally:
+        if zf is not None:
+            zf.close()
+
+
+def iterar_dataset(origem, labels_map):
+    """
+    Percorre o dataset inteiro como um fluxo de áudios decodificados, um de cada vez.
+
+    Args:
+        origem (str): Caminho do arquivo ZIP ou do diretório do dataset.
+        labels_map (dict): Mapeamento de nomes de classe para índices numéricos.
+
+    Yields:
+        tuple: (membro, label_name, signal, rate, erro), na ordem de listar_amostras;
+               em caso de erro, signal e rate são None.
+    """
+    amostras = listar_amostras(origem, labels_map)
+    rotulos = dict(amostras)
+    for membro, signal, rate, erro in iterar_sinais(origem, [membro for membro, _ in amostras]):
+        yield membro, rotulos[membro], signal, rate, erro
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from service_artefatos import PASTAS, obter_armazem
+
+'''
+Espectrogramas sob demanda.
+
+O pipeline só registra o áudio e devolve um id (hash do conteúdo). O PNG é
+renderizado apenas quando a rota /v1/espectrograma/{id} é chamada, e fica em
+cache na memória e no disco (pelo armazém de artefatos, se o arquivamento
+estiver ligado), então o mesmo áudio não é renderizado duas vezes.
+
+Os áudios registrados ficam na memória do processo: com vários workers do
+uvicorn, a rota só encontra o áudio no worker que o processou (ou o PNG já
+gravado em disco).
+'''
+
+PASTA_ESPECTROGRAMAS = PASTAS["espectrogramas"]
+MAX_AUDIOS_REGISTRADOS = int(os.getenv("ESPECTROGRAMA_MAX_AUDIOS", 32))
+MAX_PNGS_EM_MEMORIA = int(os.getenv("ESPECTROGRAMA_MAX_PNGS", 32))
+AMOSTRAS_POR_BLOCO_HASH = 1 << 20
+
+_audios_registrados = OrderedDict()  # id -> (signal, rate), em ordem de uso (LRU)
+_pngs_renderizados = OrderedDict()  # id -> bytes do PNG, em ordem de uso (LRU)
+
+
+def identificar_audio(signal, rate):
+    """
+    Calcula o id de conteúdo de um áudio (SHA-256 das amostras e da taxa).
+
+    Args:
+        signal (np.ndarray): Sinal de áudio mono.
+        rate (int): Taxa de amostragem em Hz.
+
+    Returns:
+        str: Id hexadecimal do áudio.
+    """
+    h = hashlib.sha256(str(rate).encode())
+    h.update(str(signal.dtype).encode())
+    # Em blocos: um canal de um WAV estéreo mapeado em memória não é copiado inteiro
+    for inicio in range(0, len(signal), AMOSTRAS_POR_BLOCO_HASH):
+        bloco = np.ascontiguousarray(signal[inicio:inicio + AMOSTRAS_POR_BLOCO_HASH])
+        h.update(memoryview(bloco).cast("B"))
+    return h.hexdigest()[:32]
+
+
+def registrar_audio(signal, rate, id_audio=None):
+    """
+    Guarda o áudio para renderização posterior do espectrograma.
+
+    Args:
+        id_audio (str): Id já calculado com identificar_audio, para não calcular o hash de novo.
+
+    Returns:
+        str: Id usado na rota /v1/espectrograma/{id}.
+    """
+    if id_audio is None:
+        id_audio = identificar_audio(signal, rate)
+    _audios_registrados[id_audio] = (signal, rate)
+    _audios_registrados.move_to_end(id_audio)
+    while len(_audios_registrados) > MAX_AUDIOS_REGISTRADOS:
+        _audios_registrados.popitem(last=False)
+    return id_audio
+
+
+def obter_audio_registrado(id_audio):
+    return _audios_registrados.get(id_audio)
+
+
+def _caminho_png(id_audio):
+    return os.path.join(PASTA_ESPECTROGRAMAS, f"espectrograma_{id_audio}.png")
+
+
+def _lembrar_png(id_audio, png):
+    _pngs_renderizados[id_audio] = png
+    _pngs_renderizados.move_to_end(id_audio)
+    while len(_pngs_renderizados) > MAX_PNGS_EM_MEMORIA:
+        _pngs_renderizados.popitem(last=False)
+
+
+def ler_espectrograma_em_cache(id_audio):
+    """
+    Returns:
+        bytes or None: O PNG já renderizado, se existir no cache em memória ou em disco.
+    """
+    png = _pngs_renderizados.get(id_audio)
+    if png is not None:
+        _pngs_renderizados.move_to_end(id_audio)
+        return png
+    try:
+        with open(_caminho_png(id_audio), "rb") as f:
+            png = f.read()
+    except FileNotFoundError:
+        return None
+    _lembrar_png(id_audio, png)
+    return png
+
+
+def salvar_espectrograma_em_cache(id_audio, png):
+    """
+    Guarda o PNG na memória e enfileira a gravação no armazém de artefatos
+    (escrita atômica, em segundo plano).
+
+    Returns:
+        str or None: Caminho do PNG, ou None com o arquivamento desligado.
+    """
+    _lembrar_png(id_audio, png)
+    return obter_armazem().guardar_bytes("espectrogramas", f"espectrograma_{id_audio}.png", png)
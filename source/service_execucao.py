@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from service_metricas import anotar_tempos, executar_medindo
+
+'''
+Pool de workers para as etapas numéricas (FFT, filtro, espectrograma).
+
+As etapas rodam fora do event loop do uvicorn. O número de tarefas aceitas
+é limitado: acima de NUM_WORKERS em execução + TAMANHO_MAX_FILA aguardando,
+novas tarefas são recusadas com FilaCheiaError (a API responde 503 com Retry-After).
+
+Os tempos das etapas medidos dentro do worker voltam junto com o resultado
+e são anotados na requisição que pediu a tarefa, além do tempo de espera na fila.
+'''
+
+NUM_WORKERS = int(os.getenv("AUDIO_WORKERS", os.cpu_count() or 1))
+TAMANHO_MAX_FILA = int(os.getenv("AUDIO_FILA_MAX", 2 * NUM_WORKERS))
+TIPO_POOL = os.getenv("AUDIO_POOL", "processo")  # "processo" ou "thread"
+RETRY_AFTER_SEGUNDOS = int(os.getenv("AUDIO_RETRY_AFTER", 1))
+
+_executor = None
+_tarefas_pendentes = 0  # Em execução + aguardando; só é alterado dentro do event loop
+
+
+class FilaCheiaError(Exception):
+    pass
+
+
+def iniciar_pool(inicializador=None):
+    """
+    Cria o pool (uma vez por processo do servidor).
+
+    Args:
+        inicializador (callable): Executado em cada worker ao subir (ex.: pré-carregar módulos).
+    """
+    global _executor
+    if _executor is None:
+        if TIPO_POOL == "thread":
+            _executor = ThreadPoolExecutor(max_workers=NUM_WORKERS, initializer=inicializador)
+        else:
+            _executor = ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=inicializador)
+            # Cria os processos já, antes de outras threads existirem: um fork feito
+            # enquanto outra thread importa um módulo herdaria o lock do import preso
+            _executor.submit(os.getpid)
+    return _executor
+
+
+def encerrar_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def executar_no_pool(func, *args):
+    """
+    Executa func(*args) no pool de workers sem bloquear o event loop.
+
+    Args:
+        func (callable): Função de nível de módulo (precisa ser serializável com pickle).
+        *args: Argumentos repassados para func.
+
+    Returns:
+        O valor retornado por func.
+
+    Raises:
+        FilaCheiaError: Se a fila de tarefas estiver cheia.
+    """
+    global _tarefas_pendentes
+    if _tarefas_pendentes >= NUM_WORKERS + TAMANHO_MAX_FILA:
+        raise FilaCheiaError("Fila de processamento cheia. Tente novamente em instantes.")
+
+    _tarefas_pendentes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        resultado, tempos, duracao_worker = await loop.run_in_executor(iniciar_pool(), executar_medindo, func, *args)
+        tempos.append(("espera_fila", max(0.0, time.perf_counter() - inicio - duracao_worker)))
+        anotar_tempos(tempos)
+        return resultado
+    finally:
+        _tarefas_pendentes -= 1
+
+
+def estado_fila():
+    return {
+        "workers": NUM_WORKERS,
+        "tipo_pool": TIPO_POOL,
+        "em_execucao": min(_tarefas_pendentes, NUM_WORKERS),
+        "na_fila": max(0, _tarefas_pendentes - NUM_WORKERS),
+        "capacidade_fila": TAMANHO_MAX_FILA,
+    }
@@ -1,81 +1,200 @@
-import soundfile as sf
+import io
 import numpy as np
-from scipy.fft import fft, fftfreq
-from scipy.signal import butter, lfilter
-import matplotlib.pyplot as plt
-import os
+from scipy.fft import next_fast_len, rfft
 
-def analisar_som_fourier(file:str):
+from service_audio import converter_para_float, converter_para_mono
+from service_filtros import filtrar
+from service_metricas import etapa
+from service_stft import PASSO_STFT, TAMANHO_QUADRO_STFT, como_audio
 
+def analisar_som_fourier(data, samplerate=None):
+
+    '''
+        Public analysis of the features payload: one FFT of the whole signal
+        (extrair_features_lote), as before the shared STFT. The STFT version
+        (extrair_features_stft_lote) is only used for the model feature schema.
+
+        data: an AudioRequisicao or a signal together with samplerate.
+    '''
     try:
+        audio = como_audio(data, samplerate)
+        return extrair_features_lote([audio.signal], [audio.rate])[0]
+
+    except Exception as e:
+
+        return {"erro": str(e)}
+
+def extrair_features_stft_lote(audios):
+
+    '''
+        Same features as extrair_features_lote, but the spectral ones come from
+        the mean magnitude spectrum of the shared STFT (AudioRequisicao.magnitude)
+        instead of one FFT of the whole signal. The STFT is computed once per
+        audio and reused by the spectrogram, the VAD and the LPC stages.
+
+        audios: list of AudioRequisicao.
+    '''
+
+    num_bins = TAMANHO_QUADRO_STFT // 2 - 1  # Strictly positive frequencies, without Nyquist
+    espectros = np.empty((len(audios), num_bins))
+    resolucao = np.empty(len(audios))
+    resultados = []
+
+    for i, audio in enumerate(audios):
+        amostras = audio.amostras
+        espectros[i] = audio.magnitude().mean(axis=0)[1:num_bins + 1]
+        resolucao[i] = audio.rate / TAMANHO_QUADRO_STFT  # Hz por bin
+
+        if len(amostras) < 2:
+            resultados.append({"erro": "Sinal curto demais para a análise de Fourier."})
+            continue
+
+        sinais_int = (amostras > 0).astype(np.int8) - (amostras < 0)
+        resultados.append({
+            "energia_total": float(np.dot(amostras, amostras)),
+            "media_abs": float(np.abs(amostras).mean()),
+            "zcr": float(np.abs(np.diff(sinais_int)).sum(dtype=np.int64) / (2 * len(amostras))),
+        })
+
+    '''Peak, spectral centroid and bandwidth of every audio at once, from the weighted moments'''
+    bins = np.arange(1, num_bins + 1, dtype=np.float64)
+    pico = np.argmax(espectros, axis=1)
+    pico_amplitude = espectros[np.arange(len(audios)), pico]
+    soma_amplitudes = espectros.sum(axis=1)
+    validos = soma_amplitudes > 0
+    divisor = np.where(validos, soma_amplitudes, 1.0)
+    momento_1 = espectros @ bins / divisor
+    momento_2 = espectros @ (bins * bins) / divisor
+    variancia = np.maximum(momento_2 - momento_1 ** 2, 0.0)
+
+    for i, features in enumerate(resultados):
+        if "erro" in features:
+            continue
+        features.update({
+            "pico_frequencia": float((pico[i] + 1) * resolucao[i]),
+            "pico_amplitude": float(pico_amplitude[i]),
+            "centroide_espectral": float(momento_1[i] * resolucao[i]) if validos[i] else 0.0,
+            "largura_banda_espectral": float(np.sqrt(variancia[i]) * resolucao[i]) if validos[i] else 0.0,
+            "status": "analisado"
+        })
+
+    return resultados
+
+def extrair_features_lote(sinais, samplerates, comprimentos=None, comprimento_rapido=False):
 
-        data, samplerate = sf.read(file) 
+    '''
+        Whole-signal version of the features: one FFT per signal instead of the
+        shared STFT. Used by the public analysis (analisar_som_fourier) and by
+        models whose feature schema predates the STFT (no "espectro" entry). Computes the features of many signals in one
+        vectorized pass and returns one feature dict per signal.
 
-        '''This excerpt convert audio for mono'''
-        if len(data.shape) > 1: 
-            data = data[:, 0]
+        sinais: list of 1-D arrays (ragged) or a 2-D padded array together
+        with comprimentos (the valid length of each row).
+        samplerates: one rate for the whole batch or one per signal.
+        comprimento_rapido: a single rfft of next_fast_len(max length) for the
+        whole batch. Faster, but zero padding changes the frequency grid, so the
+        spectral features become approximations of the exact ones.
+    '''
 
-        N = len(data) 
-        yf = fft(data) 
-        xf = fftfreq(N, 1 / samplerate)
+    '''This excerpt convert audio for mono, to the float scale of soundfile and pads the batch'''
+    if isinstance(sinais, np.ndarray) and sinais.ndim == 2:
+        matriz = converter_para_float(sinais)
+        if comprimentos is None:
+            comprimentos = np.full(len(matriz), matriz.shape[1])
+    else:
+        sinais = [converter_para_float(converter_para_mono(np.asarray(sinal))) for sinal in sinais]
+        if comprimentos is None:
+            comprimentos = [len(sinal) for sinal in sinais]
+        matriz = np.zeros((len(sinais), max(comprimentos, default=0)))
+        for linha, sinal in zip(matriz, sinais):
+            linha[:len(sinal)] = sinal
+
+    comprimentos = np.asarray(comprimentos, dtype=np.int64)
+    samplerates = np.broadcast_to(np.asarray(samplerates, dtype=np.float64), comprimentos.shape)
+    num_sinais = len(comprimentos)
+
+    '''Time domain features; the padding is zero, so it does not change the sums'''
+    energia_total = np.einsum("ij,ij->i", matriz, matriz)
+    media_abs = np.abs(matriz).sum(axis=1) / np.maximum(comprimentos, 1)
 
-        '''This excerpt filter frequencies positives and your correspondents amplitudes'''
-        idx = np.where(xf > 0) 
-        frequencias = xf[idx]
-        amplitudes = np.abs(yf[idx])
+    '''
+        Zero Crossing Rate, ignoring the transition from the last valid sample to the padding
+    '''
+    sinais_int = (matriz > 0).astype(np.int8) - (matriz < 0)
+    cruzamentos = np.abs(np.diff(sinais_int, axis=1))
+    mascara = np.arange(cruzamentos.shape[1]) < (comprimentos[:, None] - 1)
+    zcr = (cruzamentos * mascara).sum(axis=1, dtype=np.int64) / (2 * np.maximum(comprimentos, 1))
+
+    '''
+        Spectral features. Only the strictly positive frequencies of the full
+        FFT are used (bins 1 .. (N-1)//2), which are exactly those of the rfft.
+    '''
+    pico_frequencia = np.zeros(num_sinais)
+    pico_amplitude = np.zeros(num_sinais)
+    centroide_espectral = np.zeros(num_sinais)
+    largura_banda_espectral = np.zeros(num_sinais)
+
+    if comprimento_rapido:
+        grupos = [(next_fast_len(matriz.shape[1], real=True), np.arange(num_sinais))]
+    else:
+        grupos = [(int(n), np.flatnonzero(comprimentos == n)) for n in np.unique(comprimentos)]
+
+    for n_fft, indices in grupos:
+        num_bins = (n_fft - 1) // 2
+        if num_bins < 1:
+            continue
+
+        bloco = matriz if len(indices) == num_sinais else matriz[indices]
+        amplitudes = np.abs(rfft(bloco, n=n_fft, axis=1)[:, 1:num_bins + 1])
+        resolucao = samplerates[indices] / n_fft  # Hz por bin
+        bins = np.arange(1, num_bins + 1, dtype=np.float64)
 
         '''This excerpt displays exists characteristics'''
-        pico_frequencia = frequencias[np.argmax(amplitudes)] 
-        pico_amplitude = np.max(amplitudes)
-        energia_total = np.sum(data ** 2)
-        media_abs = np.mean(np.abs(data))
+        pico = np.argmax(amplitudes, axis=1)
+        pico_frequencia[indices] = (pico + 1) * resolucao
+        pico_amplitude[indices] = amplitudes[np.arange(len(indices)), pico]
 
         '''
             This excerpt calculate a spectral centroid,
-            this centroid is represented for weighted average   
+            this centroid is represented for weighted average
             of frequencies by amplitudes.
+            Spectral Bandwidth (a measure of frequency dispersion) is the standard
+            deviation of frequencies weighted by amplitudes, obtained here from
+            the first two weighted moments (two matrix-vector products).
         '''
-        if np.sum(amplitudes) > 0:
-            centroide_espectral = np.sum(frequencias * amplitudes) / np.sum(amplitudes)
-        else:
-            centroide_espectral = 0.0
+        soma_amplitudes = amplitudes.sum(axis=1)
+        validos = soma_amplitudes > 0
+        divisor = np.where(validos, soma_amplitudes, 1.0)
+        momento_1 = amplitudes @ bins / divisor
+        momento_2 = amplitudes @ (bins * bins) / divisor
+        variancia = np.maximum(momento_2 - momento_1 ** 2, 0.0)
+        centroide_espectral[indices] = np.where(validos, momento_1 * resolucao, 0.0)
+        largura_banda_espectral[indices] = np.where(validos, np.sqrt(variancia) * resolucao, 0.0)
 
-        '''
-            Spectral Bandwidth (a measure of frequency dispersion).
-            Calculates the standard deviation of frequencies weighted by amplitudes
-        '''
-        if np.sum(amplitudes) > 0:
-            largura_banda_espectral = np.sqrt(np.sum(amplitudes * (frequencias - centroide_espectral)**2) / np.sum(amplitudes))
-        else:
-            largura_banda_espectral = 0.0
+    resultados = []
+    for i in range(num_sinais):
+        n_fft = next_fast_len(matriz.shape[1], real=True) if comprimento_rapido else comprimentos[i]
+        if (n_fft - 1) // 2 < 1:
+            resultados.append({"erro": "Sinal curto demais para a análise de Fourier."})
+            continue
 
-        '''
-            Zero Crossing Rate
-        '''
-        zcr = np.sum(np.abs(np.diff(np.sign(data)))) / (2 * N)
-
-        return {
-            "pico_frequencia": float(pico_frequencia),
-            "pico_amplitude": float(pico_amplitude),
-            "energia_total": float(energia_total),
-            "media_abs": float(media_abs),
-            "centroide_espectral": float(centroide_espectral),
-            "largura_banda_espectral": float(largura_banda_espectral),
-            "zcr": float(zcr),
+        resultados.append({
+            "pico_frequencia": float(pico_frequencia[i]),
+            "pico_amplitude": float(pico_amplitude[i]),
+            "energia_total": float(energia_total[i]),
+            "media_abs": float(media_abs[i]),
+            "centroide_espectral": float(centroide_espectral[i]),
+            "largura_banda_espectral": float(largura_banda_espectral[i]),
+            "zcr": float(zcr[i]),
             "status": "analisado"
-        }
-    
-    except Exception as e:
+        })
 
-        return {"erro": str(e)}
-
-def filtro_passa_baixa(signal, rate, cutoff=4000):
+    return resultados
 
-    nyquist = 0.5 * rate
-    normal_cutoff = cutoff / nyquist
-    b, a = butter(6, normal_cutoff, btype='low', analog=False)
+def filtro_passa_baixa(signal, rate, cutoff=4000, fase_zero=False):
 
-    return lfilter(b, a, signal)
+    '''6th-order Butterworth with cached second-order sections (see service_filtros)'''
+    return filtrar(signal, rate, cutoff, ordem=6, fase_zero=fase_zero)
 
 def detectar_padroes(signal, rate):
 
@@ -93,24 +212,52 @@ def detectar_padroes(signal, rate):
     else:
         return "situação não identificada"
 
-def salvar_espectrograma(signal, rate, timestamp):
+def calcular_espectrograma(signal, rate=None, nfft=TAMANHO_QUADRO_STFT, noverlap=TAMANHO_QUADRO_STFT - PASSO_STFT):
+    '''
+        STFT power spectral density in dB, with the same parameters
+        plt.specgram used (Hann window, one-sided, scaled by frequency).
+        The power comes from the STFT cached on the AudioRequisicao.
+    '''
+    audio = como_audio(signal, rate)
+    passo = nfft - noverlap
+    potencia = audio.potencia(nfft, passo).T / (audio.rate * np.sum(audio.janela(nfft) ** 2))
+
+    '''One-sided density: every bin except DC (and Nyquist, for even nfft) counts twice'''
+    fim_dobro = potencia.shape[0] - 1 if nfft % 2 == 0 else potencia.shape[0]
+    potencia[1:fim_dobro] *= 2
+
+    frequencias = np.arange(potencia.shape[0]) * audio.rate / nfft
+    tempos = (np.arange(potencia.shape[1]) * passo + nfft / 2) / audio.rate
+    return frequencias, tempos, 10 * np.log10(np.maximum(potencia, 1e-20))
 
-    pasta = "../relatorios/espectogramas"
-    os.makedirs(pasta, exist_ok=True)
-    caminho = os.path.join(pasta, f"espectrograma_{timestamp}.png")
+def renderizar_espectrograma(signal, rate=None):
 
-    plt.figure(figsize=(10, 4))
-    plt.specgram(signal, Fs=rate, NFFT=1024, noverlap=512, cmap='inferno')
-    plt.title("Espectrograma de Áudio")
-    plt.xlabel("Tempo (s)")
-    plt.ylabel("Frequência (Hz)")
-    plt.colorbar(label='Intensidade')
-    plt.tight_layout()
-    plt.savefig(caminho)
-    plt.close()
+    '''Object-oriented Agg API: no global pyplot state, safe to call from several threads'''
+    audio = como_audio(signal, rate)
+    with etapa("stft"):
+        frequencias, tempos, potencia_db = calcular_espectrograma(audio)
+    duracao = audio.duracao
 
-    return caminho
+    with etapa("espectrograma"):
+        return _desenhar_espectrograma(frequencias, potencia_db, duracao)
 
+def _desenhar_espectrograma(frequencias, potencia_db, duracao):
 
+    # Importado só aqui: o matplotlib (~0,5 s) só é carregado quando um PNG é pedido
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
 
+    figura = Figure(figsize=(10, 4))
+    FigureCanvasAgg(figura)
+    eixo = figura.add_subplot()
+    imagem = eixo.imshow(potencia_db, origin="lower", aspect="auto", cmap="inferno",
+                         extent=(0, duracao, frequencias[0], frequencias[-1]))
+    eixo.set_title("Espectrograma de Áudio")
+    eixo.set_xlabel("Tempo (s)")
+    eixo.set_ylabel("Frequência (Hz)")
+    figura.colorbar(imagem, ax=eixo, label='Intensidade')
+    figura.tight_layout()
 
+    buffer = io.BytesIO()
+    figura.savefig(buffer, format="png")
+    return buffer.getvalue()
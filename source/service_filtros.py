@@ -0,0 +1,102 @@
+from functools import lru_cache
+
+import numpy as np
+
+'''
+Banco de filtros Butterworth em seções de segunda ordem (SOS).
+
+Os coeficientes são projetados uma vez por (taxa, corte, ordem, tipo) e
+reaproveitados. Há três modos de aplicação:
+  - filtrar: causal (sosfilt), para o caminho de serviço;
+  - filtrar(..., fase_zero=True): ida e volta (sosfiltfilt), sem atraso de
+    fase, para processamento offline/treino;
+  - FiltroStreaming: causal, mantendo o estado entre blocos (captura ao vivo).
+
+O scipy.signal (~0,6 s de import) só é carregado no primeiro uso, para que
+subir o servidor ou um worker não pague esse custo (ver server.py).
+'''
+
+
+@lru_cache(maxsize=64)
+def coeficientes_sos(rate, cutoff, ordem=6, tipo="low"):
+    """
+    Coeficientes SOS de um Butterworth, projetados uma vez por combinação de parâmetros.
+
+    Args:
+        rate (int): Taxa de amostragem em Hz.
+        cutoff (float): Frequência de corte em Hz.
+        ordem (int): Ordem do filtro.
+        tipo (str): "low" ou "high".
+
+    Returns:
+        np.ndarray or None: Matriz SOS (compartilhada; não modificar), ou None se o corte estiver
+                            na frequência de Nyquist ou acima (o filtro não muda o sinal).
+    """
+    from scipy.signal import butter
+
+    nyquist = 0.5 * rate
+    if cutoff >= nyquist:
+        return None
+    return butter(ordem, cutoff / nyquist, btype=tipo, output="sos")
+
+
+def filtrar(signal, rate, cutoff, ordem=6, tipo="low", fase_zero=False):
+    """
+    Aplica um Butterworth a um sinal inteiro.
+
+    Args:
+        signal (np.ndarray): Sinal de áudio.
+        rate (int): Taxa de amostragem em Hz.
+        cutoff (float): Frequência de corte em Hz.
+        ordem (int): Ordem do filtro.
+        tipo (str): "low" ou "high".
+        fase_zero (bool): Se True, filtra nos dois sentidos (sem atraso de fase,
+                          resposta de magnitude ao quadrado). Para uso offline.
+
+    Returns:
+        np.ndarray: Sinal filtrado em ponto flutuante.
+    """
+    from scipy.signal import sosfilt, sosfiltfilt
+
+    sos = coeficientes_sos(rate, float(cutoff), ordem, tipo)
+    if sos is None:
+        return np.asarray(signal, dtype=np.float64)
+    if fase_zero:
+        # Sinais curtos demais para o padding padrão usam o maior possível
+        padlen = min(3 * (2 * len(sos) + 1), len(signal) - 1)
+        return sosfiltfilt(sos, signal, padlen=max(padlen, 0))
+    return sosfilt(sos, signal)
+
+
+class FiltroStreaming:
+    """
+    Filtro causal que mantém o estado (zi) entre blocos, de modo que filtrar
+    um sinal em pedaços dá o mesmo resultado que filtrá-lo inteiro.
+    """
+
+    def __init__(self, rate, cutoff, ordem=6, tipo="low"):
+        self.sos = coeficientes_sos(rate, float(cutoff), ordem, tipo)
+        self._zi = None
+
+    def reiniciar(self):
+        self._zi = None
+
+    def processar(self, bloco):
+        """
+        Filtra um bloco, continuando do estado deixado pelo bloco anterior.
+
+        Args:
+            bloco (np.ndarray): Amostras do bloco.
+
+        Returns:
+            np.ndarray: Bloco filtrado em ponto flutuante.
+        """
+        from scipy.signal import sosfilt
+
+        if self.sos is None or len(bloco) == 0:
+            return np.asarray(bloco, dtype=np.float64)
+        if self._zi is None:
+            # Estado inicial zerado, como em filtrar()
+            self._zi = np.zeros((len(self.sos), 2))
+        filtrado, self._zi = sosfilt(self.sos, bloco, zi=self._zi)
+        return filtrado
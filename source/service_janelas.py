@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+from service_audio import ler_wav
+from service_fft import analisar_som_fourier
+from service_reamostragem import reamostrar
+from service_stft import AudioRequisicao
+from service_vad import detectar_segmento_fala
+
+'''
+Análise de gravações longas em janelas fixas.
+
+O WAV é mapeado em memória (mmap) e lido uma janela por vez: cada janela é
+copiada, reamostrada e analisada, e só as features dela ficam guardadas.
+A memória usada não depende da duração do arquivo, só de JANELA_SEGUNDOS.
+'''
+
+JANELA_SEGUNDOS = float(os.getenv("JANELA_ANALISE_SEGUNDOS", 10))
+# Acima desta duração, um upload só é analisado em janelas (o sinal inteiro não é carregado)
+DURACAO_MAX_INTEIRA_SEGUNDOS = float(os.getenv("DURACAO_MAX_INTEIRA_SEGUNDOS", 60))
+
+
+def analisar_janela(bloco, rate):
+    """
+    Features de Fourier (as mesmas da saída "features": FFT da janela inteira)
+    e presença de fala de uma janela.
+
+    Returns:
+        dict: Features da janela (ou {"erro": ...}) e "fala_detectada".
+    """
+    audio = AudioRequisicao(*reamostrar(bloco, rate))
+    features = analisar_som_fourier(audio)
+    _, _, features["fala_detectada"] = detectar_segmento_fala(audio)
+    return features
+
+
+def resumir_janelas(janelas, tamanhos):
+    """
+    Resumo da gravação inteira a partir das janelas: energia somada, médias
+    ponderadas pela duração de cada janela e o pico da janela mais forte.
+
+    Args:
+        janelas (list): Features de cada janela.
+        tamanhos (list): Número de amostras de cada janela.
+
+    Returns:
+        dict: Features agregadas.
+    """
+    validas = [(janela, tamanho) for janela, tamanho in zip(janelas, tamanhos) if "erro" not in janela]
+    resumo = {
+        "janelas": len(janelas),
+        "janelas_com_fala": sum(1 for janela in janelas if janela["fala_detectada"]),
+    }
+    if not validas:
+        resumo["erro"] = "Nenhuma janela pôde ser analisada."
+        return resumo
+
+    pesos = np.array([tamanho for _, tamanho in validas], dtype=np.float64)
+    pesos /= pesos.sum()
+    mais_forte = max(validas, key=lambda item: item[0]["pico_amplitude"])[0]
+
+    resumo["energia_total"] = float(sum(janela["energia_total"] for janela, _ in validas))
+    for nome in ("media_abs", "zcr", "centroide_espectral", "largura_banda_espectral"):
+        resumo[nome] = float(np.dot(pesos, [janela[nome] for janela, _ in validas]))
+    resumo["pico_frequencia"] = mais_forte["pico_frequencia"]
+    resumo["pico_amplitude"] = mais_forte["pico_amplitude"]
+    return resumo
+
+
+def analisar_em_janelas(caminho, janela_segundos=JANELA_SEGUNDOS):
+    """
+    Analisa um WAV do disco em janelas fixas, sem carregá-lo inteiro.
+
+    Args:
+        caminho (str): Caminho do arquivo WAV.
+        janela_segundos (float): Duração de cada janela.
+
+    Returns:
+        dict: Duração, taxa original, features de cada janela (com início e fim em
+              segundos) e o resumo agregado.
+    """
+    signal, rate = ler_wav(caminho, mmap=True)
+    tamanho_janela = max(1, int(rate * janela_segundos))
+
+    janelas, tamanhos = [], []
+    for inicio in range(0, len(signal), tamanho_janela):
+        # Cópia de uma janela só; o restante do arquivo continua no disco
+        bloco = np.array(signal[inicio:inicio + tamanho_janela])
+        janela = {"inicio_segundos": inicio / rate, "fim_segundos": (inicio + len(bloco)) / rate}
+        janela.update(analisar_janela(bloco, rate))
+        janelas.append(janela)
+        tamanhos.append(len(bloco))
+
+    return {
+        "duracao_segundos": len(signal) / rate,
+        "sample_rate": rate,
+        "janela_segundos": janela_segundos,
+        "janelas": janelas,
+        "resumo": resumir_janelas(janelas, tamanhos),
+    }
@@ -0,0 +1,148 @@
+import numpy as np
+from scipy.fft import irfft
+
+from service_stft import TAMANHO_QUADRO_STFT, como_audio
+
+'''
+Coeficientes de predição linear (LPC).
+
+As autocorrelações de todos os quadros saem do espectro de potência da STFT
+compartilhada (AudioRequisicao), com a pré-ênfase aplicada como um peso no
+espectro, e a recursão de Levinson-Durbin roda uma vez por ordem, vetorizada
+sobre os quadros de todos os sinais do lote. Os coeficientes de cada quadro
+são resumidos por média e desvio padrão, o que dá um vetor de tamanho fixo
+por áudio.
+'''
+
+ORDEM_LPC = 12
+PRE_ENFASE = 0.97
+ENERGIA_MINIMA = 1e-8  # Quadros mais silenciosos que isso não entram no resumo
+ERRO_MINIMO_RELATIVO = 1e-12  # Piso do erro de predição, relativo a r[0]
+
+
+def nomes_features_lpc(ordem=ORDEM_LPC):
+    """
+    Nomes das características geradas por resumir_lpc_lote, na ordem do vetor.
+    """
+    return ([f"lpc_media_{i}" for i in range(1, ordem + 1)] +
+            [f"lpc_desvio_{i}" for i in range(1, ordem + 1)])
+
+
+def autocorrelacao_potencia(potencia, tamanho_quadro, ordem, pre_enfase=PRE_ENFASE):
+    """
+    Autocorrelação de cada quadro até o atraso `ordem`, a partir do espectro de potência.
+
+    A pré-ênfase x[n] - pre_enfase * x[n-1] é aplicada multiplicando a potência
+    por |1 - pre_enfase * e^(-jw)|^2. Como a janela de Hann zera as bordas do quadro,
+    a autocorrelação circular coincide com a linear nos atrasos pequenos.
+
+    Args:
+        potencia (np.ndarray): Espectro de potência (n_quadros, tamanho_quadro // 2 + 1).
+        tamanho_quadro (int): Tamanho do quadro (e da FFT) da STFT.
+        ordem (int): Maior atraso calculado.
+        pre_enfase (float): Coeficiente da pré-ênfase (0 desativa).
+
+    Returns:
+        np.ndarray: Autocorrelações (n_quadros, ordem + 1).
+    """
+    omega = 2 * np.pi * np.arange(potencia.shape[1]) / tamanho_quadro
+    peso = 1 + pre_enfase ** 2 - 2 * pre_enfase * np.cos(omega)
+    return irfft(potencia * peso, n=tamanho_quadro, axis=1)[:, :ordem + 1]
+
+
+def levinson_durbin(r, ordem):
+    """
+    Resolve as equações de Yule-Walker de todos os quadros ao mesmo tempo.
+
+    Args:
+        r (np.ndarray): Autocorrelações (n_quadros, ordem + 1).
+        ordem (int): Ordem do preditor.
+
+    Quadros com r[:, 0] <= 0 (silêncio) recebem coeficientes nulos. Em quadros
+    quase perfeitamente previsíveis (ex.: periódicos) o erro de predição é
+    limitado a ERRO_MINIMO_RELATIVO * r[:, 0], então os coeficientes nunca
+    viram inf/NaN.
+
+    Returns:
+        tuple: (a, erro) onde:
+            a (np.ndarray): Polinômio A(z) de cada quadro (n_quadros, ordem + 1), com a[:, 0] = 1.
+            erro (np.ndarray): Erro de predição final de cada quadro.
+    """
+    n_quadros = r.shape[0]
+    a = np.zeros((n_quadros, ordem + 1))
+    a[:, 0] = 1.0
+    ativos = r[:, 0] > 0
+    erro = np.where(ativos, r[:, 0], 1.0)
+    piso = erro * ERRO_MINIMO_RELATIVO
+
+    for i in range(1, ordem + 1):
+        # k_i = -(sum_{j<i} a_j r_{i-j}) / erro; |k_i| <= 1 para uma autocorrelação válida
+        k = np.clip(-np.einsum("ij,ij->i", a[:, :i], r[:, i:0:-1]) / erro, -1.0, 1.0)
+        a[:, 1:i + 1] += k[:, None] * a[:, i - 1::-1].copy()
+        erro = np.maximum(erro * (1.0 - k * k), piso)
+
+    a[~ativos, 1:] = 0.0
+    erro[~ativos] = 0.0
+    return a, erro
+
+
+def resumir_lpc_lote(sinais, samplerates=None, ordem=ORDEM_LPC):
+    """
+    Calcula o resumo LPC (média e desvio padrão de cada coeficiente ao longo
+    dos quadros) de vários sinais.
+
+    Os espectros de potência de todos os sinais (mesmo tamanho de quadro) são
+    empilhados em uma única matriz, então o custo em Python não depende do
+    número de quadros nem do número de sinais.
+
+    Args:
+        sinais (list): AudioRequisicao de cada sinal, ou os sinais de áudio.
+        samplerates (list, optional): Taxa de amostragem de cada sinal (só com np.ndarray).
+        ordem (int): Ordem do preditor.
+
+    Returns:
+        list: Para cada sinal, um np.ndarray de tamanho 2 * ordem (ver nomes_features_lpc),
+              ou um dict {"erro": ...} se o sinal for curto demais.
+    """
+    if samplerates is None:
+        samplerates = [None] * len(sinais)
+    audios = [como_audio(signal, rate) for signal, rate in zip(sinais, samplerates)]
+    resultados = [{"erro": "Sinal muito curto para a análise LPC."}] * len(audios)
+
+    donos = [posicao for posicao, audio in enumerate(audios) if len(audio) > ordem]
+    if not donos:
+        return resultados
+
+    blocos = [audios[posicao].potencia() for posicao in donos]
+    potencia = np.concatenate(blocos) if len(blocos) > 1 else blocos[0]
+    contagens = np.array([len(bloco) for bloco in blocos])
+
+    r = autocorrelacao_potencia(potencia, TAMANHO_QUADRO_STFT, ordem)
+    validos = r[:, 0] > ENERGIA_MINIMA * TAMANHO_QUADRO_STFT
+    # Quadros silenciosos recebem uma autocorrelação neutra e ficam fora do resumo
+    r[~validos] = 0.0
+    r[~validos, 0] = 1.0
+    a, _ = levinson_durbin(r, ordem)
+    coeficientes = a[:, 1:] * validos[:, None]
+
+    # Somas por sinal de uma vez (os quadros de cada sinal são contíguos)
+    inicios = np.concatenate(([0], np.cumsum(contagens)[:-1]))
+    pesos = np.add.reduceat(validos.astype(np.float64), inicios)
+    somas = np.add.reduceat(coeficientes, inicios, axis=0)
+    somas_quadrados = np.add.reduceat(coeficientes * coeficientes, inicios, axis=0)
+
+    pesos_seguros = np.maximum(pesos, 1.0)[:, None]
+    medias = somas / pesos_seguros
+    desvios = np.sqrt(np.maximum(somas_quadrados / pesos_seguros - medias * medias, 0.0))
+
+    for posicao, media, desvio in zip(donos, medias, desvios):
+        resultados[posicao] = np.concatenate((media, desvio))
+
+    return resultados
+
+
+def resumir_lpc(signal, samplerate=None, ordem=ORDEM_LPC):
+    """
+    Resumo LPC de um único sinal (ver resumir_lpc_lote).
+    """
+    return resumir_lpc_lote([signal], [samplerate], ordem)[0]
@@ -0,0 +1,209 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+'''
+Métricas do serviço (formato Prometheus) e tempos por etapa.
+
+Cada etapa instrumentada com `etapa(nome)` anota sua duração no coletor da
+requisição atual (um contextvar). No fim da requisição, o middleware do
+servidor junta os tempos em histogramas e no cabeçalho Server-Timing.
+Etapas que rodam no pool de workers (outro processo) anotam em um coletor
+local do worker, e executar_medindo devolve os tempos junto com o resultado.
+
+O custo por etapa é um perf_counter e um append; o lock só é tomado uma vez
+por requisição, ao registrar nos histogramas.
+'''
+
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_coletor_atual = contextvars.ContextVar("coletor_etapas", default=None)
+_lock = threading.Lock()
+
+
+class Histograma:
+
+    def __init__(self, nome, descricao, rotulo, buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulo = rotulo
+        self.buckets = buckets
+        self._series = {}  # valor do rótulo -> [contagens por bucket..., soma, total]
+
+    def observar(self, valor_rotulo, valor):
+        serie = self._series.get(valor_rotulo)
+        if serie is None:
+            serie = self._series[valor_rotulo] = [0] * (len(self.buckets) + 2)
+        serie[bisect.bisect_left(self.buckets, valor)] += 1  # Índice len(buckets) = +Inf
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        for valor_rotulo, serie in sorted(self._series.items()):
+            rotulo = f'{self.rotulo}="{valor_rotulo}"'
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+            linhas.append(f'{self.nome}_bucket{{{rotulo},le="+Inf"}} {serie[-1]}')
+            linhas.append(f"{self.nome}_sum{{{rotulo}}} {serie[-2]}")
+            linhas.append(f"{self.nome}_count{{{rotulo}}} {serie[-1]}")
+        return linhas
+
+
+class Contador:
+
+    def __init__(self, nome, descricao, rotulos):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self._valores = {}
+
+    def incrementar(self, *valores_rotulos, quantidade=1):
+        self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + quantidade
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} counter"]
+        for valores, total in sorted(self._valores.items()):
+            rotulos = ",".join(f'{nome}="{valor}"' for nome, valor in zip(self.rotulos, valores))
+            linhas.append(f"{self.nome}{{{rotulos}}} {total}")
+        return linhas
+
+
+duracao_etapas = Histograma("audio_etapa_duracao_segundos", "Duração de cada etapa do pipeline.", "etapa")
+duracao_requisicoes = Histograma("audio_requisicao_duracao_segundos", "Duração das requisições HTTP.", "rota")
+requisicoes = Contador("audio_requisicoes_total", "Requisições HTTP por rota e status.", ("rota", "metodo", "status"))
+erros = Contador("audio_erros_total", "Requisições que terminaram em erro (5xx ou exceção) por rota.", ("rota",))
+consultas_cache = Contador("audio_cache_resultados_total", "Consultas ao cache de resultados por desfecho.",
+                           ("resultado",))
+
+_medidores = {}  # nome -> (descricao, funcao que retorna {rotulos: valor} ou um número)
+
+
+def registrar_medidor(nome, descricao, funcao):
+    """
+    Registra um gauge calculado na hora da coleta (ex.: tamanho da fila).
+    """
+    _medidores[nome] = (descricao, funcao)
+
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede a duração do bloco como a etapa `nome` da requisição atual.
+    Fora de uma requisição (ex.: treino), vai direto para o histograma.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        coletor = _coletor_atual.get()
+        if coletor is not None:
+            coletor.append((nome, duracao))
+        else:
+            with _lock:
+                duracao_etapas.observar(nome, duracao)
+
+
+def iniciar_coleta():
+    """
+    Abre um coletor de tempos para o contexto atual.
+
+    Returns:
+        tuple: (coletor, token); o token é usado em encerrar_coleta.
+    """
+    coletor = []
+    return coletor, _coletor_atual.set(coletor)
+
+
+def encerrar_coleta(token):
+    _coletor_atual.reset(token)
+
+
+def anotar_tempos(tempos):
+    """
+    Acrescenta ao coletor atual tempos medidos em outro lugar (ex.: no pool de workers).
+    """
+    coletor = _coletor_atual.get()
+    if coletor is not None:
+        coletor.extend(tempos)
+    else:
+        with _lock:
+            for nome, duracao in tempos:
+                duracao_etapas.observar(nome, duracao)
+
+
+def executar_medindo(func, *args):
+    """
+    Executa func(*args) com um coletor próprio. Roda dentro do pool de workers.
+
+    Returns:
+        tuple: (resultado, tempos, duracao), com tempos sendo a lista de (etapa, segundos)
+               medida durante a chamada e duracao o tempo total de execução no worker.
+    """
+    coletor, token = iniciar_coleta()
+    inicio = time.perf_counter()
+    try:
+        resultado = func(*args)
+    finally:
+        encerrar_coleta(token)
+    return resultado, coletor, time.perf_counter() - inicio
+
+
+def registrar_requisicao(rota, metodo, status, duracao, tempos, falhou=False):
+    """
+    Registra uma requisição concluída e os tempos das suas etapas.
+    """
+    with _lock:
+        duracao_requisicoes.observar(rota, duracao)
+        requisicoes.incrementar(rota, metodo, str(status))
+        if falhou or status >= 500:
+            erros.incrementar(rota)
+        for nome, duracao_etapa in tempos:
+            duracao_etapas.observar(nome, duracao_etapa)
+
+
+def registrar_consulta_cache(resultado):
+    """
+    Conta uma consulta ao cache de resultados ("acerto_memoria", "acerto_disco" ou "falha").
+    """
+    with _lock:
+        consultas_cache.incrementar(resultado)
+
+
+def server_timing(tempos, total):
+    """
+    Valor do cabeçalho Server-Timing: soma por etapa, na ordem em que apareceram, e o total.
+    """
+    somas = {}
+    for nome, duracao in tempos:
+        somas[nome] = somas.get(nome, 0.0) + duracao
+    partes = [f"{nome};dur={duracao * 1000:.2f}" for nome, duracao in somas.items()]
+    partes.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(partes)
+
+
+def exportar_metricas():
+    """
+    Todas as métricas no formato de texto do Prometheus.
+    """
+    with _lock:
+        linhas = []
+        for metrica in (requisicoes, erros, consultas_cache, duracao_requisicoes, duracao_etapas):
+            linhas.extend(metrica.exportar())
+
+    for nome, (descricao, funcao) in _medidores.items():
+        linhas.append(f"# HELP {nome} {descricao}")
+        linhas.append(f"# TYPE {nome} gauge")
+        valores = funcao()
+        if isinstance(valores, dict):
+            for rotulos, valor in valores.items():
+                linhas.append(f"{nome}{{{rotulos}}} {valor}")
+        else:
+            linhas.append(f"{nome} {valores}")
+
+    return "\n".join(linhas) + "\n"
@@ -1,73 +1,308 @@
-import time
-import numpy as np
-import threading
-import sounddevice as sd
 import datetime
 import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from service_artefatos import nome_unico, obter_armazem
+from service_audio import converter_para_int16, ler_wav
+from service_filtros import FiltroStreaming
+
+'''
+Captura do microfone.
+
+Cada gravação é uma sessão com id próprio; várias podem rodar ao mesmo tempo.
+O dispositivo entrega blocos de áudio por callback, que são copiados para um
+buffer circular pré-alocado (sem listas nem concatenação). Só o callback escreve
+no buffer, e o contador de amostras é publicado depois da cópia, então leitores
+podem consultar o buffer ao vivo sem lock e sem cópia.
+
+Com MICROFONE_ARQUIVO apontando para um WAV, um dispositivo falso reproduz
+o arquivo em tempo real no lugar do microfone (testes de carga sem áudio).
+
+Com SERVIDOR_HEADLESS=1 o microfone real nunca é aberto (nem o sounddevice
+importado): iniciar uma gravação falha com MicrofoneIndisponivelError (503).
+
+Com MICROFONE_FILTRO_HZ definido, cada bloco passa por um passa-baixa causal
+antes de ir para o buffer; o estado do filtro continua de um bloco para o
+outro, então o resultado é o mesmo de filtrar a gravação inteira.
+
+No máximo MICROFONE_SESSOES_MAX sessões ficam abertas ao mesmo tempo (além disso,
+503). Uma sessão que não é parada em MICROFONE_SESSAO_MAX segundos tem o dispositivo
+fechado e é descartada, sem arquivar o áudio.
+'''
+
+SAMPLERATE_PADRAO = 44100
+DURACAO_MAX_SEGUNDOS = float(os.getenv("MICROFONE_DURACAO_MAX", 120))
+TAMANHO_BLOCO = int(os.getenv("MICROFONE_BLOCO", 1024))
+ARQUIVO_FAKE = os.getenv("MICROFONE_ARQUIVO")
+FILTRO_HZ = float(os.getenv("MICROFONE_FILTRO_HZ", 0))  # 0 = sem filtro na captura
+HEADLESS = os.getenv("SERVIDOR_HEADLESS", "0") == "1"  # Servidor sem dispositivo de áudio
+SESSOES_MAX = int(os.getenv("MICROFONE_SESSOES_MAX", 4))
+SESSAO_MAX_SEGUNDOS = float(os.getenv("MICROFONE_SESSAO_MAX", 600))  # Tempo de vida de uma sessão esquecida
+
+_sessoes = {}  # Em ordem de início
+
+
+class BufferCircular:
+
+    def __init__(self, capacidade, dtype=np.int16):
+        self._dados = np.zeros(capacidade, dtype=dtype)
+        self._escritos = 0  # Total de amostras já escritas (só cresce)
+
+    @property
+    def capacidade(self):
+        return len(self._dados)
+
+    @property
+    def total_escrito(self):
+        return self._escritos
+
+    def __len__(self):
+        return min(self._escritos, self.capacidade)
+
+    def limpar(self):
+        self._escritos = 0
+
+    def escrever(self, bloco):
+        """
+        Copia um bloco para o buffer. Deve ser chamado por um único produtor (o callback).
+        Se o bloco não couber, as amostras mais antigas são sobrescritas.
+        """
+        bloco = bloco[-self.capacidade:]
+        n = len(bloco)
+        inicio = self._escritos % self.capacidade
+        primeira_parte = min(n, self.capacidade - inicio)
+        self._dados[inicio:inicio + primeira_parte] = bloco[:primeira_parte]
+        self._dados[:n - primeira_parte] = bloco[primeira_parte:]
+        # Publica as amostras só depois de copiadas
+        self._escritos += n
+
+    def visoes(self, n=None):
+        """
+        Retorna as últimas n amostras (todas, por padrão) como uma ou duas views
+        do buffer, em ordem cronológica. Nenhuma amostra é copiada.
+        """
+        escritos = self._escritos
+        disponiveis = min(escritos, self.capacidade)
+        n = disponiveis if n is None else min(n, disponiveis)
+        fim = escritos % self.capacidade
+        if fim == 0 and escritos > 0:
+            fim = self.capacidade
+        inicio = fim - n
+        if inicio >= 0:
+            return [self._dados[inicio:fim]]
+        return [self._dados[inicio:], self._dados[:fim]]
+
+    def ler(self, n=None):
+        """
+        Retorna as últimas n amostras como um array contíguo. Só copia
+        quando os dados dão a volta no buffer.
+        """
+        partes = self.visoes(n)
+        return partes[0] if len(partes) == 1 else np.concatenate(partes)
+
+
+class DispositivoArquivo:
+    """
+    Dispositivo de entrada falso: lê um WAV e chama o callback com blocos
+    no mesmo ritmo de um microfone real.
+    """
 
-from scipy.io.wavfile import write
-from dotenv import load_dotenv
+    def __init__(self, caminho, blocksize, callback, tempo_real=True, repetir=True):
+        signal, self.samplerate = ler_wav(caminho)
+        self._signal = converter_para_int16(signal)
+        self._blocksize = blocksize
+        self._callback = callback
+        self._tempo_real = tempo_real
+        self._repetir = repetir
+        self._ativo = False
+        self._thread = None
 
-is_recording_flag = False
-audio_data_buffer = []
-samplerate_global = 44100
-recording_thread = None
-audio_file_path = None
+    def start(self):
+        self._ativo = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
 
-def gravar_audio_microfone(samplerate=44100):
+    def _executar(self):
+        periodo = self._blocksize / self.samplerate
+        proximo = time.perf_counter()
+        posicao = 0
+        while self._ativo:
+            if posicao >= len(self._signal):
+                if not self._repetir:
+                    break
+                posicao = 0
+            bloco = self._signal[posicao:posicao + self._blocksize]
+            posicao += len(bloco)
+            self._callback(bloco[:, None], len(bloco), None, None)
 
-    global is_recording_flag, audio_data_buffer, samplerate_global, audio_file_path
-    if is_recording_flag:
-        return "Gravação já em andamento."
+            if self._tempo_real:
+                proximo += periodo
+                time.sleep(max(0.0, proximo - time.perf_counter()))
 
-    print("Gravando áudio...")
-    is_recording_flag = True
-    audio_data_buffer = []
-    samplerate_global = samplerate
+    def stop(self):
+        self._ativo = False
+        if self._thread is not None:
+            self._thread.join()
 
-    pasta = os.path.join(os.path.dirname(__file__), "..", "audios/")
-    os.makedirs(pasta, exist_ok=True)
-    audio_file_path = os.path.join(pasta, f"audio_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.wav")
+    def close(self):
+        pass
 
 
-    def gravaAudio():
-        with sd.InputStream(samplerate = samplerate, channels = 1, dtype = 'int16') as stream:
-            while is_recording_flag:
-                chunk, overflowed = stream.read(samplerate)
-                print("li")
-                audio_data_buffer.append(chunk)
-                time.sleep(0.1)
+class MicrofoneIndisponivelError(Exception):
+    pass
 
-        print("Thread de gravacao encerrada")
-        if audio_data_buffer:
-            final_audio = np.concatenate(audio_data_buffer, axis=0)
-            write(audio_file_path, samplerate_global, final_audio)
-            print(f"audio salvo em {audio_file_path}")
+
+class LimiteSessoesError(Exception):
+    pass
+
+
+def _abrir_microfone(samplerate, blocksize, callback):
+    if HEADLESS:
+        raise MicrofoneIndisponivelError("Servidor em modo headless: a captura do microfone está desativada.")
+    # Importado só aqui: o PortAudio não é necessário com o dispositivo falso nem no modo headless
+    import sounddevice as sd
+    return sd.InputStream(samplerate=samplerate, channels=1, dtype='int16',
+                          blocksize=blocksize, callback=callback)
+
+
+class SessaoGravacao:
+
+    def __init__(self, samplerate=SAMPLERATE_PADRAO, duracao_max=DURACAO_MAX_SEGUNDOS, arquivo=ARQUIVO_FAKE,
+                 tempo_vida=SESSAO_MAX_SEGUNDOS):
+        self.id = uuid.uuid4().hex
+        self.iniciada_em = datetime.datetime.now()
+        self.ativa = False
+        self.blocos_perdidos = 0
+        self.tempo_vida = tempo_vida
+        self._inicio = time.monotonic()
+        self._lock = threading.Lock()
+        self._expiracao = None
+
+        if arquivo:
+            self._dispositivo = DispositivoArquivo(arquivo, TAMANHO_BLOCO, self._callback)
+            samplerate = self._dispositivo.samplerate
         else:
-            print("nenhum audio foi gravado")
+            self._dispositivo = _abrir_microfone(samplerate, TAMANHO_BLOCO, self._callback)
+
+        self.samplerate = samplerate
+        self.buffer = BufferCircular(int(samplerate * duracao_max))
+        self._filtro = FiltroStreaming(samplerate, FILTRO_HZ) if FILTRO_HZ > 0 else None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.blocos_perdidos += 1
+        bloco = indata[:, 0]
+        if self._filtro is not None:
+            bloco = np.clip(np.rint(self._filtro.processar(bloco)), -32768, 32767).astype(np.int16)
+        self.buffer.escrever(bloco)
+
+    def iniciar(self):
+        self.ativa = True
+        self._dispositivo.start()
+        # Fecha o dispositivo de uma sessão esquecida mesmo sem nenhuma requisição chegar
+        self._expiracao = threading.Timer(self.tempo_vida, self.parar)
+        self._expiracao.daemon = True
+        self._expiracao.start()
+
+    def parar(self):
+        # Chamado pela requisição ou pelo timer de expiração, o que vier primeiro
+        with self._lock:
+            if self._expiracao is not None:
+                self._expiracao.cancel()
+            if self.ativa:
+                self.ativa = False
+                self._dispositivo.stop()
+                self._dispositivo.close()
+
+    def expirada(self):
+        return time.monotonic() - self._inicio >= self.tempo_vida
+
+    def estado(self):
+        return {
+            "sessao_id": self.id,
+            "ativa": self.ativa,
+            "sample_rate": self.samplerate,
+            "duracao_segundos": len(self.buffer) / self.samplerate,
+            "iniciada_em": self.iniciada_em.isoformat(),
+            "blocos_perdidos": self.blocos_perdidos,
+        }
+
+
+def _descartar_expiradas():
+    for sessao_id, sessao in list(_sessoes.items()):
+        if sessao.expirada():
+            del _sessoes[sessao_id]
+            sessao.parar()
+            print(f"Sessão {sessao_id} descartada: não foi parada em {sessao.tempo_vida:.0f} s")
+
+
+def iniciar_sessao(samplerate=SAMPLERATE_PADRAO, duracao_max=DURACAO_MAX_SEGUNDOS, arquivo=ARQUIVO_FAKE):
+    """
+    Inicia uma nova gravação.
+
+    Args:
+        samplerate (int): Taxa de amostragem do microfone.
+        duracao_max (float): Segundos mantidos no buffer; além disso, o início é sobrescrito.
+        arquivo (str, optional): WAV reproduzido por um dispositivo falso no lugar do microfone.
+
+    Returns:
+        str: Id da sessão.
+
+    Raises:
+        LimiteSessoesError: Se já houver SESSOES_MAX sessões em andamento.
+    """
+    _descartar_expiradas()
+    if len(_sessoes) >= SESSOES_MAX:
+        raise LimiteSessoesError(f"Limite de {SESSOES_MAX} gravações simultâneas atingido.")
+
+    sessao = SessaoGravacao(samplerate, duracao_max, arquivo, tempo_vida=SESSAO_MAX_SEGUNDOS)
+    _sessoes[sessao.id] = sessao
+    sessao.iniciar()
+    print(f"Gravando áudio (sessão {sessao.id})...")
+    return sessao.id
+
+
+def parar_sessao(sessao_id=None):
+    """
+    Para uma gravação e enfileira a gravação do áudio em audios/ (armazém de artefatos).
+
+    Args:
+        sessao_id (str, optional): Sessão a parar. Por padrão, a última iniciada.
+
+    Returns:
+        tuple: (signal, rate, caminho) com o áudio gravado; caminho é None com o arquivamento desligado.
+
+    Raises:
+        KeyError: Se a sessão não existir, já tiver sido parada ou tiver expirado.
+    """
+    _descartar_expiradas()
+    if sessao_id is None:
+        if not _sessoes:
+            raise KeyError("Nenhuma gravação em andamento.")
+        sessao_id = next(reversed(_sessoes))
+    sessao = _sessoes.pop(sessao_id)
+
+    print(f"Parando gravação (sessão {sessao_id})...")
+    sessao.parar()
+    # Cópia do tamanho gravado: o buffer (duração máxima) pode ser liberado
+    signal = np.array(sessao.buffer.ler())
 
-    global recording_thread
-    recording_thread = threading.Thread(target=gravaAudio)
-    recording_thread.start()
-    return f"Gravação iniciada e será salva em {audio_file_path}"
+    caminho = obter_armazem().guardar_wav("gravacoes", nome_unico("audio", ".wav", sessao_id[:8]),
+                                          signal, sessao.samplerate)
+    if caminho is not None:
+        print(f"audio será salvo em {caminho}")
 
-def stop_recording_continuous():
-    global is_recording_flag, recording_thread, audio_file_path
-    if not is_recording_flag:
-        return "Nenhuma gravação em andamento."
+    return signal, sessao.samplerate, caminho
 
-    print("Parando gravação contínua...")
-    is_recording_flag = False
-    if recording_thread and recording_thread.is_alive():
-        recording_thread.join()
 
-    if audio_file_path and os.path.exists(audio_file_path):
-        caminho_final = audio_file_path
-        audio_file_path = None
-        return caminho_final
-    else:
-        return "Erro: O arquivo de áudio não foi salvo ou encontrado."
+def estado_gravacoes():
+    _descartar_expiradas()
+    return [sessao.estado() for sessao in _sessoes.values()]
 
 
 def reconhecer_fala(caminho_audio:str):
-    pass
\ No newline at end of file
+    pass
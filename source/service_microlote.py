@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import numpy as np
+
+from service_modelo import classificar_vetores
+
+'''
+Micro-batching de inferência entre requisições.
+
+Vetores de características de requisições concorrentes são acumulados por
+até MICROLOTE_ESPERA_MS milissegundos (ou até MICROLOTE_MAX vetores) e
+classificados em uma única multiplicação de matrizes.
+'''
+
+MAX_LOTE = int(os.getenv("MICROLOTE_MAX", 32))
+MAX_ESPERA_MS = float(os.getenv("MICROLOTE_ESPERA_MS", 5))
+
+
+class MicroLote:
+
+    def __init__(self, max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS):
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self._pendentes = []  # (vetor, modelo, future)
+        self._timer = None
+
+    async def classificar(self, vetor, modelo):
+        """
+        Classifica um vetor de características junto com os das requisições concorrentes.
+
+        Args:
+            vetor (list or np.ndarray): Vetor de características de um áudio.
+            modelo (dict): Modelo retornado por service_modelo.carregar_modelo.
+
+        Returns:
+            np.ndarray: Probabilidades de cada classe para o vetor.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pendentes.append((vetor, modelo, future))
+
+        if len(self._pendentes) >= self.max_lote:
+            self._executar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_espera, self._executar)
+
+        return await future
+
+    def _executar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pendentes, self._pendentes = self._pendentes, []
+
+        # Um lote por modelo: após um recarregamento, vetores antigos usam o modelo com que foram extraídos
+        por_modelo = {}
+        for vetor, modelo, future in pendentes:
+            por_modelo.setdefault(id(modelo), (modelo, []))[1].append((vetor, future))
+
+        for modelo, itens in por_modelo.values():
+            try:
+                probabilidades = classificar_vetores(np.array([vetor for vetor, _ in itens]), modelo)
+            except Exception as e:
+                for _, future in itens:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), linha in zip(itens, probabilidades):
+                if not future.done():
+                    future.set_result(linha)
+
+
+_microlote = None
+
+
+def obter_microlote():
+    global _microlote
+    if _microlote is None:
+        _microlote = MicroLote()
+    return _microlote
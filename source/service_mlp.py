@@ -1,3 +1,26 @@
+import numpy as np
+
+
+# Funções de ativação
+def relu(x):
+    return np.maximum(0, x)
+
+
+def relu_derivative(x):
+    return (x > 0).astype(float)
+
+
+def softmax(x):
+    exp_scores = np.exp(x - np.max(x, axis=1, keepdims=True))
+    return exp_scores / np.sum(exp_scores, axis=1, keepdims=True)
+
+
+# Função de perda
+def cross_entropy_loss(predictions, targets_one_hot):
+    predictions = np.clip(predictions, 1e-12, 1 - 1e-12)
+    return -np.sum(targets_one_hot * np.log(predictions)) / len(predictions)
+
+
 def initialize_mlp_parameters(input_size, hidden_size, output_size):
     """
     Inicializa os pesos e vieses da rede MLP.
@@ -19,65 +42,203 @@ def initialize_mlp_parameters(input_size, hidden_size, output_size):
     return params
 
 
-def mlp_train(X, y, params, learning_rate=0.01, epochs=1000):
+def _inicializar_otimizador(otimizador, params):
+    if otimizador in ("gd", "sgd"):
+        return {}
+    if otimizador == "momentum":
+        return {"velocidade": {k: np.zeros_like(v) for k, v in params.items()}}
+    if otimizador == "adam":
+        return {
+            "m": {k: np.zeros_like(v) for k, v in params.items()},
+            "v": {k: np.zeros_like(v) for k, v in params.items()},
+            "tmp": {k: np.empty_like(v) for k, v in params.items()},
+            "t": 0,
+        }
+    raise ValueError(f"Otimizador desconhecido: {otimizador}")
+
+
+def _atualizar_parametros(otimizador, estado, params, grads, learning_rate,
+                          momentum, beta1, beta2, epsilon):
+    """
+    Aplica um passo do otimizador, alterando params no lugar (sem alocar arrays novos).
+    """
+    if otimizador == "adam":
+        estado["t"] += 1
+        correcao_1 = 1 - beta1 ** estado["t"]
+        correcao_2 = 1 - beta2 ** estado["t"]
+        passo = learning_rate * np.sqrt(correcao_2) / correcao_1
+
+    for chave, grad in grads.items():
+        if otimizador in ("gd", "sgd"):
+            params[chave] -= learning_rate * grad
+        elif otimizador == "momentum":
+            velocidade = estado["velocidade"][chave]
+            velocidade *= momentum
+            velocidade -= learning_rate * grad
+            params[chave] += velocidade
+        else:
+            m, v, tmp = estado["m"][chave], estado["v"][chave], estado["tmp"][chave]
+            m *= beta1
+            m += (1 - beta1) * grad
+            np.multiply(grad, grad, out=tmp)
+            v *= beta2
+            v += (1 - beta2) * tmp
+            np.sqrt(v, out=tmp)
+            tmp += epsilon
+            np.divide(m, tmp, out=tmp)
+            tmp *= passo
+            params[chave] -= tmp
+
+
+def mlp_train(X, y, params, learning_rate=0.01, epochs=1000, otimizador="gd", batch_size=None,
+              momentum=0.9, beta1=0.9, beta2=0.999, epsilon=1e-8, X_val=None, y_val=None,
+              paciencia=None, caminho_checkpoint=None, dtype=np.float32, random_state=None):
     """
     Treina o modelo MLP usando propagação feedforward e retropropagação.
 
+    O treino é feito em mini-lotes embaralhados a cada época. Os buffers de
+    ativações e gradientes são alocados uma única vez (tamanho do lote) e
+    reutilizados em todos os passos, então a memória usada não cresce com o dataset.
+    Os gradientes são somados no lote, como no treino em lote completo original.
+
     Args:
         X (np.ndarray): Matriz de características de treinamento.
         y (np.ndarray): Rótulos de treinamento (codificados numericamente, e.g., 0, 1, 2).
         params (dict): Dicionário de pesos e vieses do MLP.
         learning_rate (float): Taxa de aprendizado.
-        epochs (int): Número de épocas de treinamento.
+        epochs (int): Número máximo de épocas de treinamento.
+        otimizador (str): 'gd' (descida do gradiente), 'sgd', 'momentum' ou 'adam'.
+        batch_size (int, optional): Tamanho do mini-lote. None usa o conjunto inteiro.
+        momentum (float): Coeficiente do otimizador 'momentum'.
+        beta1 (float): Decaimento do primeiro momento do 'adam'.
+        beta2 (float): Decaimento do segundo momento do 'adam'.
+        epsilon (float): Termo de estabilidade numérica do 'adam'.
+        X_val (np.ndarray, optional): Características de validação para early stopping.
+        y_val (np.ndarray, optional): Rótulos de validação.
+        paciencia (int, optional): Épocas sem melhora da perda de validação antes de parar.
+        caminho_checkpoint (str, optional): Arquivo .npz onde os melhores parâmetros são salvos.
+        dtype (np.dtype): Tipo de ponto flutuante usado no treino.
+        random_state (int, optional): Semente do embaralhamento dos lotes.
 
     Returns:
-        dict: O dicionário de pesos e vieses atualizado após o treinamento.
+        dict: O dicionário de pesos e vieses atualizado após o treinamento
+              (os melhores, pela validação, quando X_val é informado).
     """
-    num_samples = X.shape[0]
+    X = np.ascontiguousarray(X, dtype=dtype)
+    y = np.asarray(y)
+    for chave in params:
+        params[chave] = np.ascontiguousarray(params[chave], dtype=dtype)
+
+    num_samples, input_size = X.shape
+    hidden_size = params['W1'].shape[1]
     output_size = params['W2'].shape[1]
+    batch_size = num_samples if batch_size is None else min(batch_size, num_samples)
+
+    # Buffers pré-alocados, reutilizados em todos os passos
+    X_batch = np.empty((batch_size, input_size), dtype=dtype)
+    hidden_layer_input = np.empty((batch_size, hidden_size), dtype=dtype)
+    hidden_layer_output = np.empty((batch_size, hidden_size), dtype=dtype)
+    hidden_mask = np.empty((batch_size, hidden_size), dtype=bool)
+    error_hidden = np.empty((batch_size, hidden_size), dtype=dtype)
+    error_output = np.empty((batch_size, output_size), dtype=dtype)
+    grads = {chave: np.empty_like(valor) for chave, valor in params.items()}
 
-    # Converter y para one-hot encoding
-    y_one_hot = np.zeros((num_samples, output_size))
-    y_one_hot[np.arange(num_samples), y] = 1
+    estado_otimizador = _inicializar_otimizador(otimizador, params)
+    rng = np.random.default_rng(random_state)
+    usar_validacao = X_val is not None and y_val is not None
+    melhor_perda = np.inf
+    melhores_params = None
+    epocas_sem_melhora = 0
 
     for epoch in range(epochs):
-        # Propagação Feedforward
-        # Camada de entrada para oculta
-        hidden_layer_input = np.dot(X, params['W1']) + params['b1']
-        hidden_layer_output = relu(hidden_layer_input)
+        ordem = rng.permutation(num_samples) if batch_size < num_samples else np.arange(num_samples)
+        perda_epoca = 0.0
+
+        for inicio in range(0, num_samples, batch_size):
+            indices = ordem[inicio:inicio + batch_size]
+            n = len(indices)
+            Xb = X_batch[:n]
+            np.take(X, indices, axis=0, out=Xb)
+            yb = y[indices]
+
+            # Propagação Feedforward
+            # Camada de entrada para oculta
+            h_in = np.dot(Xb, params['W1'], out=hidden_layer_input[:n])
+            h_in += params['b1']
+            h_out = np.maximum(h_in, 0, out=hidden_layer_output[:n])
+
+            # Camada oculta para saída (softmax no lugar)
+            out = np.dot(h_out, params['W2'], out=error_output[:n])
+            out += params['b2']
+            out -= out.max(axis=1, keepdims=True)
+            np.exp(out, out=out)
+            out /= out.sum(axis=1, keepdims=True)
 
-        # Camada oculta para saída
-        output_layer_input = np.dot(hidden_layer_output, params['W2']) + params['b2']
-        predictions = softmax(output_layer_input)
+            perda_epoca -= np.log(np.clip(out[np.arange(n), yb], 1e-12, 1.0)).sum()
 
-        # Cálculo do erro (derivada da perda em relação à saída)
-        error_output = predictions - y_one_hot
+            # Cálculo do erro (derivada da perda em relação à saída): predições - one-hot
+            out[np.arange(n), yb] -= 1
 
-        # Retropropagação
-        # Gradientes para pesos e vieses da camada oculta para saída
-        dW2 = np.dot(hidden_layer_output.T, error_output)
-        db2 = np.sum(error_output, axis=0, keepdims=True)
+            # Retropropagação
+            np.dot(h_out.T, out, out=grads['W2'])
+            np.sum(out, axis=0, keepdims=True, out=grads['b2'])
 
-        # Erro na camada oculta
-        error_hidden = np.dot(error_output, params['W2'].T) * relu_derivative(hidden_layer_input)
+            e_hidden = np.dot(out, params['W2'].T, out=error_hidden[:n])
+            e_hidden *= np.greater(h_in, 0, out=hidden_mask[:n])
 
-        # Gradientes para pesos e vieses da camada de entrada para oculta
-        dW1 = np.dot(X.T, error_hidden)
-        db1 = np.sum(error_hidden, axis=0, keepdims=True)
+            np.dot(Xb.T, e_hidden, out=grads['W1'])
+            np.sum(e_hidden, axis=0, keepdims=True, out=grads['b1'])
 
-        # Atualização dos pesos e vieses
-        params['W1'] -= learning_rate * dW1
-        params['b1'] -= learning_rate * db1
-        params['W2'] -= learning_rate * dW2
-        params['b2'] -= learning_rate * db2
+            # Atualização dos pesos e vieses
+            _atualizar_parametros(otimizador, estado_otimizador, params, grads, learning_rate,
+                                  momentum, beta1, beta2, epsilon)
+
+        perda_epoca /= num_samples
+
+        if usar_validacao:
+            perda_val = mlp_loss(X_val, y_val, params)
+            if perda_val < melhor_perda:
+                melhor_perda = perda_val
+                melhores_params = {chave: valor.copy() for chave, valor in params.items()}
+                epocas_sem_melhora = 0
+                if caminho_checkpoint is not None:
+                    np.savez(caminho_checkpoint, **melhores_params)
+            else:
+                epocas_sem_melhora += 1
 
         if epoch % 100 == 0:
-            loss = cross_entropy_loss(predictions, y_one_hot)
-            print(f"Época {epoch}, Perda: {loss:.4f}")
+            if usar_validacao:
+                print(f"Época {epoch}, Perda: {perda_epoca:.4f}, Perda validação: {perda_val:.4f}")
+            else:
+                print(f"Época {epoch}, Perda: {perda_epoca:.4f}")
+
+        if paciencia is not None and usar_validacao and epocas_sem_melhora >= paciencia:
+            print(f"Early stopping na época {epoch} (melhor perda de validação: {melhor_perda:.4f})")
+            break
+
+    if melhores_params is not None:
+        params.update(melhores_params)
 
     return params
 
 
+def mlp_loss(X, y, params):
+    """
+    Calcula a perda de entropia cruzada do modelo em um conjunto de dados.
+
+    Args:
+        X (np.ndarray): Matriz de características.
+        y (np.ndarray): Rótulos (codificados numericamente).
+        params (dict): Dicionário de pesos e vieses do MLP.
+
+    Returns:
+        float: Perda média.
+    """
+    predictions = mlp_predict_proba(X, params)
+    probabilidades_corretas = predictions[np.arange(len(predictions)), np.asarray(y)]
+    return float(-np.mean(np.log(np.clip(probabilidades_corretas, 1e-12, 1.0))))
+
+
 def mlp_predict_proba(X, params):
     """
     Realiza a propagação feedforward para obter as probabilidades de classe.
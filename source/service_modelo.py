@@ -0,0 +1,184 @@
+import datetime
+import json
+import os
+import uuid
+
+import numpy as np
+
+from service_box_cox import boxcox_transform
+from service_mlp import mlp_predict_proba
+from service_pca import pca_transform
+
+VERSAO_FORMATO = 1  # Incrementar quando o layout do pacote mudar
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_VERSAO_ATUAL = "ATUAL"
+DIRETORIO_MODELOS = os.getenv(
+    "MODELO_DIR", os.path.join(os.path.dirname(__file__), "..", "modelos")
+)
+
+# Ordem em que os estágios são aplicados na inferência
+_estagios = ("boxcox", "pca", "mlp")
+
+_modelo_carregado = None
+
+
+def salvar_modelo(diretorio, mlp_params, pca_params, labels_map, feature_schema, boxcox_params=None):
+    """
+    Grava um pacote versionado do modelo em disco.
+
+    Cada versão fica em diretorio/<versao>/ com um arquivo .npy por array
+    e um manifesto JSON com os escalares, o mapa de rótulos e o schema de
+    features. O arquivo diretorio/ATUAL aponta para a última versão gravada.
+
+    Args:
+        diretorio (str): Diretório raiz dos modelos.
+        mlp_params (dict): Pesos e vieses retornados por mlp_train.
+        pca_params (dict): Parâmetros retornados por pca_fit_transform.
+        labels_map (dict): Mapeamento de nomes de classe para índices numéricos.
+        feature_schema (dict): Descrição do vetor de características esperado.
+        boxcox_params (dict, optional): Parâmetros retornados por boxcox_fit_transform.
+
+    Returns:
+        str: Identificador da versão gravada.
+    """
+    # Data/hora + sufixo aleatório: dois treinos no mesmo segundo não gravam na mesma pasta
+    versao = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    pasta_versao = os.path.join(diretorio, versao)
+    os.makedirs(pasta_versao, exist_ok=False)
+
+    manifesto = {
+        "versao_formato": VERSAO_FORMATO,
+        "versao_modelo": versao,
+        "labels_map": {nome: int(idx) for nome, idx in labels_map.items()},
+        "feature_schema": feature_schema,
+        "estagios": {},
+    }
+
+    for estagio, params in zip(_estagios, (boxcox_params, pca_params, mlp_params)):
+        if params is None:
+            continue
+
+        arrays = {}
+        escalares = {}
+        for chave, valor in params.items():
+            if isinstance(valor, np.ndarray):
+                nome_arquivo = f"{estagio}_{chave}.npy"
+                np.save(os.path.join(pasta_versao, nome_arquivo), valor)
+                arrays[chave] = nome_arquivo
+            else:
+                escalares[chave] = valor.item() if isinstance(valor, np.generic) else valor
+
+        manifesto["estagios"][estagio] = {"arrays": arrays, "escalares": escalares}
+
+    with open(os.path.join(pasta_versao, ARQUIVO_MANIFESTO), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    # O ponteiro só é trocado depois que a versão está completa no disco
+    caminho_ponteiro = os.path.join(diretorio, ARQUIVO_VERSAO_ATUAL)
+    with open(caminho_ponteiro + ".tmp", "w", encoding="utf-8") as f:
+        f.write(versao)
+    os.replace(caminho_ponteiro + ".tmp", caminho_ponteiro)
+
+    return versao
+
+
+def carregar_modelo(diretorio=DIRETORIO_MODELOS, versao=None):
+    """
+    Carrega um pacote de modelo gravado por salvar_modelo.
+
+    Os arrays são abertos como memory-map (somente leitura), então vários
+    workers compartilham as mesmas páginas do arquivo.
+
+    Args:
+        diretorio (str): Diretório raiz dos modelos.
+        versao (str, optional): Versão a carregar. Por padrão, a indicada em ATUAL.
+
+    Returns:
+        dict: Modelo com 'versao', 'labels_map', 'classes', 'feature_schema'
+              e os parâmetros de cada estágio ('boxcox', 'pca', 'mlp').
+    """
+    if versao is None:
+        with open(os.path.join(diretorio, ARQUIVO_VERSAO_ATUAL), encoding="utf-8") as f:
+            versao = f.read().strip()
+
+    pasta_versao = os.path.join(diretorio, versao)
+    with open(os.path.join(pasta_versao, ARQUIVO_MANIFESTO), encoding="utf-8") as f:
+        manifesto = json.load(f)
+
+    if manifesto.get("versao_formato") != VERSAO_FORMATO:
+        raise ValueError(
+            f"Formato de modelo {manifesto.get('versao_formato')} não suportado (esperado {VERSAO_FORMATO})."
+        )
+
+    labels_map = manifesto["labels_map"]
+    modelo = {
+        "versao": manifesto["versao_modelo"],
+        "labels_map": labels_map,
+        "classes": [nome for nome, _ in sorted(labels_map.items(), key=lambda item: item[1])],
+        "feature_schema": manifesto["feature_schema"],
+    }
+
+    for estagio in _estagios:
+        dados = manifesto["estagios"].get(estagio)
+        if dados is None:
+            modelo[estagio] = None
+            continue
+
+        params = dict(dados["escalares"])
+        for chave, nome_arquivo in dados["arrays"].items():
+            params[chave] = np.load(os.path.join(pasta_versao, nome_arquivo), mmap_mode="r")
+        modelo[estagio] = params
+
+    return modelo
+
+
+def inicializar_modelo(diretorio=DIRETORIO_MODELOS):
+    """
+    Carrega o modelo uma única vez para o processo (chamado no startup do servidor).
+
+    Returns:
+        dict or None: O modelo carregado, ou None se não houver modelo treinado.
+    """
+    global _modelo_carregado
+    try:
+        _modelo_carregado = carregar_modelo(diretorio)
+        print(f"Modelo {_modelo_carregado['versao']} carregado de {diretorio}")
+    except FileNotFoundError:
+        _modelo_carregado = None
+        print(f"Aviso: nenhum modelo treinado encontrado em {diretorio}. Execute train.py.")
+    return _modelo_carregado
+
+
+def obter_modelo():
+    return _modelo_carregado
+
+
+def classificar_vetores(X, modelo):
+    """
+    Aplica os estágios ajustados (Box-Cox, PCA e MLP) a vetores de características.
+
+    Args:
+        X (np.ndarray): Matriz de características (n_amostras, n_caracteristicas).
+        modelo (dict): Modelo retornado por carregar_modelo.
+
+    Returns:
+        np.ndarray: Probabilidades para cada classe (n_amostras, n_classes).
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    if modelo["boxcox"] is not None:
+        X = boxcox_transform(X, modelo["boxcox"])
+    if modelo["pca"] is not None:
+        X = pca_transform(X, modelo["pca"])
+    return mlp_predict_proba(X, modelo["mlp"])
+
+
+def resultado_classificacao(probabilidades, modelo):
+    """
+    Corpo da resposta de classificação: classe prevista, probabilidade de cada classe e versão do modelo.
+    """
+    classes = modelo["classes"]
+    return {
+        "comando": classes[int(np.argmax(probabilidades))],
+        "probabilidades": {classe: float(p) for classe, p in zip(classes, probabilidades)},
+        "versao_modelo": modelo["versao"],
+    }
@@ -1,4 +1,7 @@
-def pca_fit_transform(X, n_components):
+import numpy as np
+
+
+def pca_fit_transform(X, n_components, metodo="auto", random_state=None, n_iter=4, oversampling=10):
     """
     Ajusta o PCA e transforma os dados, retornando os dados reduzidos
     e os componentes principais e a média para transformações futuras.
@@ -7,51 +10,174 @@ def pca_fit_transform(X, n_components):
         X (np.ndarray): Matriz de características (n_amostras, n_caracteristicas).
         n_components (int or float): Número de componentes a manter ou
                                      fração da variância a explicar (0 a 1).
+        metodo (str): 'eigh' (autovetores da covariância, matriz simétrica),
+                      'svd' (SVD dos dados centralizados), 'randomizado'
+                      (SVD randomizado, para muitas características) ou
+                      'auto' ('eigh' se houver mais amostras que características, senão 'svd').
+        random_state (int, optional): Semente do método 'randomizado'.
+        n_iter (int): Iterações de potência do método 'randomizado'.
+        oversampling (int): Colunas extras da projeção aleatória do método 'randomizado'.
 
     Returns:
         tuple: (reduced_data, pca_params) onde:
             reduced_data (np.ndarray): Dados com dimensionalidade reduzida.
-            pca_params (dict): Dicionário contendo 'components' e 'mean' do PCA.
+            pca_params (dict): Dicionário contendo 'components', 'mean' e 'explained_variance' do PCA.
     """
+    X = np.asarray(X, dtype=np.float64)
+    num_samples, num_features = X.shape
+
     # 1. Centralizar os dados
     data_mean = np.mean(X, axis=0)
     X_centered = X - data_mean
 
-    # 2. Calcular a matriz de covariância
-    # np.cov espera que cada coluna seja uma observação e cada linha uma variável
-    covariance_matrix = np.cov(X_centered, rowvar=False)
-
-    # 3. Calcular os autovalores e autovetores
-    eigenvalues, eigenvectors = np.linalg.eig(covariance_matrix)
-
-    # Autovetores são retornados como colunas; precisamos transpor para que cada linha seja um autovetor
-    eigenvectors = eigenvectors.T
-
-    # 4. Ordenar os autovetores pelos seus autovalores correspondentes em ordem decrescente
-    sorted_indices = np.argsort(eigenvalues)[::-1]
-    sorted_eigenvalues = eigenvalues[sorted_indices]
-    sorted_eigenvectors = eigenvectors[sorted_indices]
-
-    # 5. Selecionar os principais componentes
-    if 0 < n_components < 1:
-        cumulative_variance_ratio = np.cumsum(sorted_eigenvalues) / np.sum(sorted_eigenvalues)
-        num_components_to_keep = np.where(cumulative_variance_ratio >= n_components)[0][0] + 1
+    if metodo == "auto":
+        metodo = "eigh" if num_samples >= num_features else "svd"
+
+    # 2. Autovalores (variâncias) e autovetores (linhas), em ordem decrescente
+    if metodo == "eigh":
+        covariance_matrix = np.dot(X_centered.T, X_centered) / (num_samples - 1)
+        sorted_eigenvalues, sorted_eigenvectors = _autovetores_ordenados(covariance_matrix)
+        total_variance = np.sum(sorted_eigenvalues)
+    elif metodo == "svd":
+        _, singular_values, Vt = np.linalg.svd(X_centered, full_matrices=False)
+        sorted_eigenvalues = singular_values ** 2 / (num_samples - 1)
+        sorted_eigenvectors = Vt
+        total_variance = np.sum(sorted_eigenvalues)
+    elif metodo == "randomizado":
+        if 0 < n_components < 1:
+            raise ValueError("O método 'randomizado' exige um número inteiro de componentes.")
+        sorted_eigenvalues, sorted_eigenvectors = _svd_randomizado(
+            X_centered, int(n_components), n_iter, oversampling, random_state
+        )
+        # A variância total sai do traço, sem calcular todos os autovalores
+        total_variance = np.sum(X_centered ** 2) / (num_samples - 1)
     else:
-        num_components_to_keep = int(n_components)
+        raise ValueError(f"Método de PCA desconhecido: {metodo}")
+
+    sorted_eigenvectors = _fixar_sinais(sorted_eigenvectors)
 
+    # 3. Selecionar os principais componentes
+    num_components_to_keep = _numero_componentes(sorted_eigenvalues, total_variance, n_components)
     components = sorted_eigenvectors[:num_components_to_keep]
 
-    # 6. Projetar os dados
+    # 4. Projetar os dados
     reduced_data = np.dot(X_centered, components.T)
 
     pca_params = {
         'components': components,
-        'mean': data_mean
+        'mean': data_mean,
+        'explained_variance': sorted_eigenvalues[:num_components_to_keep]
     }
 
     return reduced_data, pca_params
 
 
+def pca_partial_fit(pca_state, X_chunk):
+    """
+    Acumula média e matriz de dispersão de um bloco de dados (PCA incremental).
+
+    Permite ajustar o PCA sobre características lidas do disco em blocos, sem
+    manter X inteiro em memória. Os blocos são combinados pela fórmula de
+    Chan et al. para médias e covariâncias, numericamente estável.
+
+    Args:
+        pca_state (dict or None): Estado retornado pela chamada anterior (None no primeiro bloco).
+        X_chunk (np.ndarray): Bloco de amostras (n_amostras_bloco, n_caracteristicas).
+
+    Returns:
+        dict: Estado atualizado com 'n_samples', 'mean' e 'scatter'.
+    """
+    X_chunk = np.asarray(X_chunk, dtype=np.float64)
+    chunk_samples = X_chunk.shape[0]
+    if chunk_samples == 0:
+        return pca_state
+
+    chunk_mean = np.mean(X_chunk, axis=0)
+    chunk_centered = X_chunk - chunk_mean
+    chunk_scatter = np.dot(chunk_centered.T, chunk_centered)
+
+    if pca_state is None:
+        return {'n_samples': chunk_samples, 'mean': chunk_mean, 'scatter': chunk_scatter}
+
+    previous_samples = pca_state['n_samples']
+    total_samples = previous_samples + chunk_samples
+    delta = chunk_mean - pca_state['mean']
+
+    pca_state['mean'] = pca_state['mean'] + delta * (chunk_samples / total_samples)
+    pca_state['scatter'] = (pca_state['scatter'] + chunk_scatter
+                            + np.outer(delta, delta) * (previous_samples * chunk_samples / total_samples))
+    pca_state['n_samples'] = total_samples
+    return pca_state
+
+
+def pca_finalize(pca_state, n_components):
+    """
+    Calcula os componentes principais a partir do estado acumulado por pca_partial_fit.
+
+    Args:
+        pca_state (dict): Estado retornado por pca_partial_fit.
+        n_components (int or float): Número de componentes a manter ou
+                                     fração da variância a explicar (0 a 1).
+
+    Returns:
+        dict: Parâmetros do PCA, no mesmo formato de pca_fit_transform (usáveis em pca_transform).
+    """
+    covariance_matrix = pca_state['scatter'] / (pca_state['n_samples'] - 1)
+    sorted_eigenvalues, sorted_eigenvectors = _autovetores_ordenados(covariance_matrix)
+    sorted_eigenvectors = _fixar_sinais(sorted_eigenvectors)
+
+    num_components_to_keep = _numero_componentes(sorted_eigenvalues, np.sum(sorted_eigenvalues), n_components)
+
+    return {
+        'components': sorted_eigenvectors[:num_components_to_keep],
+        'mean': pca_state['mean'],
+        'explained_variance': sorted_eigenvalues[:num_components_to_keep]
+    }
+
+
+def _autovetores_ordenados(covariance_matrix):
+    # eigh: matriz simétrica -> autovalores reais, em ordem crescente, e autovetores em colunas
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance_matrix)
+    eigenvalues = np.clip(eigenvalues[::-1], 0, None)
+    return eigenvalues, eigenvectors[:, ::-1].T
+
+
+def _svd_randomizado(X_centered, n_components, n_iter, oversampling, random_state):
+    """
+    SVD randomizado (Halko et al.): projeta os dados em um subespaço aleatório
+    pequeno e faz a SVD exata apenas nele.
+    """
+    num_samples = X_centered.shape[0]
+    rank = min(n_components + oversampling, *X_centered.shape)
+    rng = np.random.default_rng(random_state)
+
+    Q = np.dot(X_centered, rng.standard_normal((X_centered.shape[1], rank)))
+    Q, _ = np.linalg.qr(Q)
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(np.dot(X_centered.T, Q))
+        Q, _ = np.linalg.qr(np.dot(X_centered, Q))
+
+    _, singular_values, Vt = np.linalg.svd(np.dot(Q.T, X_centered), full_matrices=False)
+    return singular_values ** 2 / (num_samples - 1), Vt
+
+
+def _fixar_sinais(eigenvectors):
+    # O sinal de um autovetor é arbitrário; fixa a maior componente em módulo como positiva
+    # para que o mesmo dado gere sempre os mesmos componentes
+    maiores = np.argmax(np.abs(eigenvectors), axis=1)
+    sinais = np.sign(eigenvectors[np.arange(len(eigenvectors)), maiores])
+    sinais[sinais == 0] = 1
+    return eigenvectors * sinais[:, None]
+
+
+def _numero_componentes(sorted_eigenvalues, total_variance, n_components):
+    if 0 < n_components < 1:
+        cumulative_variance_ratio = np.cumsum(sorted_eigenvalues) / total_variance
+        atingidos = np.where(cumulative_variance_ratio >= n_components)[0]
+        return int(atingidos[0]) + 1 if len(atingidos) else len(sorted_eigenvalues)
+    return int(n_components)
+
+
 def pca_transform(X, pca_params):
     """
     Transforma novos dados usando os parâmetros ajustados do PCA.
@@ -72,26 +198,3 @@ def pca_transform(X, pca_params):
     # Projetar os dados
     reduced_data = np.dot(X_centered, components.T)
     return reduced_data
-
-
-import numpy as np
-
-
-# Funções de ativação
-def relu(x):
-    return np.maximum(0, x)
-
-
-def relu_derivative(x):
-    return (x > 0).astype(float)
-
-
-def softmax(x):
-    exp_scores = np.exp(x - np.max(x, axis=1, keepdims=True))
-    return exp_scores / np.sum(exp_scores, axis=1, keepdims=True)
-
-
-# Função de perda
-def cross_entropy_loss(predictions, targets_one_hot):
-    predictions = np.clip(predictions, 1e-12, 1 - 1e-12)
-    return -np.sum(targets_one_hot * np.log(predictions)) / len(predictions)
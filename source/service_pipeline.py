@@ -0,0 +1,149 @@
+import inspect
+
+'''
+Pipeline declarativo de etapas nomeadas.
+
+Cada etapa declara de quais outras depende e grava seu resultado no
+contexto com o próprio nome. Cada saída pública (ex.: "comando",
+"features") declara as etapas de que precisa e como formatar o resultado.
+Pedindo algumas saídas, só as etapas necessárias para elas rodam, em ordem
+topológica, cada uma no máximo uma vez.
+
+Etapas numéricas rodam no worker (pool de processos), todas na mesma
+tarefa; etapas marcadas com no_worker=False rodam no event loop (podem ser
+async) e recebem do worker apenas os valores de que dependem.
+'''
+
+
+class Etapa:
+
+    def __init__(self, nome, funcao, dependencias, no_worker):
+        self.nome = nome
+        self.funcao = funcao
+        self.dependencias = tuple(dependencias)
+        self.no_worker = no_worker
+
+
+class Saida:
+
+    def __init__(self, nome, dependencias, formatar):
+        self.nome = nome
+        self.dependencias = tuple(dependencias)
+        self.formatar = formatar
+
+
+class Plano:
+    """
+    Resultado de Pipeline.planejar: o que roda onde e o que o worker devolve.
+    """
+
+    def __init__(self, saidas, etapas_worker, etapas_loop, saidas_worker, saidas_loop, transferir):
+        self.saidas = saidas
+        self.etapas_worker = etapas_worker
+        self.etapas_loop = etapas_loop
+        self.saidas_worker = saidas_worker
+        self.saidas_loop = saidas_loop
+        self.transferir = transferir  # Valores do worker usados por etapas do loop
+
+
+class Pipeline:
+
+    def __init__(self):
+        self.etapas = {}
+        self.saidas = {}
+
+    def etapa(self, nome, dependencias=(), no_worker=True):
+        """
+        Decorador que registra uma etapa. A função recebe o contexto (dict)
+        e retorna o valor da etapa.
+        """
+        def registrar(funcao):
+            for dependencia in dependencias:
+                if dependencia not in self.etapas:
+                    raise ValueError(f"Etapa '{nome}' depende de '{dependencia}', que não foi registrada.")
+                if no_worker and not self.etapas[dependencia].no_worker:
+                    raise ValueError(f"Etapa de worker '{nome}' não pode depender da etapa do loop '{dependencia}'.")
+            self.etapas[nome] = Etapa(nome, funcao, dependencias, no_worker)
+            return funcao
+        return registrar
+
+    def saida(self, nome, dependencias):
+        """
+        Decorador que registra uma saída pública. A função recebe o contexto
+        e retorna um dict com os campos da resposta.
+        """
+        def registrar(formatar):
+            self.saidas[nome] = Saida(nome, dependencias, formatar)
+            return formatar
+        return registrar
+
+    def resolver(self, nomes):
+        """
+        Etapas necessárias para calcular `nomes`, dependências primeiro.
+        """
+        ordem, visitadas = [], set()
+
+        def visitar(nome):
+            if nome in visitadas:
+                return
+            visitadas.add(nome)
+            for dependencia in self.etapas[nome].dependencias:
+                visitar(dependencia)
+            ordem.append(nome)
+
+        for nome in nomes:
+            visitar(nome)
+        return ordem
+
+    def planejar(self, saidas):
+        """
+        Monta o plano de execução das saídas pedidas.
+
+        Raises:
+            ValueError: Se alguma saída não existir.
+        """
+        desconhecidas = [nome for nome in saidas if nome not in self.saidas]
+        if desconhecidas:
+            raise ValueError(f"Saídas desconhecidas: {', '.join(desconhecidas)}. "
+                             f"Disponíveis: {', '.join(self.saidas)}.")
+
+        ordem = self.resolver([dependencia for nome in saidas for dependencia in self.saidas[nome].dependencias])
+        etapas_worker = [nome for nome in ordem if self.etapas[nome].no_worker]
+        etapas_loop = [nome for nome in ordem if not self.etapas[nome].no_worker]
+
+        def roda_no_worker(saida):
+            return all(self.etapas[nome].no_worker for nome in self.resolver(self.saidas[saida].dependencias))
+
+        saidas_worker = [nome for nome in saidas if roda_no_worker(nome)]
+        saidas_loop = [nome for nome in saidas if not roda_no_worker(nome)]
+        transferir = sorted({dependencia for nome in etapas_loop for dependencia in self.etapas[nome].dependencias
+                             if self.etapas[dependencia].no_worker}
+                            | {dependencia for nome in saidas_loop for dependencia in self.saidas[nome].dependencias
+                               if self.etapas[dependencia].no_worker})
+
+        return Plano(list(saidas), etapas_worker, etapas_loop, saidas_worker, saidas_loop, transferir)
+
+    def executar(self, contexto, etapas):
+        """
+        Executa etapas síncronas em ordem, pulando as que já estão no contexto.
+        """
+        for nome in etapas:
+            if nome not in contexto:
+                contexto[nome] = self.etapas[nome].funcao(contexto)
+        return contexto
+
+    async def executar_async(self, contexto, etapas):
+        """
+        Como executar, aguardando as etapas que forem corrotinas.
+        """
+        for nome in etapas:
+            if nome not in contexto:
+                valor = self.etapas[nome].funcao(contexto)
+                contexto[nome] = await valor if inspect.isawaitable(valor) else valor
+        return contexto
+
+    def formatar(self, contexto, saidas):
+        resultado = {}
+        for nome in saidas:
+            resultado.update(self.saidas[nome].formatar(contexto))
+        return resultado
@@ -1,53 +1,251 @@
 import numpy as np
-import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-from service_fft import analisar_som_fourier
+from service_dataset import iterar_dataset, iterar_sinais, listar_amostras
+from service_fft import extrair_features_lote, extrair_features_stft_lote
+from service_metricas import etapa
+from service_lpc import ORDEM_LPC, nomes_features_lpc, resumir_lpc_lote
+from service_reamostragem import TAXA_CANONICA, reamostrar
+from service_stft import AudioRequisicao
+from service_vad import aparar_silencio
 
-def load_and_extract_features(audio_dir, labels_map):
+# Ordem das características no vetor de entrada do modelo (schema de features)
+NOMES_FEATURES = [
+    "pico_frequencia",
+    "pico_amplitude",
+    "energia_total",
+    "media_abs",
+    "centroide_espectral",
+    "largura_banda_espectral",
+    "zcr",
+]
+
+# Schema gravado junto com o modelo: o serviço extrai as features do mesmo jeito que o treino
+SCHEMA_FEATURES = {
+    "features": NOMES_FEATURES + nomes_features_lpc(ORDEM_LPC),
+    "aparar_silencio": True,  # Silêncio antes e depois da fala removido (service_vad)
+    "lpc": {"ordem": ORDEM_LPC},  # Resumo LPC (service_lpc) anexado às features de Fourier
+    "espectro": "stft",  # Features espectrais da STFT compartilhada (service_stft)
+    "taxa_amostragem": TAXA_CANONICA,  # Sinais reamostrados antes da extração (service_reamostragem)
+}
+
+
+def montar_vetor_features(features):
+    """
+    Converte o dicionário retornado por analisar_som_fourier no vetor
+    de características, na ordem definida por NOMES_FEATURES.
+
+    Args:
+        features (dict): Dicionário de características de um áudio.
+
+    Returns:
+        list: Vetor de características ordenado.
+    """
+    return [features[nome] for nome in NOMES_FEATURES]
+
+def extrair_vetores(sinais, taxas, feature_schema=SCHEMA_FEATURES):
+    """
+    Extrai os vetores de características de vários sinais de uma vez, seguindo
+    o schema do modelo (modelos antigos, sem "taxa_amostragem", usam a taxa original;
+    sem "aparar_silencio", o sinal inteiro; sem "lpc", só as features de Fourier;
+    sem "espectro", uma FFT do sinal inteiro).
+
+    Cada sinal vira um AudioRequisicao, então a STFT é calculada uma única vez
+    e usada tanto pelas features espectrais quanto pelo LPC.
+
+    Args:
+        sinais (list): Sinais de áudio mono (ou AudioRequisicao, com taxas None).
+        taxas (list): Taxa de amostragem de cada sinal.
+        feature_schema (dict): Schema de features do modelo.
+
+    Returns:
+        list: Para cada sinal, uma tupla (vetor_de_caracteristicas, erro, segmento_fala);
+              vetor ou erro é None, e segmento_fala é None quando o sinal não é aparado.
+    """
+    audios = [signal if isinstance(signal, AudioRequisicao) else AudioRequisicao(signal, rate)
+              for signal, rate in zip(sinais, taxas)]
+
+    taxa = feature_schema.get("taxa_amostragem")
+    if taxa:
+        audios = [audio if audio.rate == taxa else AudioRequisicao(*reamostrar(audio.signal, audio.rate, taxa))
+                  for audio in audios]
+
+    segmentos = [None] * len(audios)
+    if feature_schema.get("aparar_silencio", False):
+        with etapa("vad"):
+            aparados = [aparar_silencio(audio) for audio in audios]
+        audios = [trecho for trecho, _ in aparados]
+        segmentos = [segmento for _, segmento in aparados]
+
+    try:
+        with etapa("fourier"):
+            if feature_schema.get("espectro") == "stft":
+                lote_features = extrair_features_stft_lote(audios)
+            else:
+                lote_features = extrair_features_lote([audio.signal for audio in audios],
+                                                      [audio.rate for audio in audios])
+    except Exception as e:
+        lote_features = [{"erro": str(e)}] * len(audios)
+
+    lote_lpc = [None] * len(audios)
+    if feature_schema.get("lpc"):
+        try:
+            with etapa("lpc"):
+                lote_lpc = resumir_lpc_lote(audios, ordem=feature_schema["lpc"]["ordem"])
+        except Exception as e:
+            lote_lpc = [{"erro": str(e)}] * len(audios)
+
+    resultados = []
+    for features, lpc, segmento in zip(lote_features, lote_lpc, segmentos):
+        if "erro" in features:
+            resultados.append((None, features["erro"], segmento))
+        elif isinstance(lpc, dict):
+            resultados.append((None, lpc["erro"], segmento))
+        else:
+            vetor = montar_vetor_features(features)
+            if lpc is not None:
+                vetor.extend(lpc.tolist())
+            resultados.append((vetor, None, segmento))
+    return resultados
+
+
+def colunas_boxcox(feature_schema=SCHEMA_FEATURES):
+    """
+    Máscara das colunas que passam pelo Box-Cox: só as características
+    sempre positivas. As médias dos coeficientes LPC têm sinal e são apenas padronizadas.
+
+    Returns:
+        np.ndarray: Máscara booleana na ordem de feature_schema["features"].
+    """
+    return np.array([not nome.startswith("lpc_media_") for nome in feature_schema["features"]])
+
+
+def _extrair_decodificados(decodificados):
     """
-    Carrega arquivos de áudio de um diretório, extrai características
-    e prepara os dados X e y.
+    Extrai as características de um lote de áudios já decodificados, todos de uma vez.
 
     Args:
-        audio_dir (str): Caminho para o diretório contendo subpastas com áudios rotulados.
+        decodificados (iterable): Tuplas (signal, rate, erro) de cada áudio do lote.
+
+    Returns:
+        list: Para cada áudio, uma tupla (vetor_de_caracteristicas, erro); um dos dois é None.
+    """
+    sinais, taxas, posicoes = [], [], []
+    resultados = []
+
+    for posicao, (signal, rate, erro) in enumerate(decodificados):
+        resultados.append((None, erro))
+        if erro is not None:
+            continue
+        sinais.append(signal)
+        taxas.append(rate)
+        posicoes.append(posicao)
+
+    if sinais:
+        for posicao, (vetor, erro, _) in zip(posicoes, extrair_vetores(sinais, taxas)):
+            resultados[posicao] = (vetor, erro)
+
+    return resultados
+
+
+def _extrair_lote(origem, membros):
+    """
+    Lê um lote de áudios do dataset e extrai as características de todos de uma vez.
+    Roda nos processos do pool, por isso é uma função de nível de módulo.
+
+    Args:
+        origem (str): Caminho do arquivo ZIP ou do diretório do dataset.
+        membros (list): Membros do lote (ver service_dataset.listar_amostras).
+
+    Returns:
+        list: Para cada áudio, uma tupla (vetor_de_caracteristicas, erro); um dos dois é None.
+    """
+    return _extrair_decodificados((signal, rate, erro) for _, signal, rate, erro in iterar_sinais(origem, membros))
+
+
+def _extrair_em_fluxo(origem, labels_map, tamanho_lote):
+    """
+    Extrai as características lendo o dataset como fluxo (service_dataset.iterar_dataset),
+    com no máximo um lote de áudios decodificados em memória.
+
+    Yields:
+        list: Resultados de cada lote, no formato de _extrair_lote.
+    """
+    lote = []
+    for _, _, signal, rate, erro in iterar_dataset(origem, labels_map):
+        lote.append((signal, rate, erro))
+        if len(lote) == tamanho_lote:
+            yield _extrair_decodificados(lote)
+            lote = []
+    if lote:
+        yield _extrair_decodificados(lote)
+
+
+def load_and_extract_features(audio_dir, labels_map, n_processos=1, tamanho_lote=32, retornar_erros=False):
+    """
+    Carrega os áudios do dataset, extrai características e prepara os dados X e y.
+
+    O dataset pode ser um diretório ou o próprio arquivo ZIP; no segundo caso os
+    áudios são lidos direto do ZIP, sem extraí-lo para o disco. Os arquivos são
+    processados em lotes; com n_processos > 1 os lotes são distribuídos entre
+    processos. A ordem de X e y é sempre a mesma (classes na ordem de labels_map,
+    arquivos em ordem alfabética).
+
+    Args:
+        audio_dir (str): Caminho para o diretório ou ZIP contendo subpastas com áudios rotulados.
                          Ex: audio_dir/Brincar/audio1.wav, audio_dir/Comer/audio2.wav
         labels_map (dict): Um mapeamento de nomes de classe para índices numéricos.
                            Ex: {'Brincar': 0, 'Comer': 1, ...}
+        n_processos (int): Número de processos usados na extração (1 = no processo atual).
+        tamanho_lote (int): Número de arquivos enviados a cada processo por vez.
+        retornar_erros (bool): Se True, retorna também a lista de arquivos com erro.
 
     Returns:
-        tuple: (X, y) onde X é a matriz de características e y são os rótulos numéricos.
+        tuple: (X, y) onde X é a matriz de características e y são os rótulos numéricos,
+               ou (X, y, erros) com erros sendo uma lista de (arquivo, mensagem).
     """
+    amostras = listar_amostras(audio_dir, labels_map)
+    caminhos = [membro for membro, _ in amostras]
+    rotulos = [labels_map[label_name] for _, label_name in amostras]
+
+    lotes = [caminhos[i:i + tamanho_lote] for i in range(0, len(caminhos), tamanho_lote)]
+
     X_features = []
     y_labels = []
+    erros = []
+    processados = 0
+    inicio = time.perf_counter()
 
-    for label_name, label_id in labels_map.items():
-        class_dir = os.path.join(audio_dir, label_name)
-        if not os.path.isdir(class_dir):
-            print(f"Aviso: Diretório da classe '{label_name}' não encontrado: {class_dir}")
-            continue
+    if n_processos > 1 and len(lotes) > 1:
+        executor = ProcessPoolExecutor(max_workers=n_processos)
+        resultados_lotes = executor.map(_extrair_lote, repeat(audio_dir), lotes)  # map preserva a ordem dos lotes
+    else:
+        executor = None
+        resultados_lotes = _extrair_em_fluxo(audio_dir, labels_map, tamanho_lote)
+
+    try:
+        for resultados in resultados_lotes:
+            for (vetor, erro) in resultados:
+                file_path = caminhos[processados]
+                if erro is not None:
+                    print(f"Erro ao processar {file_path}: {erro}")
+                    erros.append((file_path, erro))
+                else:
+                    X_features.append(vetor)
+                    y_labels.append(rotulos[processados])
+                processados += 1
 
-        for filename in os.listdir(class_dir):
-            if filename.endswith(".wav"):  # Você pode adicionar outros formatos se suportados por soundfile
-                file_path = os.path.join(class_dir, filename)
-                features = analisar_som_fourier(file_path)  # Usando a função de análise de áudio
-
-                if "erro" in features:
-                    print(f"Erro ao processar {file_path}: {features['erro']}")
-                    continue
-
-                # Coleta as características em uma lista ordenada
-                feature_vector = [
-                    features['pico_frequencia'],
-                    features['pico_amplitude'],
-                    features['energia_total'],
-                    features['media_abs'],
-                    features['centroide_espectral'],
-                    features['largura_banda_espectral'],
-                    features['zcr']
-                ]
-                X_features.append(feature_vector)
-                y_labels.append(label_id)
+            decorrido = time.perf_counter() - inicio
+            print(f"Extração: {processados}/{len(caminhos)} arquivos "
+                  f"({processados / decorrido if decorrido > 0 else 0:.1f} arquivos/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
+    if retornar_erros:
+        return np.array(X_features), np.array(y_labels), erros
     return np.array(X_features), np.array(y_labels)
 
 
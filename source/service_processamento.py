@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+
+from service_espectrograma import registrar_audio
+from service_fft import analisar_som_fourier, filtro_passa_baixa, detectar_padroes
+from service_janelas import analisar_em_janelas
+from service_metricas import etapa
+from service_microfone import reconhecer_fala
+from service_microlote import obter_microlote
+from service_modelo import resultado_classificacao
+from service_pipeline import Pipeline
+from service_preparacao_dados import extrair_vetores
+from service_reamostragem import TAXA_CANONICA, reamostrar
+from service_stft import AudioRequisicao
+from service_vad import LIMIAR_ENERGIA, MARGEM_MS, aparar_silencio
+
+'''
+Etapas do processamento de um áudio recebido (upload ou microfone).
+
+    audio (reamostragem) -> fala (VAD) -> analise (Fourier)
+                                       -> filtrado -> padrao
+                         -> vetor (features do modelo, na taxa do schema) -> comando
+    espectrograma, texto: só dependem do sinal/arquivo recebido
+    janelas: lê o arquivo salvo em janelas fixas (gravações longas)
+
+O contexto começa com "signal", "rate", "caminho_audio", "id_audio" (hash
+do PCM, se já calculado) e, quando há
+modelo, "modelo" e "feature_schema". As etapas numéricas compartilham o
+mesmo AudioRequisicao, então a STFT e o segmento com fala são calculados
+uma única vez mesmo quando a análise e o comando são pedidos juntos.
+'''
+
+logger = logging.getLogger(__name__)
+
+
+def _calcular_versao_pipeline():
+    """
+    Hash do código dos serviços e da configuração que mudam os resultados:
+    um deploy com outro código ou outra configuração gera outra versão.
+    """
+    h = hashlib.sha256()
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    for nome in sorted(os.listdir(pasta)):
+        if nome.startswith("service_") and nome.endswith(".py"):
+            with open(os.path.join(pasta, nome), "rb") as f:
+                h.update(f.read())
+    h.update(json.dumps([TAXA_CANONICA, MARGEM_MS, LIMIAR_ENERGIA]).encode())
+    return h.hexdigest()[:16]
+
+
+VERSAO_PIPELINE = os.getenv("VERSAO_PIPELINE") or _calcular_versao_pipeline()
+
+pipeline = Pipeline()
+
+# Saídas devolvidas quando o cliente não escolhe (a resposta de antes do ?saida=)
+SAIDAS_PADRAO = ("features", "segmento", "padrao", "espectrograma", "texto")
+# Saídas calculadas a partir do arquivo em disco, sem o sinal inteiro em memória
+SAIDAS_ARQUIVO = ("janelas", "texto")
+SAIDAS_PADRAO_LONGO = ("janelas",)
+# Saídas que leem o arquivo já completo no disco: só a rota de upload (a gravação
+# do microfone é escrita em segundo plano, no processo do servidor, e pode nem ser arquivada)
+SAIDAS_SO_UPLOAD = ("janelas",)
+
+
+@pipeline.etapa("audio")
+def _audio(contexto):
+    return AudioRequisicao(*reamostrar(contexto["signal"], contexto["rate"]))
+
+
+@pipeline.etapa("fala", ["audio"])
+def _fala(contexto):
+    # Silêncio antes e depois da fala não entra na análise
+    with etapa("vad"):
+        return aparar_silencio(contexto["audio"])
+
+
+@pipeline.etapa("analise", ["fala"])
+def _analise(contexto):
+    trecho, _ = contexto["fala"]
+    with etapa("fourier"):
+        return analisar_som_fourier(trecho)
+
+
+@pipeline.etapa("filtrado", ["fala"])
+def _filtrado(contexto):
+    trecho, _ = contexto["fala"]
+    with etapa("filtro"):
+        return filtro_passa_baixa(trecho.signal, trecho.rate)
+
+
+@pipeline.etapa("padrao", ["fala", "filtrado"])
+def _padrao(contexto):
+    trecho, _ = contexto["fala"]
+    with etapa("padroes"):
+        return detectar_padroes(contexto["filtrado"], trecho.rate)
+
+
+@pipeline.etapa("vetor", ["audio"])
+def _vetor(contexto):
+    audio, feature_schema = contexto["audio"], contexto["feature_schema"]
+    if audio.rate == (feature_schema.get("taxa_amostragem") or contexto["rate"]):
+        # Modelo na taxa canônica: reaproveita o trecho com fala e a STFT da análise
+        (vetor, erro, _), = extrair_vetores([audio], [None], feature_schema)
+    else:
+        # Outra taxa (ou a original, em modelos antigos): o mesmo caminho de /v1/classificar
+        (vetor, erro, _), = extrair_vetores([contexto["signal"]], [contexto["rate"]], feature_schema)
+    return vetor, erro
+
+
+@pipeline.etapa("janelas")
+def _janelas(contexto):
+    if contexto["caminho_audio"] is None:
+        raise ValueError("A análise em janelas precisa do arquivo de áudio em disco.")
+    return analisar_em_janelas(contexto["caminho_audio"])
+
+
+@pipeline.etapa("comando", ["vetor"], no_worker=False)
+async def _comando(contexto):
+    vetor, erro = contexto["vetor"]
+    if erro is not None:
+        return {"erro_comando": f"Erro ao analisar o áudio: {erro}"}
+    modelo = contexto["modelo"]
+    # Agrupado com as requisições concorrentes em uma única inferência
+    with etapa("inferencia"):
+        probabilidades = await obter_microlote().classificar(vetor, modelo)
+    return resultado_classificacao(probabilidades, modelo)
+
+
+@pipeline.etapa("espectrograma", no_worker=False)
+def _espectrograma(contexto):
+    # O espectrograma só é renderizado se o cliente pedir a imagem
+    return registrar_audio(contexto["signal"], contexto["rate"], contexto.get("id_audio"))
+
+
+@pipeline.etapa("texto", no_worker=False)
+def _texto(contexto):
+    # reconhecer_fala ainda é um stub e não lê o arquivo, que pode estar sendo escrito em segundo plano
+    texto_falado = reconhecer_fala(contexto["caminho_audio"])
+    logger.info("Texto reconhecido: %s", texto_falado)
+    return texto_falado
+
+
+@pipeline.saida("features", ["analise"])
+def _saida_features(contexto):
+    resultado_analise = contexto["analise"]
+    # Duração e taxa do arquivo recebido (a análise usa o sinal na taxa canônica)
+    detalhes = {
+        "duracao_segundos": str(len(contexto["signal"]) / contexto["rate"]),
+        "sample_rate": str(contexto["rate"])
+    }
+    if "pico_frequencia" in resultado_analise and "pico_amplitude" in resultado_analise:
+        for nome in ("pico_frequencia", "pico_amplitude", "energia_total", "media_abs", "centroide_espectral",
+                     "largura_banda_espectral", "zcr"):
+            detalhes[nome] = str(resultado_analise.get(nome))
+        detalhes["status_analise_som"] = resultado_analise.get("status", "desconhecido")
+    elif "erro" in resultado_analise:
+        detalhes["erro_analise_som"] = resultado_analise["erro"]
+    return detalhes
+
+
+@pipeline.saida("segmento", ["fala"])
+def _saida_segmento(contexto):
+    return {"segmento_fala": contexto["fala"][1]}
+
+
+@pipeline.saida("padrao", ["padrao"])
+def _saida_padrao(contexto):
+    return {"padrao_detectado": contexto["padrao"]}
+
+
+@pipeline.saida("comando", ["comando"])
+def _saida_comando(contexto):
+    return contexto["comando"]
+
+
+@pipeline.saida("espectrograma", ["espectrograma"])
+def _saida_espectrograma(contexto):
+    return {"espectrograma_id": contexto["espectrograma"],
+            "espectrograma_url": f"/v1/espectrograma/{contexto['espectrograma']}"}
+
+
+@pipeline.saida("janelas", ["janelas"])
+def _saida_janelas(contexto):
+    return {"analise_janelas": contexto["janelas"]}
+
+
+@pipeline.saida("texto", ["texto"])
+def _saida_texto(contexto):
+    return {"texto_falado": contexto["texto"]}
+
+
+def executar_etapas_worker(contexto, plano):
+    """
+    Executa, em uma única tarefa do pool de workers, todas as etapas numéricas
+    do plano. Recebe e retorna apenas objetos serializáveis.
+
+    Args:
+        contexto (dict): "caminho_audio" e, quando as etapas precisarem, "signal", "rate"
+                         e "feature_schema".
+        plano (Plano): Plano retornado por pipeline.planejar.
+
+    Returns:
+        tuple: (campos das saídas calculadas no worker, valores das etapas usadas pelo event loop).
+    """
+    pipeline.executar(contexto, plano.etapas_worker)
+    return (pipeline.formatar(contexto, plano.saidas_worker),
+            {nome: contexto[nome] for nome in plano.transferir})
@@ -0,0 +1,66 @@
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from service_metricas import etapa
+
+'''
+Taxa de amostragem canônica.
+
+Todo sinal que entra no serviço (upload, microfone, stream) e todo áudio
+do treino é reamostrado para TAXA_CANONICA antes das etapas numéricas, o
+que deixa as features comparáveis entre gravações e barateia FFT, filtros
+e features (44,1 kHz -> 16 kHz: ~2,75x menos amostras). O filtro FIR
+anti-aliasing é projetado uma vez por par de taxas.
+'''
+
+TAXA_CANONICA = int(os.getenv("TAXA_CANONICA", 16000))  # 0 = mantém a taxa original
+
+
+@lru_cache(maxsize=32)
+def _filtro_fir(up, down):
+    """
+    Passa-baixa FIR usado por resample_poly para o fator up/down
+    (o mesmo projeto padrão do scipy, calculado uma única vez).
+    """
+    from scipy.signal import firwin
+
+    taxa_max = max(up, down)
+    meio = 10 * taxa_max
+    return firwin(2 * meio + 1, 1.0 / taxa_max, window=("kaiser", 5.0))
+
+
+def reamostrar(signal, rate, rate_destino=TAXA_CANONICA):
+    """
+    Converte o sinal para a taxa de destino.
+
+    Sinais PCM inteiros continuam no mesmo dtype (e escala), então as etapas
+    seguintes não percebem a troca de taxa.
+
+    Args:
+        signal (np.ndarray): Sinal de áudio mono.
+        rate (int): Taxa de amostragem original em Hz.
+        rate_destino (int): Taxa desejada em Hz (0 ou None mantém a original).
+
+    Returns:
+        tuple: (signal, rate) já na taxa de destino.
+    """
+    if not rate_destino or rate == rate_destino or len(signal) == 0:
+        return signal, rate
+
+    from scipy.signal import resample_poly  # Carregado no primeiro uso (import lento)
+
+    divisor = math.gcd(int(rate), int(rate_destino))
+    up, down = int(rate_destino) // divisor, int(rate) // divisor
+
+    with etapa("reamostragem"):
+        tipo = signal.dtype
+        centro = 128.0 if tipo == np.uint8 else 0.0  # PCM de 8 bits é centrado em 128
+        reamostrado = resample_poly(signal.astype(np.float64) - centro, up, down, window=_filtro_fir(up, down))
+
+        if np.issubdtype(tipo, np.integer):
+            info = np.iinfo(tipo)
+            reamostrado = np.clip(np.rint(reamostrado + centro), info.min, info.max).astype(tipo)
+
+    return reamostrado, int(rate_destino)
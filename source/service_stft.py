@@ -0,0 +1,123 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import rfft
+
+from service_audio import converter_para_float, converter_para_mono
+
+'''
+STFT compartilhada por requisição.
+
+AudioRequisicao guarda o sinal de uma requisição e calcula sob demanda, uma
+única vez, as representações usadas pelas etapas: amostras em ponto
+flutuante, quadros (views do sinal, sem cópia) e a STFT. Espectrograma,
+features espectrais, VAD e LPC leem do mesmo objeto em vez de transformar
+o sinal de novo.
+'''
+
+TAMANHO_QUADRO_STFT = 1024  # Mesmos parâmetros do espectrograma (nfft=1024, noverlap=512)
+PASSO_STFT = 512
+
+
+def enquadrar(signal, tamanho_quadro, passo):
+    """
+    Divide o sinal em quadros sobrepostos sem copiar as amostras.
+
+    Args:
+        signal (np.ndarray): Sinal 1-D.
+        tamanho_quadro (int): Amostras por quadro.
+        passo (int): Amostras entre o início de quadros consecutivos.
+
+    Returns:
+        np.ndarray: View somente leitura (n_quadros, tamanho_quadro).
+    """
+    if len(signal) < tamanho_quadro:
+        return np.empty((0, tamanho_quadro), dtype=signal.dtype)
+    return sliding_window_view(signal, tamanho_quadro)[::passo]
+
+
+class AudioRequisicao:
+
+    def __init__(self, signal, rate):
+        self.signal = converter_para_mono(np.asarray(signal))
+        self.rate = rate
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.signal)
+
+    @property
+    def duracao(self):
+        return len(self.signal) / self.rate
+
+    def memorizar(self, chave, calcular):
+        """
+        Calcula um valor derivado do áudio uma única vez por requisição
+        (também usado pelas etapas de outros módulos, ex.: VAD).
+        """
+        if chave not in self._cache:
+            self._cache[chave] = calcular()
+        return self._cache[chave]
+
+    @property
+    def amostras(self):
+        """Sinal em ponto flutuante na escala [-1, 1]."""
+        return self.memorizar("amostras", lambda: converter_para_float(self.signal))
+
+    def quadros(self, tamanho_quadro, passo):
+        """Quadros das amostras em ponto flutuante (views, sem cópia)."""
+        return self.memorizar(("quadros", tamanho_quadro, passo),
+                               lambda: enquadrar(self.amostras, tamanho_quadro, passo))
+
+    def janela(self, tamanho_quadro):
+        from scipy.signal import get_window  # Carregado no primeiro uso (import lento)
+        return self.memorizar(("janela", tamanho_quadro), lambda: get_window("hann", tamanho_quadro))
+
+    def stft(self, tamanho_quadro=TAMANHO_QUADRO_STFT, passo=PASSO_STFT):
+        """
+        STFT com janela de Hann. Sinais menores que um quadro são completados com zeros.
+
+        Returns:
+            np.ndarray: Espectro complexo (n_quadros, tamanho_quadro // 2 + 1).
+        """
+        def calcular():
+            quadros = self.quadros(tamanho_quadro, passo)
+            if len(quadros) == 0:
+                quadros = np.zeros((1, tamanho_quadro))
+                quadros[0, :len(self.amostras)] = self.amostras
+            # A multiplicação pela janela é a única cópia dos quadros
+            return rfft(quadros * self.janela(tamanho_quadro), axis=1)
+        return self.memorizar(("stft", tamanho_quadro, passo), calcular)
+
+    def potencia(self, tamanho_quadro=TAMANHO_QUADRO_STFT, passo=PASSO_STFT):
+        """Espectro de potência |X|^2 de cada quadro da STFT."""
+        def calcular():
+            espectro = self.stft(tamanho_quadro, passo)
+            return espectro.real ** 2 + espectro.imag ** 2
+        return self.memorizar(("potencia", tamanho_quadro, passo), calcular)
+
+    def magnitude(self, tamanho_quadro=TAMANHO_QUADRO_STFT, passo=PASSO_STFT):
+        """Espectro de magnitude |X| de cada quadro da STFT."""
+        return self.memorizar(("magnitude", tamanho_quadro, passo),
+                               lambda: np.sqrt(self.potencia(tamanho_quadro, passo)))
+
+    def trecho(self, inicio, fim):
+        """
+        Novo AudioRequisicao com as amostras [inicio, fim), sem copiá-las.
+        As amostras em ponto flutuante já calculadas também são reaproveitadas,
+        e o mesmo trecho pedido de novo é o mesmo objeto (com a STFT já calculada).
+        """
+        def calcular():
+            parte = AudioRequisicao(self.signal[inicio:fim], self.rate)
+            if "amostras" in self._cache:
+                parte._cache["amostras"] = self._cache["amostras"][inicio:fim]
+            return parte
+        return self.memorizar(("trecho", inicio, fim), calcular)
+
+
+def como_audio(signal, rate=None):
+    """
+    Aceita um AudioRequisicao ou um par (signal, rate) e retorna um AudioRequisicao.
+    """
+    if isinstance(signal, AudioRequisicao):
+        return signal
+    return AudioRequisicao(signal, rate)
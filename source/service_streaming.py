@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+
+from service_audio import converter_para_float
+from service_microfone import BufferCircular
+from service_vad import LIMIAR_ENERGIA, medidas_quadros, quadros_com_fala
+
+'''
+Reconhecimento incremental para o WebSocket /v1/stream.
+
+Os blocos PCM recebidos são divididos em quadros curtos. Cada quadro é
+classificado com a mesma regra do VAD offline (service_vad.quadros_com_fala,
+com o ruído de fundo estimado ao vivo); as amostras de fala vão para um
+buffer pré-alocado. Depois de um trecho de silêncio, o enunciado é
+considerado encerrado e devolvido para classificação imediatamente, sem
+esperar o fim da conexão.
+'''
+
+DURACAO_QUADRO_MS = float(os.getenv("STREAM_QUADRO_MS", 20))
+SILENCIO_FIM_MS = float(os.getenv("STREAM_SILENCIO_FIM_MS", 300))
+DURACAO_MAX_SEGUNDOS = float(os.getenv("STREAM_DURACAO_MAX", 3))
+PRE_ROLL_MS = 100  # Silêncio mantido antes do início da fala
+TAXA_MIN, TAXA_MAX = 4000, 192000  # Taxas aceitas na configuração do stream (Hz)
+
+
+class ReconhecedorStreaming:
+
+    def __init__(self, rate, duracao_quadro_ms=DURACAO_QUADRO_MS, silencio_fim_ms=SILENCIO_FIM_MS,
+                 duracao_max=DURACAO_MAX_SEGUNDOS, limiar_energia=LIMIAR_ENERGIA):
+        self.rate = rate
+        self.tamanho_quadro = max(1, int(rate * duracao_quadro_ms / 1000))
+        self.quadros_silencio_fim = max(1, int(np.ceil(silencio_fim_ms / duracao_quadro_ms)))
+        self.limiar_energia = limiar_energia
+
+        self._resto = np.zeros(0, dtype=np.int16)
+        self._pre_roll = BufferCircular(max(self.tamanho_quadro, int(rate * PRE_ROLL_MS / 1000)))
+        self._enunciado = BufferCircular(int(rate * duracao_max))
+        self._ruido = None
+        self._falando = False
+        self._quadros_silencio = 0
+        self._amostras_recebidas = 0
+        self._inicio_enunciado = 0
+        self._fim_fala = 0  # Amostras do enunciado até o último quadro com fala
+
+    def processar(self, pcm):
+        """
+        Consome um bloco PCM (int16 mono).
+
+        Args:
+            pcm (np.ndarray): Amostras recebidas.
+
+        Returns:
+            list: Enunciados encerrados neste bloco, como tuplas (signal, inicio_s, fim_s).
+        """
+        amostras = np.concatenate((self._resto, pcm)) if len(self._resto) else pcm
+        num_quadros = len(amostras) // self.tamanho_quadro
+        self._resto = amostras[num_quadros * self.tamanho_quadro:].copy()
+
+        quadros = amostras[:num_quadros * self.tamanho_quadro].reshape(num_quadros, self.tamanho_quadro)
+        energias, zcr = medidas_quadros(converter_para_float(quadros))
+
+        encerrados = []
+        for quadro, energia, zcr_quadro in zip(quadros, energias, zcr):
+            enunciado = self._processar_quadro(quadro, energia, zcr_quadro)
+            if enunciado is not None:
+                encerrados.append(enunciado)
+        return encerrados
+
+    def finalizar(self):
+        """
+        Encerra o enunciado em andamento (fim do stream).
+
+        Returns:
+            tuple or None: (signal, inicio_s, fim_s), se havia fala em andamento.
+        """
+        if not self._falando:
+            return None
+        return self._encerrar_enunciado()
+
+    def _processar_quadro(self, quadro, energia, zcr):
+        tem_fala = quadros_com_fala(energia, zcr, self._ruido, self.limiar_energia)
+        self._amostras_recebidas += len(quadro)
+
+        if not self._falando:
+            if not tem_fala:
+                # Ruído de fundo: média móvel da energia dos quadros sem fala
+                self._ruido = energia if self._ruido is None else 0.95 * self._ruido + 0.05 * energia
+                self._pre_roll.escrever(quadro)
+                return None
+
+            self._falando = True
+            self._quadros_silencio = 0
+            for parte in self._pre_roll.visoes():
+                self._enunciado.escrever(parte)
+            self._inicio_enunciado = self._amostras_recebidas - len(quadro) - len(self._enunciado)
+            self._pre_roll.limpar()
+
+        self._enunciado.escrever(quadro)
+        if tem_fala:
+            self._quadros_silencio = 0
+            self._fim_fala = len(self._enunciado)
+        else:
+            self._quadros_silencio += 1
+
+        enunciado_cheio = self._enunciado.total_escrito >= self._enunciado.capacidade
+        if self._quadros_silencio >= self.quadros_silencio_fim or enunciado_cheio:
+            return self._encerrar_enunciado()
+        return None
+
+    def _encerrar_enunciado(self):
+        # Descarta o silêncio final, mantendo um quadro após a última fala
+        fim = min(len(self._enunciado), self._fim_fala + self.tamanho_quadro)
+        signal = np.array(self._enunciado.ler()[:fim])
+        inicio_s = self._inicio_enunciado / self.rate
+
+        self._enunciado.limpar()
+        self._falando = False
+        self._quadros_silencio = 0
+        self._fim_fala = 0
+
+        return signal, inicio_s, inicio_s + len(signal) / self.rate
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+
+from service_stft import como_audio
+
+'''
+Detecção de atividade de voz (VAD) por energia e taxa de cruzamentos por zero.
+
+Os quadros vêm do AudioRequisicao (views do sinal, sem cópia) e as medidas
+de todos os quadros são calculadas de uma vez. O trecho entre o primeiro e
+o último quadro com fala é o segmento usado pelas etapas seguintes.
+A decisão por quadro (quadros_com_fala) também é usada pelo reconhecimento
+em streaming (service_streaming), com o ruído de fundo estimado ao vivo.
+'''
+
+DURACAO_QUADRO_MS = 25
+PASSO_MS = 10
+MARGEM_MS = float(os.getenv("VAD_MARGEM_MS", 50))  # Folga mantida antes e depois da fala
+LIMIAR_ENERGIA = float(os.getenv("VAD_LIMIAR_ENERGIA", 1e-4))  # Energia média mínima do quadro (escala [-1, 1])
+FATOR_RUIDO = 4.0  # Fala = energia acima de FATOR_RUIDO x ruído de fundo
+LIMIAR_ZCR = 0.25  # Quadros fracos com ZCR alta (fricativas, ex.: "S") também contam como fala
+
+
+def medidas_quadros(quadros):
+    """
+    Energia média e taxa de cruzamentos por zero de cada quadro.
+
+    Args:
+        quadros (np.ndarray): Quadros (n_quadros, tamanho_quadro) em ponto flutuante.
+
+    Returns:
+        tuple: (energias, zcr), arrays de tamanho n_quadros.
+    """
+    tamanho_quadro = quadros.shape[1]
+    energias = np.einsum("ij,ij->i", quadros, quadros) / tamanho_quadro
+    sinais = np.signbit(quadros)
+    zcr = np.count_nonzero(sinais[:, 1:] != sinais[:, :-1], axis=1) / tamanho_quadro
+    return energias, zcr
+
+
+def quadros_com_fala(energias, zcr, ruido, limiar_energia=LIMIAR_ENERGIA):
+    """
+    Decide quais quadros têm fala: energia acima do limiar (o maior entre
+    limiar_energia e FATOR_RUIDO x ruído de fundo) ou, para fricativas, energia
+    acima do ruído com ZCR alta.
+
+    Args:
+        energias (np.ndarray or float): Energia média de cada quadro (ver medidas_quadros).
+        zcr (np.ndarray or float): Taxa de cruzamentos por zero de cada quadro.
+        ruido (float or None): Energia estimada do ruído de fundo (None: ainda desconhecida).
+        limiar_energia (float): Energia mínima de um quadro com fala.
+
+    Returns:
+        np.ndarray or bool: Máscara de quadros com fala.
+    """
+    limiar = limiar_energia if ruido is None else max(limiar_energia, ruido * FATOR_RUIDO)
+    return (energias > limiar) | ((energias > limiar / FATOR_RUIDO) & (zcr > LIMIAR_ZCR))
+
+
+def detectar_segmento_fala(signal, rate=None, duracao_quadro_ms=DURACAO_QUADRO_MS, passo_ms=PASSO_MS,
+                           margem_ms=MARGEM_MS, limiar_energia=LIMIAR_ENERGIA):
+    """
+    Localiza o trecho com fala de um sinal.
+
+    Args:
+        signal (AudioRequisicao or np.ndarray): Áudio da requisição, ou sinal mono
+                                                (PCM inteiro ou ponto flutuante).
+        rate (int): Taxa de amostragem em Hz (só com np.ndarray).
+        duracao_quadro_ms (float): Duração de cada quadro.
+        passo_ms (float): Deslocamento entre quadros.
+        margem_ms (float): Folga mantida antes e depois da fala.
+        limiar_energia (float): Energia mínima de um quadro com fala.
+
+    Returns:
+        tuple: (inicio, fim, fala_detectada), em amostras. Sem fala, o segmento é o sinal inteiro.
+    """
+    audio = como_audio(signal, rate)
+    rate = audio.rate
+    tamanho_quadro = max(1, int(rate * duracao_quadro_ms / 1000))
+    passo = max(1, int(rate * passo_ms / 1000))
+    quadros = audio.quadros(tamanho_quadro, passo)
+    if len(quadros) == 0:
+        return 0, len(audio), False
+
+    energias, zcr = medidas_quadros(quadros)
+
+    # Ruído de fundo: energia dos quadros mais silenciosos
+    ruido = np.percentile(energias, 10)
+    fala = quadros_com_fala(energias, zcr, ruido, limiar_energia)
+
+    indices = np.flatnonzero(fala)
+    if len(indices) == 0:
+        return 0, len(audio), False
+
+    margem = int(rate * margem_ms / 1000)
+    inicio = max(0, indices[0] * passo - margem)
+    fim = min(len(audio), indices[-1] * passo + tamanho_quadro + margem)
+    return int(inicio), int(fim), True
+
+
+def aparar_silencio(signal, rate=None):
+    """
+    Remove o silêncio antes e depois da fala.
+
+    Returns:
+        tuple: (trecho, segmento), com trecho sendo um AudioRequisicao que compartilha
+               as amostras do original e segmento um dict com início e fim em segundos.
+    """
+    audio = como_audio(signal, rate)
+    # Memorizado: a análise e a extração do vetor do modelo aparam o mesmo áudio
+    inicio, fim, fala_detectada = audio.memorizar("segmento_fala", lambda: detectar_segmento_fala(audio))
+    segmento = {
+        "inicio_segundos": inicio / audio.rate,
+        "fim_segundos": fim / audio.rate,
+        "fala_detectada": fala_detectada,
+    }
+    return audio.trecho(inicio, fim), segmento
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Os módulos de source/ se importam pelo nome (ex.: "from service_audio import ..."), como no servidor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "source"))
+
+
+@pytest.fixture
+def modelo_teste():
+    """Modelo pequeno (só MLP, pesos aleatórios) com o schema de features atual."""
+    from service_preparacao_dados import SCHEMA_FEATURES
+
+    rng = np.random.default_rng(0)
+    n_entrada, n_classes = len(SCHEMA_FEATURES["features"]), 3
+    return {
+        "versao": "teste",
+        "labels_map": {"a": 0, "b": 1, "c": 2},
+        "classes": ["a", "b", "c"],
+        "feature_schema": SCHEMA_FEATURES,
+        "boxcox": None,
+        "pca": None,
+        "mlp": {"W1": rng.standard_normal((n_entrada, 4)) * 1e-3, "b1": np.zeros(4),
+                "W2": rng.standard_normal((4, n_classes)), "b2": np.zeros(n_classes)},
+    }
+
+
+@pytest.fixture
+def pool_em_threads(monkeypatch):
+    """Pool de workers em threads (sem fork) durante o teste."""
+    import service_execucao
+
+    monkeypatch.setattr(service_execucao, "TIPO_POOL", "thread")
+    monkeypatch.setattr(service_execucao, "_executor", None)
+    yield
+    service_execucao.encerrar_pool()
@@ -0,0 +1,72 @@
+import os
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from service_artefatos import ArmazemArtefatos, nome_unico
+
+
+def _armazem(tmp_path, **opcoes):
+    pastas = {nome: str(tmp_path / nome) for nome in ("uploads", "gravacoes", "espectrogramas")}
+    return ArmazemArtefatos(pastas=pastas, **opcoes)
+
+
+def _criar(caminho, tamanho, idade_segundos):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(b"\0" * tamanho)
+    quando = time.time() - idade_segundos
+    os.utime(caminho, (quando, quando))
+
+
+def test_nomes_unicos_no_mesmo_segundo():
+    assert len({nome_unico("upload", ".wav", "a") for _ in range(1000)}) == 1000
+
+
+def test_escritas_em_segundo_plano(tmp_path):
+    armazem = _armazem(tmp_path)
+    origem = tmp_path / "temp.wav"
+    origem.write_bytes(b"RIFF")
+    sinal = np.arange(100, dtype=np.int16)
+
+    caminho_png = armazem.guardar_bytes("espectrogramas", "a.png", b"png")
+    caminho_wav = armazem.guardar_wav("gravacoes", "b.wav", sinal, 8000)
+    caminho_upload = armazem.guardar_arquivo("uploads", "c.wav", str(origem))
+    armazem.encerrar()
+
+    assert open(caminho_png, "rb").read() == b"png"
+    np.testing.assert_array_equal(wavfile.read(caminho_wav)[1], sinal)
+    assert open(caminho_upload, "rb").read() == b"RIFF"
+    assert not origem.exists()
+    assert not [p for p in tmp_path.rglob("*.tmp")]
+
+
+def test_arquivamento_desligado_apaga_o_temporario(tmp_path):
+    armazem = _armazem(tmp_path, arquivar=False)
+    origem = tmp_path / "temp.wav"
+    origem.write_bytes(b"RIFF")
+    assert armazem.guardar_arquivo("uploads", "c.wav", str(origem)) is None
+    assert armazem.guardar_bytes("espectrogramas", "a.png", b"png") is None
+    assert not origem.exists()
+
+
+def test_retencao_por_idade_e_por_tamanho(tmp_path):
+    armazem = _armazem(tmp_path, idade_max_horas=1, tamanho_max_mb=2.5 / 1024)  # 2,5 KiB
+    mb = 1024
+    _criar(tmp_path / "uploads" / "velho.wav", mb, 2 * 3600)
+    _criar(tmp_path / "uploads" / "antigo.wav", mb, 300)
+    _criar(tmp_path / "gravacoes" / "medio.wav", mb, 200)
+    _criar(tmp_path / "espectrogramas" / "novo.png", mb, 100)
+    _criar(tmp_path / "uploads" / "parcial.wav.123.tmp", mb, 3 * 3600)  # Escrita em andamento: não é tocada
+
+    assert armazem.aplicar_retencao() == 2
+    restantes = sorted(p.name for p in tmp_path.rglob("*") if p.is_file())
+    assert restantes == ["medio.wav", "novo.png", "parcial.wav.123.tmp"]
+
+
+def test_fila_cheia_descarta_o_artefato(tmp_path):
+    armazem = _armazem(tmp_path, tamanho_max_fila=1)
+    armazem._thread = object()  # Sem escritor: a fila não esvazia
+    assert armazem.guardar_bytes("espectrogramas", "a.png", b"1") is not None
+    assert armazem.guardar_bytes("espectrogramas", "b.png", b"2") is None
+    assert armazem.estado()["descartados"] == 1
@@ -0,0 +1,54 @@
+import numpy as np
+from scipy import stats
+
+from service_box_cox import (_boxcox_lambdas_candidatos, boxcox_finalize, boxcox_fit_transform,
+                             boxcox_partial_fit, boxcox_transform)
+
+
+def _dados(rng, n=700):
+    return np.column_stack([
+        rng.lognormal(0.0, 1.0, n),
+        rng.gamma(2.0, 3.0, n),
+        rng.uniform(1.0, 5.0, n),
+        rng.standard_normal(n),  # Coluna com sinal, fora do Box-Cox
+    ])
+
+
+def test_partial_fit_em_blocos_igual_a_uma_passada():
+    rng = np.random.default_rng(0)
+    X = _dados(rng)
+    colunas = np.array([True, True, True, False])
+
+    estado_unico = boxcox_partial_fit(None, X, colunas=colunas)
+    estado = None
+    for inicio in range(0, len(X), 97):
+        estado = boxcox_partial_fit(estado, X[inicio:inicio + 97], colunas=colunas)
+
+    unico, blocos = boxcox_finalize(estado_unico), boxcox_finalize(estado)
+    np.testing.assert_array_equal(blocos["lambda_val"], unico["lambda_val"])
+    np.testing.assert_allclose(blocos["mean"], unico["mean"], rtol=1e-10)
+    np.testing.assert_allclose(blocos["std"], unico["std"], rtol=1e-10)
+
+
+def test_lambda_de_maxima_verossimilhanca_na_grade():
+    rng = np.random.default_rng(1)
+    X = _dados(rng)[:, :3]
+    _, params = boxcox_fit_transform(X)
+
+    for coluna, lambda_val in enumerate(params["lambda_val"]):
+        x = X[:, coluna] + params["offset"]
+        verossimilhancas = [stats.boxcox_llf(candidato, x) for candidato in _boxcox_lambdas_candidatos]
+        assert lambda_val == _boxcox_lambdas_candidatos[int(np.argmax(verossimilhancas))]
+
+
+def test_transformacao_padronizada_e_reaplicavel():
+    rng = np.random.default_rng(2)
+    X = _dados(rng)
+    colunas = np.array([True, True, True, False])
+    transformado, params = boxcox_fit_transform(X, colunas=colunas)
+
+    np.testing.assert_allclose(transformado.mean(axis=0), 0.0, atol=1e-10)
+    np.testing.assert_allclose(transformado.std(axis=0), 1.0, rtol=1e-10)
+    np.testing.assert_allclose(boxcox_transform(X, params), transformado)
+    # Coluna fora do Box-Cox: só padronizada
+    np.testing.assert_allclose(transformado[:, 3], (X[:, 3] - X[:, 3].mean()) / X[:, 3].std(), atol=1e-10)
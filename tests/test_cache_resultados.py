@@ -0,0 +1,49 @@
+import time
+
+from service_cache_resultados import CacheResultados, chave_resultado
+
+
+def test_chave_independe_da_ordem_das_saidas():
+    assert chave_resultado("a", "p1", ["comando", "features"], "m1") == \
+        chave_resultado("a", "p1", ["features", "comando"], "m1")
+
+
+def test_chave_muda_com_audio_versoes_e_saidas():
+    base = chave_resultado("a", "p1", ["features"], "m1")
+    assert len({base,
+                chave_resultado("b", "p1", ["features"], "m1"),
+                chave_resultado("a", "p2", ["features"], "m1"),
+                chave_resultado("a", "p1", ["features"], "m2"),
+                chave_resultado("a", "p1", ["features"], None),
+                chave_resultado("a", "p1", ["features", "comando"], "m1")}) == 6
+
+
+def test_lru_limitada_por_itens_e_bytes():
+    cache = CacheResultados(max_itens=2, max_bytes=1000, diretorio="")
+    cache.guardar("a", {"v": 1})
+    cache.guardar("b", {"v": 2})
+    assert cache.obter("a") == {"v": 1}  # "a" passa a ser o mais recente
+    cache.guardar("c", {"v": 3})
+    assert cache.obter("b") is None
+    assert cache.obter("a") == {"v": 1}
+
+    cache.guardar("grande", {"v": "x" * 2000})  # Maior que o limite: não é guardado
+    assert cache.obter("grande") is None
+    assert cache.estatisticas()["bytes"] <= 1000
+
+
+def test_ttl_expira_entradas(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: agora[0])
+    cache = CacheResultados(ttl=10, diretorio="")
+    cache.guardar("a", {"v": 1})
+    agora[0] += 11
+    assert cache.obter("a") is None
+    assert cache.estatisticas()["itens"] == 0
+
+
+def test_disco_compartilhado_entre_instancias(tmp_path):
+    CacheResultados(diretorio=str(tmp_path)).guardar("chave", {"comando": "Sair"})
+    outra = CacheResultados(diretorio=str(tmp_path))
+    assert outra.obter("chave") == {"comando": "Sair"}
+    assert [p.name for p in tmp_path.iterdir()] == ["chave.json"]
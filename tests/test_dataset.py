@@ -0,0 +1,72 @@
+import io
+import zipfile
+
+import numpy as np
+from scipy.io import wavfile
+
+import service_dataset
+from service_preparacao_dados import load_and_extract_features
+
+LABELS = {"Comer": 0, "Brincar": 1}
+
+
+def _wav(frequencia, rate=16000):
+    t = np.arange(rate // 2) / rate
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, (np.sin(2 * np.pi * frequencia * t) * 8000).astype(np.int16))
+    return buffer.getvalue()
+
+
+def _zip_dataset():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("dataset/Brincar/b2.wav", _wav(300))
+        zf.writestr("dataset/Brincar/b1.wav", _wav(200))
+        zf.writestr("dataset/Comer/c1.wav", _wav(500))
+        zf.writestr("dataset/Comer/quebrado.wav", b"nao e um wav")
+        zf.writestr("dataset/Outra/o1.wav", _wav(700))
+        zf.writestr("dataset/Comer/leiame.txt", b"ignorado")
+    buffer.seek(0)
+    return buffer
+
+
+def test_iterar_dataset_rotula_pela_pasta_na_ordem_das_classes():
+    itens = list(service_dataset.iterar_dataset(_zip_dataset(), LABELS))
+
+    assert [(membro, label_name) for membro, label_name, *_ in itens] == [
+        ("dataset/Comer/c1.wav", "Comer"),
+        ("dataset/Comer/quebrado.wav", "Comer"),
+        ("dataset/Brincar/b1.wav", "Brincar"),
+        ("dataset/Brincar/b2.wav", "Brincar"),
+    ]
+    _, _, signal, rate, erro = itens[0]
+    assert rate == 16000 and len(signal) == 8000 and erro is None
+    _, _, signal, rate, erro = itens[1]
+    assert signal is None and rate is None and erro
+
+
+def test_iterar_dataset_decodifica_sob_demanda(monkeypatch):
+    decodificados = []
+    original = service_dataset.decodificar_wav
+
+    def contar(dados):
+        decodificados.append(len(dados))
+        return original(dados)
+
+    monkeypatch.setattr(service_dataset, "decodificar_wav", contar)
+    fluxo = service_dataset.iterar_dataset(_zip_dataset(), LABELS)
+    assert decodificados == []
+
+    next(fluxo)
+    assert len(decodificados) == 1
+
+    fluxo.close()
+    assert len(decodificados) == 1
+
+
+def test_extracao_em_fluxo_monta_x_e_y():
+    X, y, erros = load_and_extract_features(_zip_dataset(), LABELS, tamanho_lote=2, retornar_erros=True)
+
+    assert X.shape[0] == 3 and np.isfinite(X).all()
+    assert y.tolist() == [0, 1, 1]
+    assert [arquivo for arquivo, _ in erros] == ["dataset/Comer/quebrado.wav"]
@@ -0,0 +1,23 @@
+import numpy as np
+
+import service_espectrograma
+from service_artefatos import obter_armazem
+from service_espectrograma import identificar_audio, ler_espectrograma_em_cache, salvar_espectrograma_em_cache
+
+
+def test_id_depende_do_conteudo_e_da_taxa():
+    signal = np.arange(1000, dtype=np.int16)
+    assert identificar_audio(signal, 16000) == identificar_audio(signal.copy(), 16000)
+    assert identificar_audio(signal, 16000) != identificar_audio(signal, 44100)
+    assert identificar_audio(signal, 16000) != identificar_audio(signal[::-1].copy(), 16000)
+
+
+def test_png_fica_em_memoria_com_arquivamento_desligado(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_espectrograma, "PASTA_ESPECTROGRAMAS", str(tmp_path))
+    monkeypatch.setattr(obter_armazem(), "arquivar", False)
+    id_audio = "0" * 32
+
+    assert ler_espectrograma_em_cache(id_audio) is None
+    assert salvar_espectrograma_em_cache(id_audio, b"png") is None
+    assert ler_espectrograma_em_cache(id_audio) == b"png"
+    assert list(tmp_path.iterdir()) == []
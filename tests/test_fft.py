@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from scipy.fft import fft, fftfreq
+
+from service_fft import extrair_features_lote
+
+NOMES = ("pico_frequencia", "pico_amplitude", "energia_total", "media_abs", "centroide_espectral",
+         "largura_banda_espectral", "zcr")
+
+
+def _features_referencia(data, samplerate):
+    # Versão original (uma FFT complexa do sinal inteiro), usada como referência
+    N = len(data)
+    yf = fft(data)
+    xf = fftfreq(N, 1 / samplerate)
+    idx = np.where(xf > 0)
+    frequencias = xf[idx]
+    amplitudes = np.abs(yf[idx])
+    centroide = np.sum(frequencias * amplitudes) / np.sum(amplitudes)
+    return {
+        "pico_frequencia": frequencias[np.argmax(amplitudes)],
+        "pico_amplitude": np.max(amplitudes),
+        "energia_total": np.sum(data ** 2),
+        "media_abs": np.mean(np.abs(data)),
+        "centroide_espectral": centroide,
+        "largura_banda_espectral": np.sqrt(np.sum(amplitudes * (frequencias - centroide) ** 2) / np.sum(amplitudes)),
+        "zcr": np.sum(np.abs(np.diff(np.sign(data)))) / (2 * N),
+    }
+
+
+def _sinais(rng):
+    t = np.arange(4000) / 8000
+    return [
+        0.5 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(len(t)),
+        rng.standard_normal(1777) * 0.1,
+        0.3 * np.sin(2 * np.pi * 1000 * t[:2501]),
+        rng.uniform(-1, 1, 4000),
+    ]
+
+
+def _comparar(obtido, esperado):
+    for nome in NOMES:
+        assert obtido[nome] == pytest.approx(esperado[nome], rel=1e-12, abs=1e-12), nome
+
+
+def test_lote_irregular_igual_a_fft_completa():
+    rng = np.random.default_rng(1)
+    sinais = _sinais(rng)
+    taxas = [8000, 16000, 8000, 44100]
+    for obtido, sinal, taxa in zip(extrair_features_lote(sinais, taxas), sinais, taxas):
+        assert obtido["status"] == "analisado"
+        _comparar(obtido, _features_referencia(sinal, taxa))
+
+
+def test_matriz_com_preenchimento_igual_ao_lote_irregular():
+    rng = np.random.default_rng(2)
+    sinais = _sinais(rng)
+    comprimentos = [len(sinal) for sinal in sinais]
+    matriz = np.zeros((len(sinais), max(comprimentos)))
+    for linha, sinal in zip(matriz, sinais):
+        linha[:len(sinal)] = sinal
+
+    for obtido, esperado in zip(extrair_features_lote(matriz, 16000, comprimentos),
+                                extrair_features_lote(sinais, 16000)):
+        _comparar(obtido, esperado)
+
+
+def test_pcm_int16_usa_escala_float():
+    rng = np.random.default_rng(3)
+    sinal = rng.uniform(-0.9, 0.9, 3000)
+    pcm = np.round(sinal * 32768).astype(np.int16)
+    _comparar(extrair_features_lote([pcm], 16000)[0], _features_referencia(pcm / 32768, 16000))
+
+
+def test_sinal_curto_retorna_erro():
+    assert "erro" in extrair_features_lote([np.array([0.5, -0.5])], 8000)[0]
+
+
+def test_analise_publica_usa_a_fft_do_sinal_inteiro():
+    from service_fft import analisar_som_fourier
+    from service_stft import AudioRequisicao
+
+    rng = np.random.default_rng(4)
+    sinal = rng.uniform(-0.5, 0.5, 5001)
+    esperado = _features_referencia(sinal, 16000)
+    _comparar(analisar_som_fourier(sinal, 16000), esperado)
+    _comparar(analisar_som_fourier(AudioRequisicao(sinal, 16000)), esperado)
@@ -0,0 +1,37 @@
+import numpy as np
+from scipy.signal import butter, lfilter
+
+from service_fft import filtro_passa_baixa
+from service_filtros import FiltroStreaming, filtrar
+
+
+def _sinal(rng, n=20000):
+    return rng.standard_normal(n) * 1000
+
+
+def test_passa_baixa_igual_a_butter_lfilter():
+    rng = np.random.default_rng(0)
+    sinal = _sinal(rng)
+    b, a = butter(6, 4000 / (0.5 * 44100), btype="low")
+    esperado = lfilter(b, a, sinal)
+    np.testing.assert_allclose(filtro_passa_baixa(sinal, 44100), esperado, rtol=1e-9, atol=1e-9 * np.abs(esperado).max())
+
+
+def test_streaming_em_blocos_igual_ao_filtro_offline():
+    rng = np.random.default_rng(1)
+    sinal = _sinal(rng)
+    filtro = FiltroStreaming(16000, 3000)
+    tamanhos = rng.integers(1, 700, 100)
+    blocos, inicio = [], 0
+    for tamanho in tamanhos:
+        blocos.append(filtro.processar(sinal[inicio:inicio + tamanho]))
+        inicio += tamanho
+    blocos.append(filtro.processar(sinal[inicio:]))
+
+    np.testing.assert_allclose(np.concatenate(blocos), filtrar(sinal, 16000, 3000), rtol=1e-12, atol=1e-9)
+
+
+def test_corte_acima_de_nyquist_nao_altera_o_sinal():
+    sinal = np.arange(10.0)
+    np.testing.assert_array_equal(filtrar(sinal, 8000, 5000), sinal)
+    np.testing.assert_array_equal(FiltroStreaming(8000, 5000).processar(sinal), sinal)
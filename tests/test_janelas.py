@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from scipy.io import wavfile
+
+import api
+from service_fft import analisar_som_fourier
+from service_janelas import analisar_em_janelas
+from service_processamento import executar_etapas_worker, pipeline
+from service_reamostragem import reamostrar
+from service_stft import AudioRequisicao
+
+RATE = 8000
+
+
+def _gravar(caminho, segundos):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(RATE * segundos)) / RATE
+    sinal = (np.sin(2 * np.pi * 300 * t) * 0.3 + rng.standard_normal(len(t)) * 0.01) * 32767
+    wavfile.write(caminho, RATE, sinal.astype(np.int16))
+    return sinal.astype(np.int16)
+
+
+def test_janelas_usam_a_mesma_analise_da_saida_features(tmp_path):
+    caminho = tmp_path / "longo.wav"
+    sinal = _gravar(caminho, 2.5)
+    resultado = analisar_em_janelas(str(caminho), janela_segundos=1)
+
+    assert [j["inicio_segundos"] for j in resultado["janelas"]] == [0.0, 1.0, 2.0]
+    assert resultado["resumo"]["janelas"] == 3
+    for janela in resultado["janelas"]:
+        bloco = sinal[int(janela["inicio_segundos"] * RATE):int(janela["fim_segundos"] * RATE)]
+        esperado = analisar_som_fourier(AudioRequisicao(*reamostrar(bloco, RATE)))
+        assert janela["pico_frequencia"] == pytest.approx(esperado["pico_frequencia"])
+        assert janela["energia_total"] == pytest.approx(esperado["energia_total"])
+    assert resultado["resumo"]["energia_total"] == pytest.approx(sum(j["energia_total"] for j in resultado["janelas"]))
+
+
+def test_janelas_sem_arquivo_em_disco_e_um_erro():
+    with pytest.raises(ValueError):
+        executar_etapas_worker({"caminho_audio": None}, pipeline.planejar(["janelas"]))
+
+
+def test_janelas_recusadas_na_rota_do_microfone():
+    app = FastAPI()
+    app.include_router(api.router)
+    resposta = TestClient(app).post("/v1/parar-gravacao?saida=janelas")
+    assert resposta.status_code == 400
+    assert "janelas" in resposta.json()["detail"]
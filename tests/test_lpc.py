@@ -0,0 +1,38 @@
+import numpy as np
+from scipy.linalg import solve_toeplitz
+
+from service_lpc import autocorrelacao_potencia, levinson_durbin, resumir_lpc
+from service_stft import AudioRequisicao, TAMANHO_QUADRO_STFT
+
+ORDEM = 10
+
+
+def test_levinson_igual_a_yule_walker():
+    rng = np.random.default_rng(0)
+    quadros = rng.standard_normal((5, 400))
+    r = np.array([[np.dot(q[:len(q) - atraso], q[atraso:]) for atraso in range(ORDEM + 1)] for q in quadros])
+    a, erro = levinson_durbin(r, ORDEM)
+
+    for linha, a_linha, erro_linha in zip(r, a, erro):
+        esperado = solve_toeplitz(linha[:-1], -linha[1:])
+        np.testing.assert_allclose(a_linha[1:], esperado, rtol=1e-9, atol=1e-12)
+        assert np.isclose(erro_linha, np.dot(np.concatenate(([1.0], esperado)), linha), rtol=1e-9)
+
+
+def test_quadros_silenciosos_e_periodicos_ficam_finitos():
+    t = np.arange(TAMANHO_QUADRO_STFT * 4)
+    periodico = np.sin(2 * np.pi * t / 64) * 0.5  # Quase perfeitamente previsível
+    r = np.vstack([np.zeros(ORDEM + 1), np.tile(1.0, ORDEM + 1),
+                   autocorrelacao_potencia(AudioRequisicao(periodico, 16000).potencia(), TAMANHO_QUADRO_STFT, ORDEM)])
+    a, erro = levinson_durbin(r, ORDEM)
+
+    assert np.all(np.isfinite(a)) and np.all(np.isfinite(erro))
+    np.testing.assert_array_equal(a[0], np.eye(1, ORDEM + 1)[0])  # Silêncio: coeficientes nulos
+    assert np.all(erro[1:] > 0)
+
+
+def test_resumo_finito_para_tom_puro():
+    t = np.arange(16000) / 16000
+    resumo = resumir_lpc(np.sin(2 * np.pi * 500 * t), 16000, ORDEM)
+    assert resumo.shape == (2 * ORDEM,)
+    assert np.all(np.isfinite(resumo))
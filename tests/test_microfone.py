@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+import service_microfone
+from service_audio import converter_para_int16
+from service_microfone import BufferCircular, DispositivoArquivo, LimiteSessoesError
+
+
+def _capturar(caminho):
+    blocos = []
+    dispositivo = DispositivoArquivo(str(caminho), 256, lambda bloco, *_: blocos.append(bloco[:, 0].copy()),
+                                     tempo_real=False, repetir=False)
+    dispositivo.start()
+    dispositivo._thread.join(5)
+    return np.concatenate(blocos)
+
+
+@pytest.mark.parametrize("formato", ["int16", "uint8", "float32", "int32"])
+def test_dispositivo_arquivo_converte_a_escala_para_int16(tmp_path, formato):
+    rng = np.random.default_rng(0)
+    esperado = (rng.uniform(-0.9, 0.9, 3000) * 128).astype(np.int16) * 256  # Representável em todos os formatos
+    if formato == "int16":
+        dados = esperado
+    elif formato == "uint8":
+        dados = ((esperado >> 8) + 128).astype(np.uint8)
+    elif formato == "float32":
+        dados = (esperado / 32767).astype(np.float32)
+    else:
+        dados = esperado.astype(np.int32) << 16
+    caminho = tmp_path / f"{formato}.wav"
+    wavfile.write(caminho, 8000, dados)
+
+    np.testing.assert_array_equal(_capturar(caminho), esperado)
+
+
+def test_float_fora_da_faixa_satura():
+    np.testing.assert_array_equal(converter_para_int16(np.array([-1.5, -1.0, 0.0, 1.0, 1.5])),
+                                  [-32768, -32767, 0, 32767, 32767])
+
+
+def test_buffer_circular_mantem_as_ultimas_amostras():
+    buffer = BufferCircular(5)
+    for bloco in (np.arange(3), np.arange(3, 7), np.arange(7, 9)):
+        buffer.escrever(bloco.astype(np.int16))
+    np.testing.assert_array_equal(buffer.ler(), [4, 5, 6, 7, 8])
+    np.testing.assert_array_equal(buffer.ler(2), [7, 8])
+
+
+@pytest.fixture
+def arquivo_microfone(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_microfone, "_sessoes", {})
+    caminho = tmp_path / "microfone.wav"
+    wavfile.write(caminho, 8000, np.zeros(800, dtype=np.int16))
+    yield str(caminho)
+    for sessao in list(service_microfone._sessoes.values()):
+        sessao.parar()
+
+
+def test_limite_de_sessoes_simultaneas(arquivo_microfone, monkeypatch):
+    monkeypatch.setattr(service_microfone, "SESSOES_MAX", 2)
+    primeira = service_microfone.iniciar_sessao(arquivo=arquivo_microfone)
+    service_microfone.iniciar_sessao(arquivo=arquivo_microfone)
+
+    with pytest.raises(LimiteSessoesError):
+        service_microfone.iniciar_sessao(arquivo=arquivo_microfone)
+
+    monkeypatch.setattr(service_microfone.obter_armazem(), "guardar_wav", lambda *args: None)
+    service_microfone.parar_sessao(primeira)
+    assert service_microfone.iniciar_sessao(arquivo=arquivo_microfone)
+
+
+def test_sessao_esquecida_e_encerrada_e_descartada(arquivo_microfone, monkeypatch):
+    monkeypatch.setattr(service_microfone, "SESSAO_MAX_SEGUNDOS", 0.05)
+    sessao_id = service_microfone.iniciar_sessao(arquivo=arquivo_microfone)
+    sessao = service_microfone._sessoes[sessao_id]
+
+    time.sleep(0.3)
+    # O timer fecha o dispositivo sem depender de uma requisição
+    assert not sessao.ativa
+    assert service_microfone.estado_gravacoes() == []
+    with pytest.raises(KeyError):
+        service_microfone.parar_sessao(sessao_id)
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import numpy as np
+
+import service_microlote
+from service_microlote import MicroLote
+
+
+def _registrar_chamadas(monkeypatch):
+    chamadas = []
+
+    def classificar_vetores(X, modelo):
+        chamadas.append(X.copy())
+        return X * modelo["escala"]
+
+    monkeypatch.setattr(service_microlote, "classificar_vetores", classificar_vetores)
+    return chamadas
+
+
+def test_requisicoes_concorrentes_viram_uma_chamada(monkeypatch):
+    chamadas = _registrar_chamadas(monkeypatch)
+    modelo = {"escala": 10}
+    vetores = [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+
+    async def cenario():
+        # Espera longa: o lote só sai na hora porque enche
+        microlote = MicroLote(max_lote=3, max_espera_ms=10_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(microlote.classificar(vetor, modelo) for vetor in vetores)), timeout=1)
+
+    resultados = asyncio.run(cenario())
+
+    assert len(chamadas) == 1
+    np.testing.assert_array_equal(chamadas[0], vetores)
+    for vetor, resultado in zip(vetores, resultados):
+        np.testing.assert_array_equal(resultado, np.array(vetor) * 10)
+
+
+def test_lote_incompleto_sai_no_tempo_limite(monkeypatch):
+    chamadas = _registrar_chamadas(monkeypatch)
+    modelo = {"escala": 2}
+
+    async def cenario():
+        microlote = MicroLote(max_lote=32, max_espera_ms=50)
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(microlote.classificar([1.0], modelo),
+                                          microlote.classificar([2.0], modelo))
+        return resultados, time.perf_counter() - inicio
+
+    resultados, decorrido = asyncio.run(cenario())
+
+    assert decorrido >= 0.045
+    assert len(chamadas) == 1 and chamadas[0].shape == (2, 1)
+    assert [float(r[0]) for r in resultados] == [2.0, 4.0]
@@ -0,0 +1,62 @@
+import numpy as np
+
+import service_mlp
+from service_mlp import mlp_predict_proba, mlp_train
+
+
+def _dados(rng, n=60):
+    X = rng.standard_normal((n, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int) + (X[:, 2] > 1).astype(int)
+    return X, y
+
+
+def _params(rng):
+    return {
+        "W1": rng.standard_normal((4, 8)) * 0.1, "b1": np.zeros((1, 8)),
+        "W2": rng.standard_normal((8, 3)) * 0.1, "b2": np.zeros((1, 3)),
+    }
+
+
+def _treinar(params, X, y, random_state):
+    copia = {chave: valor.copy() for chave, valor in params.items()}
+    return mlp_train(X, y, copia, learning_rate=0.01, epochs=20, otimizador="adam",
+                     batch_size=8, random_state=random_state)
+
+
+def test_mesma_semente_da_o_mesmo_modelo():
+    rng = np.random.default_rng(0)
+    X, y = _dados(rng)
+    params = _params(rng)
+
+    primeiro = _treinar(params, X, y, random_state=42)
+    segundo = _treinar(params, X, y, random_state=42)
+    outro = _treinar(params, X, y, random_state=7)
+
+    for chave in params:
+        np.testing.assert_array_equal(primeiro[chave], segundo[chave])
+    np.testing.assert_array_equal(mlp_predict_proba(X, primeiro), mlp_predict_proba(X, segundo))
+    assert not np.array_equal(primeiro["W1"], outro["W1"])
+
+
+def test_early_stopping_quando_a_validacao_estagna(monkeypatch, tmp_path):
+    rng = np.random.default_rng(1)
+    X, y = _dados(rng)
+    perdas = iter([1.0, 0.5, 0.6, 0.6, 0.6, 0.6])
+    chamadas = []
+
+    def perda_validacao(X_val, y_val, params):
+        chamadas.append(params["W1"].copy())
+        return next(perdas)
+
+    monkeypatch.setattr(service_mlp, "mlp_loss", perda_validacao)
+    checkpoint = tmp_path / "melhor.npz"
+
+    params = mlp_train(X, y, _params(rng), learning_rate=0.01, epochs=1000, otimizador="adam",
+                       batch_size=8, X_val=X, y_val=y, paciencia=3,
+                       caminho_checkpoint=str(checkpoint), random_state=0)
+
+    # Melhor na época 1; para após 3 épocas sem melhora
+    assert len(chamadas) == 5
+    np.testing.assert_array_equal(params["W1"], chamadas[1])
+    with np.load(checkpoint) as salvo:
+        np.testing.assert_array_equal(salvo["W1"], chamadas[1])
@@ -0,0 +1,26 @@
+import numpy as np
+
+from service_modelo import carregar_modelo, classificar_vetores, salvar_modelo
+
+
+def _params_mlp(rng, n_entrada=4, n_classes=3):
+    return {
+        "W1": rng.standard_normal((n_entrada, 5)), "b1": np.zeros(5),
+        "W2": rng.standard_normal((5, n_classes)), "b2": np.zeros(n_classes),
+    }
+
+
+def test_versoes_gravadas_no_mesmo_segundo_nao_colidem(tmp_path):
+    rng = np.random.default_rng(0)
+    labels = {"a": 0, "b": 1, "c": 2}
+    primeira = _params_mlp(rng)
+    segunda = _params_mlp(rng)
+
+    versao_1 = salvar_modelo(str(tmp_path), primeira, None, labels, {"tipo": "teste"})
+    versao_2 = salvar_modelo(str(tmp_path), segunda, None, labels, {"tipo": "teste"})
+
+    assert versao_1 != versao_2
+    X = rng.standard_normal((6, 4))
+    np.testing.assert_allclose(classificar_vetores(X, carregar_modelo(str(tmp_path), versao_1)),
+                               classificar_vetores(X, {"boxcox": None, "pca": None, "mlp": primeira}))
+    assert carregar_modelo(str(tmp_path))["versao"] == versao_2
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from service_pca import pca_finalize, pca_fit_transform, pca_partial_fit, pca_transform
+
+
+def _dados(rng, n=400, d=6):
+    mistura = rng.standard_normal((d, d)) * np.linspace(3, 0.2, d)[:, None]
+    return rng.standard_normal((n, d)) @ mistura + 5.0
+
+
+def _mesmo_subespaco(a, b):
+    # Componentes iguais a menos do sinal
+    np.testing.assert_allclose(np.abs(np.sum(a * b, axis=1)), 1.0, atol=1e-8)
+
+
+def test_eigh_igual_a_eig_da_covariancia():
+    rng = np.random.default_rng(0)
+    X = _dados(rng)
+    _, params = pca_fit_transform(X, 4, metodo="eigh")
+
+    autovalores, autovetores = np.linalg.eig(np.cov(X, rowvar=False))
+    ordem = np.argsort(autovalores.real)[::-1][:4]
+    np.testing.assert_allclose(params["explained_variance"], autovalores.real[ordem], rtol=1e-10)
+    _mesmo_subespaco(params["components"], autovetores.real[:, ordem].T)
+
+
+@pytest.mark.parametrize("metodo", ["svd", "randomizado"])
+def test_metodos_concordam_com_eigh(metodo):
+    rng = np.random.default_rng(1)
+    X = _dados(rng)
+    reduzido_eigh, eigh = pca_fit_transform(X, 3, metodo="eigh")
+    reduzido, params = pca_fit_transform(X, 3, metodo=metodo, random_state=0)
+
+    np.testing.assert_allclose(params["explained_variance"], eigh["explained_variance"], rtol=1e-8)
+    # Os sinais são normalizados, então as projeções coincidem
+    np.testing.assert_allclose(params["components"], eigh["components"], atol=1e-8)
+    np.testing.assert_allclose(reduzido, reduzido_eigh, atol=1e-6)
+
+
+def test_partial_fit_em_blocos_igual_ao_ajuste_direto():
+    rng = np.random.default_rng(2)
+    X = _dados(rng, n=1003)
+    _, direto = pca_fit_transform(X, 0.95, metodo="eigh")
+
+    estado = None
+    for inicio in range(0, len(X), 128):
+        estado = pca_partial_fit(estado, X[inicio:inicio + 128])
+    incremental = pca_finalize(estado, 0.95)
+
+    assert incremental["components"].shape == direto["components"].shape
+    np.testing.assert_allclose(incremental["mean"], direto["mean"], rtol=1e-12)
+    np.testing.assert_allclose(incremental["explained_variance"], direto["explained_variance"], rtol=1e-9)
+    np.testing.assert_allclose(incremental["components"], direto["components"], atol=1e-9)
+    np.testing.assert_allclose(pca_transform(X, incremental), pca_transform(X, direto), atol=1e-8)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from service_preparacao_dados import SCHEMA_FEATURES, extrair_vetores
+from service_processamento import executar_etapas_worker, pipeline
+
+RATE = 44100
+
+
+def _sinal():
+    rng = np.random.default_rng(0)
+    t = np.arange(RATE) / RATE
+    fala = np.where((t > 0.3) & (t < 0.7), np.sin(2 * np.pi * 440 * t) * 0.5, 0.0)
+    return ((fala + rng.standard_normal(RATE) * 1e-3) * 32767).astype(np.int16)
+
+
+def _executar(saidas, feature_schema=SCHEMA_FEATURES):
+    contexto = {"signal": _sinal(), "rate": RATE, "caminho_audio": None, "feature_schema": feature_schema}
+    return executar_etapas_worker(contexto, pipeline.planejar(saidas))
+
+
+def test_features_informam_a_taxa_do_arquivo():
+    campos, _ = _executar(["features"])
+    assert campos["sample_rate"] == str(RATE)
+    assert float(campos["duracao_segundos"]) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("feature_schema", [
+    SCHEMA_FEATURES,
+    {chave: valor for chave, valor in SCHEMA_FEATURES.items() if chave != "taxa_amostragem"},  # Modelo antigo
+    {**SCHEMA_FEATURES, "taxa_amostragem": 8000},
+])
+def test_vetor_do_pipeline_igual_ao_de_classificar(feature_schema):
+    _, valores = _executar(["comando"], feature_schema)
+    (esperado, erro, _), = extrair_vetores([_sinal()], [RATE], feature_schema)
+    vetor, erro_pipeline = valores["vetor"]
+
+    assert erro is None and erro_pipeline is None
+    np.testing.assert_allclose(vetor, esperado, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.signal import resample_poly
+
+from service_reamostragem import _filtro_fir, reamostrar
+
+
+def _sinal(rate, segundos=0.5):
+    t = np.arange(int(rate * segundos)) / rate
+    return np.sin(2 * np.pi * 440 * t) + 0.3 * np.sin(2 * np.pi * 3000 * t)
+
+
+def test_igual_ao_resample_poly_do_scipy():
+    signal = _sinal(44100)
+
+    reamostrado, rate = reamostrar(signal, 44100, 16000)
+
+    assert rate == 16000
+    np.testing.assert_allclose(reamostrado, resample_poly(signal, 160, 441), atol=1e-9)
+
+
+def test_pcm_inteiro_mantem_o_dtype():
+    signal = (_sinal(48000) * 10000).astype(np.int16)
+
+    reamostrado, _ = reamostrar(signal, 48000, 16000)
+
+    assert reamostrado.dtype == np.int16
+    esperado = resample_poly(signal.astype(np.float64), 1, 3)
+    assert np.abs(reamostrado - esperado).max() <= 0.5 + 1e-9
+
+
+def test_filtro_projetado_uma_vez_por_par_de_taxas():
+    _filtro_fir.cache_clear()
+
+    reamostrar(_sinal(44100), 44100, 16000)
+    reamostrar(_sinal(44100, segundos=0.2), 44100, 16000)
+    assert _filtro_fir.cache_info().misses == 1
+    assert _filtro_fir.cache_info().hits == 1
+
+    reamostrar(_sinal(22050), 22050, 16000)
+    assert _filtro_fir.cache_info().misses == 2
+    assert _filtro_fir(160, 441) is _filtro_fir(160, 441)
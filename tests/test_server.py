@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+PASTA_SOURCE = os.path.join(os.path.dirname(__file__), "..", "source")
+PESADOS = ["matplotlib", "scipy.signal", "scipy.io.wavfile", "sounddevice"]
+
+
+def _modulos_carregados(codigo):
+    # Processo novo: os outros testes já importaram parte desses módulos
+    saida = subprocess.run([sys.executable, "-c", f"import json, sys\n{codigo}\n"
+                            f"print(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))"],
+                           cwd=PASTA_SOURCE, capture_output=True, text=True, check=True,
+                           env={**os.environ, "SERVIDOR_HEADLESS": "1"})
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def test_importar_o_servidor_nao_carrega_modulos_pesados():
+    assert _modulos_carregados("import server") == []
+
+
+def test_precarga_carrega_os_modulos_do_caminho_das_requisicoes():
+    assert _modulos_carregados("import server\nserver._precarregar_modulos()") == PESADOS[:3]
+
+
+def _wav(segundos=0.5, rate=16000):
+    import io
+
+    import numpy as np
+    from scipy.io import wavfile
+
+    t = np.arange(int(rate * segundos)) / rate
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16))
+    return buffer.getvalue()
+
+
+def test_fila_cheia_responde_503_com_retry_after(monkeypatch, pool_em_threads):
+    import asyncio
+    import threading
+
+    from fastapi.testclient import TestClient
+
+    import controller_audio
+    import server
+    import service_execucao
+
+    monkeypatch.setattr(service_execucao, "NUM_WORKERS", 1)
+    monkeypatch.setattr(service_execucao, "TAMANHO_MAX_FILA", 0)
+    monkeypatch.setattr(controller_audio, "RETRY_AFTER_SEGUNDOS", 7)
+    liberar, ocupado = threading.Event(), threading.Event()
+
+    def tarefa_lenta():
+        ocupado.set()
+        liberar.wait(10)
+
+    # Ocupa o único worker com uma tarefa de verdade, em outro event loop
+    bloqueio = threading.Thread(target=lambda: asyncio.run(service_execucao.executar_no_pool(tarefa_lenta)))
+    bloqueio.start()
+    try:
+        assert ocupado.wait(10)
+        resposta = TestClient(server.app).post("/v1/enviar-audio-wav?saida=features",
+                                               files={"file": ("fila.wav", _wav())})
+    finally:
+        liberar.set()
+        bloqueio.join(10)
+
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "7"
+    assert service_execucao.estado_fila()["em_execucao"] == 0
+
+
+@pytest.fixture
+def cliente(monkeypatch, tmp_path, pool_em_threads):
+    from fastapi.testclient import TestClient
+
+    import server
+    import service_artefatos
+
+    # Nada é arquivado em audios_uploads/ durante os testes
+    pastas = {nome: str(tmp_path / nome) for nome in ("uploads", "gravacoes", "espectrogramas")}
+    monkeypatch.setattr(service_artefatos, "_armazem", service_artefatos.ArmazemArtefatos(pastas, arquivar=False))
+    return TestClient(server.app)
+
+
+def test_resposta_traz_server_timing(cliente):
+    resposta = cliente.post("/v1/enviar-audio-wav?saida=features", files={"file": ("timing.wav", _wav(0.6))})
+
+    assert resposta.status_code == 200
+    partes = resposta.headers["Server-Timing"].split(", ")
+    assert all(re.fullmatch(r"[a-z_]+;dur=\d+\.\d{2}", parte) for parte in partes)
+    nomes = [parte.split(";")[0] for parte in partes]
+    assert nomes[-1] == "total" and len(set(nomes)) == len(nomes)
+    assert "decodificacao" in nomes and "fourier" in nomes
+
+
+def test_metrics_no_formato_do_prometheus(cliente):
+    assert cliente.post("/v1/enviar-audio-wav?saida=features",
+                        files={"file": ("metricas.wav", _wav(0.7))}).status_code == 200
+
+    resposta = cliente.get("/metrics")
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    linhas = resposta.text.splitlines()
+    assert "# TYPE audio_requisicoes_total counter" in linhas
+    assert "# TYPE audio_requisicao_duracao_segundos histogram" in linhas
+
+    rota = 'rota="/v1/enviar-audio-wav"'
+    contador = next(linha for linha in linhas
+                    if linha.startswith(f'audio_requisicoes_total{{{rota},metodo="POST",status="200"}} '))
+    assert int(contador.split()[-1]) >= 1
+
+    buckets = [int(linha.split()[-1]) for linha in linhas
+               if linha.startswith(f"audio_requisicao_duracao_segundos_bucket{{{rota},")]
+    total = next(linha for linha in linhas if linha.startswith(f"audio_requisicao_duracao_segundos_count{{{rota}}} "))
+    assert buckets == sorted(buckets) and buckets[-1] == int(total.split()[-1]) >= 1
+    assert all(re.fullmatch(r'[a-z_]+(\{[^}]*\})? [0-9.e+-]+', linha) for linha in linhas if not linha.startswith("#"))
+
+
+def test_classificacao_le_o_upload_com_limite_e_cabecalho(cliente, monkeypatch, modelo_teste):
+    import controller_audio
+
+    monkeypatch.setattr(controller_audio, "obter_modelo", lambda: modelo_teste)
+    audio = _wav(0.5)
+
+    resposta = cliente.post("/v1/classificar", files={"file": ("ok.wav", audio)})
+    assert resposta.status_code == 200 and resposta.json()["body"]["comando"] in ("a", "b", "c")
+    assert cliente.post("/v1/classificar", files={"file": ("texto.wav", b"nao e um wav" * 10)}).status_code == 400
+
+    monkeypatch.setattr(controller_audio, "TAMANHO_MAX_UPLOAD", len(audio) - 1)
+    assert cliente.post("/v1/classificar", files={"file": ("grande.wav", audio)}).status_code == 413
+
+    lote = [("files", ("grande.wav", audio)), ("files", ("texto.wav", b"nao e um wav"))]
+    assert cliente.post("/v1/classificar-lote", files=lote).status_code == 413
+
+    monkeypatch.setattr(controller_audio, "TAMANHO_MAX_UPLOAD", len(audio))
+    resposta = cliente.post("/v1/classificar-lote", files=lote)
+    assert resposta.status_code == 200
+    ok, invalido = resposta.json()["body"]
+    assert "comando" in ok and "cabeçalho RIFF/WAVE" in invalido["erro"]
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import api
+import controller_audio
+
+
+@pytest.fixture
+def cliente(monkeypatch, modelo_teste, pool_em_threads):
+    monkeypatch.setattr(controller_audio, "obter_modelo", lambda: modelo_teste)
+    app = FastAPI()
+    app.include_router(api.router)
+    return TestClient(app)
+
+
+def _fala(rate=16000):
+    t = np.arange(int(rate * 0.5)) / rate
+    tom = (np.sin(2 * np.pi * 300 * t) * 8000).astype("<i2")
+    return np.concatenate([np.zeros(rate // 2, "<i2"), tom, np.zeros(rate // 2, "<i2")]).tobytes()
+
+
+def test_bloco_com_bytes_impares_fecha_com_1003(cliente):
+    with cliente.websocket_connect("/v1/stream") as ws:
+        ws.send_bytes(b"\x00\x01\x02")
+        assert ws.receive_json()["evento"] == "erro"
+        with pytest.raises(WebSocketDisconnect) as erro:
+            ws.receive_json()
+        assert erro.value.code == 1003
+
+
+@pytest.mark.parametrize("taxa", ["abc", 0, -5, True, 16000.5, 10 ** 9])
+def test_sample_rate_invalido_e_recusado_sem_derrubar_a_conexao(cliente, taxa):
+    with cliente.websocket_connect("/v1/stream") as ws:
+        ws.send_text(json.dumps({"sample_rate": taxa}))
+        assert ws.receive_json()["evento"] == "erro"
+
+        ws.send_text(json.dumps({"sample_rate": 16000}))
+        ws.send_bytes(_fala())
+        resposta = ws.receive_json()
+        assert resposta["evento"] == "comando"
+        assert resposta["comando"] in {"a", "b", "c"}
+
+
+def test_controle_que_nao_e_objeto_e_recusado(cliente):
+    with cliente.websocket_connect("/v1/stream") as ws:
+        ws.send_text("[1, 2]")
+        assert ws.receive_json()["evento"] == "erro"
+        ws.send_bytes(_fala())
+        ws.send_text(json.dumps({"evento": "fim"}))
+        assert ws.receive_json()["evento"] == "comando"
+
+
+def test_falha_inesperada_envia_erro_e_fecha_com_1011(cliente, monkeypatch):
+    def falhar(pcm):
+        raise RuntimeError("falha")
+
+    monkeypatch.setattr(controller_audio.ReconhecedorStreaming, "processar", lambda self, pcm: falhar(pcm))
+    with cliente.websocket_connect("/v1/stream") as ws:
+        ws.send_bytes(b"\x00\x00")
+        assert ws.receive_json()["evento"] == "erro"
+        with pytest.raises(WebSocketDisconnect) as erro:
+            ws.receive_json()
+        assert erro.value.code == 1011
+
+
+def test_extracao_do_enunciado_roda_no_pool(cliente, monkeypatch):
+    chamadas = []
+    executar_no_pool = controller_audio.executar_no_pool
+
+    async def registrar(func, *args):
+        chamadas.append(func.__name__)
+        return await executar_no_pool(func, *args)
+
+    monkeypatch.setattr(controller_audio, "executar_no_pool", registrar)
+    with cliente.websocket_connect("/v1/stream") as ws:
+        ws.send_bytes(_fala())
+        assert ws.receive_json()["evento"] == "comando"
+    assert chamadas == ["extrair_vetores"]
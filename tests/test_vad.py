@@ -0,0 +1,49 @@
+import numpy as np
+
+from service_streaming import ReconhecedorStreaming
+from service_vad import detectar_segmento_fala, medidas_quadros, quadros_com_fala
+
+RATE = 16000
+
+
+def _sinal(rng):
+    t = np.arange(int(RATE * 0.6)) / RATE
+    fala = np.sin(2 * np.pi * 220 * t) * 0.3
+    ruido = lambda n: rng.standard_normal(n) * 1e-3  # noqa: E731
+    return (np.concatenate([ruido(RATE // 2), fala, ruido(RATE // 2)]) * 32767).astype(np.int16)
+
+
+def test_segmento_offline_cobre_a_fala():
+    inicio, fim, fala_detectada = detectar_segmento_fala(_sinal(np.random.default_rng(0)), RATE)
+    assert fala_detectada
+    assert abs(inicio / RATE - 0.5) < 0.1
+    assert abs(fim / RATE - 1.1) < 0.1
+
+
+def test_silencio_nao_tem_fala():
+    assert not detectar_segmento_fala(np.zeros(RATE, dtype=np.int16), RATE)[2]
+
+
+def test_fricativa_fraca_com_zcr_alta_conta_como_fala():
+    # Energia abaixo do limiar, mas acima do ruído, com ZCR alta
+    energias = np.array([5e-5, 5e-5, 1e-7])
+    zcr = np.array([0.5, 0.05, 0.5])
+    np.testing.assert_array_equal(quadros_com_fala(energias, zcr, 1e-7), [True, False, False])
+
+
+def test_streaming_e_offline_usam_a_mesma_decisao():
+    sinal = _sinal(np.random.default_rng(1))
+    reconhecedor = ReconhecedorStreaming(RATE)
+    enunciados = []
+    for inicio in range(0, len(sinal), 700):
+        enunciados += reconhecedor.processar(sinal[inicio:inicio + 700])
+    assert len(enunciados) == 1
+    _, inicio_s, fim_s = enunciados[0]
+
+    quadros = sinal[:len(sinal) // 320 * 320].reshape(-1, 320) / 32768
+    energias, zcr = medidas_quadros(quadros)
+    fala = quadros_com_fala(energias, zcr, np.percentile(energias, 10))
+    primeiro, ultimo = np.flatnonzero(fala)[[0, -1]]
+    # O enunciado começa com até 100 ms de pre-roll e termina um quadro depois da última fala
+    assert primeiro * 320 / RATE - 0.1 - 0.02 <= inicio_s <= primeiro * 320 / RATE
+    assert abs(fim_s - (ultimo + 2) * 320 / RATE) <= 0.02